@@ -1,27 +1,254 @@
 import logging
 import os
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 import azure.functions as func
 
 from .course_fetcher import CourseFetcher
 
-from .utils import get_collection_link, get_cosmos_client, get_http_error_response_json
+from .utils import (
+    etag_matches,
+    get_collection_link,
+    get_cosmos_client,
+    get_course_etag,
+    get_encoded_etag,
+    get_http_error_response_json,
+    get_http_errors_response_json,
+    parse_course_keys,
+)
 
 from .dataset_helper import DataSetHelper
 
-from .course_param_validator import valid_course_params
+from .version_cache import VersionCache
+
+from .response_cache import NegativeCache, ResponseCache
+
+from .ukprn_alias_index import UkprnAliasIndexCache
+
+from .course_locator import CourseLocator
+
+from .widget_snapshot import WidgetSnapshotStore
+
+from .widget_store import WidgetStore
+
+from .cache_headers import CacheHeaderPolicy
+
+from .compression import ResponseEncoder
+
+from .serializer import StdlibSerializer
+
+from .param_validator import LazyRouteValidators
+
+from .request_timing import JsonMessage, RequestTimer, capture_cosmos_responses, log_request_timing, span
+
+from .request_logging import RequestLogSampler, install_sampled_logging
+
+from .hot_set import HotSetPrefetcher, HotSetTracker
+
+from .cosmos_profile import CosmosConnectionProfile
 
 cosmosdb_uri = os.environ["AzureCosmosDbUri"]
 cosmosdb_key = os.environ["AzureCosmosDbKey"]
 cosmosdb_database_id = os.environ["AzureCosmosDbDatabaseId"]
 cosmosdb_courses_collection_id = os.environ["AzureCosmosDbCoursesCollectionId"]
 cosmosdb_dataset_collection_id = os.environ["AzureCosmosDbDataSetCollectionId"]
+version_cache_ttl_seconds = int(os.environ.get("VersionCacheTtlSeconds", "300"))
+response_cache_max_entries = int(os.environ.get("ResponseCacheMaxEntries", "10000"))
+response_cache_max_bytes = int(os.environ.get("ResponseCacheMaxBytes", "67108864"))
+negative_cache_max_entries = int(os.environ.get("NegativeCacheMaxEntries", "10000"))
+negative_cache_ttl_seconds = int(os.environ.get("NegativeCacheTtlSeconds", "600"))
+ukprn_alias_index_enabled = os.environ.get("UkprnAliasIndexEnabled", "true").lower() == "true"
+course_lookup_mode = os.environ.get("CourseLookupMode", "query")
+courses_partition_key_template = os.environ.get("CoursesPartitionKeyTemplate", "{version}")
+courses_document_id_template = os.environ.get("CoursesDocumentIdTemplate", "")
+async_handler_enabled = os.environ.get("AsyncHandlerEnabled", "false").lower() == "true"
+async_cosmos_max_workers = int(os.environ.get("AsyncCosmosMaxWorkers", "100"))
+speculative_lookup_enabled = os.environ.get("SpeculativeLookupEnabled", "false").lower() == "true"
+speculative_lookup_max_workers = int(os.environ.get("SpeculativeLookupMaxWorkers", "16"))
+combined_ukprn_query_enabled = os.environ.get("CombinedUkprnQueryEnabled", "false").lower() == "true"
+widget_snapshot_dir = os.environ.get("WidgetSnapshotDir", "")
+widget_snapshot_recheck_seconds = int(os.environ.get("WidgetSnapshotRecheckSeconds", "60"))
+cosmosdb_widgets_collection_id = os.environ.get("AzureCosmosDbWidgetsCollectionId", "")
+widget_store_recheck_seconds = int(os.environ.get("WidgetStoreRecheckSeconds", "60"))
+cache_max_age_fraction = float(os.environ.get("CacheMaxAgeFraction", "0.1"))
+cache_min_max_age_seconds = int(os.environ.get("CacheMinMaxAgeSeconds", "60"))
+cache_max_max_age_seconds = int(os.environ.get("CacheMaxMaxAgeSeconds", "3600"))
+not_found_cache_max_age_seconds = int(os.environ.get("NotFoundCacheMaxAgeSeconds", "60"))
+response_compression_encodings = os.environ.get("ResponseCompressionEncodings", "br,gzip")
+response_compression_min_bytes = int(os.environ.get("ResponseCompressionMinBytes", "1024"))
+request_timing_enabled = os.environ.get("RequestTimingEnabled", "true").lower() == "true"
+server_timing_enabled = os.environ.get("ServerTimingEnabled", "false").lower() == "true"
+request_logging_mode = os.environ.get("RequestLoggingMode", "direct")
+request_log_sample_rate = float(os.environ.get("RequestLogSampleRate", "0.1"))
+slow_request_log_seconds = float(os.environ.get("SlowRequestLogSeconds", "1.0"))
+warm_up_courses = parse_course_keys(os.environ.get("WarmUpCourses", ""))
+warm_up_alias_index_wait_seconds = float(os.environ.get("WarmUpAliasIndexWaitSeconds", "10"))
+hot_set_prefetch_count = int(os.environ.get("HotSetPrefetchCount", "500"))
+hot_set_prefetch_concurrency = int(os.environ.get("HotSetPrefetchConcurrency", "4"))
+hot_set_decay_interval = int(os.environ.get("HotSetDecayInterval", "100000"))
+cosmos_request_timeout_seconds = float(os.environ.get("CosmosRequestTimeoutSeconds", "10"))
+cosmos_max_retry_attempts = int(os.environ.get("CosmosMaxRetryAttempts", "3"))
+cosmos_max_retry_wait_seconds = float(os.environ.get("CosmosMaxRetryWaitSeconds", "5"))
+cosmos_preferred_locations = [
+    location.strip() for location in os.environ.get("CosmosPreferredLocations", "").split(",") if location.strip()
+]
+cosmos_connection_pool_size = int(os.environ.get("CosmosConnectionPoolSize", str(async_cosmos_max_workers)))
+cosmos_consistency_level = os.environ.get("CosmosConsistencyLevel", "Session")
+
+# Parameters are validated against their definitions in swagger.yml, which
+# is parsed when the first request is validated or by warm_up
+SWAGGER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "swagger.yml")
+COURSE_ROUTE = "/widget/institutions/{institution_id}/courses/{course_id}/modes/{mode}"
+route_validators = LazyRouteValidators(SWAGGER_PATH)
+course_params_validator = route_validators.validator(COURSE_ROUTE, "get")
 
 # Intialise cosmos db client
-client = get_cosmos_client(cosmosdb_uri, cosmosdb_key)
+cosmos_profile = CosmosConnectionProfile(
+    cosmos_request_timeout_seconds,
+    cosmos_max_retry_attempts,
+    cosmos_max_retry_wait_seconds,
+    cosmos_preferred_locations,
+    cosmos_connection_pool_size,
+    cosmos_consistency_level,
+)
+client = get_cosmos_client(
+    cosmosdb_uri, cosmosdb_key, cosmos_profile.connection_policy(), cosmos_profile.consistency_level
+)
+cosmos_profile.configure_pool(client)
+if request_timing_enabled:
+    # Request charges are read from each response as it arrives
+    capture_cosmos_responses(client)
+logging.info("Cosmos DB connection profile %s", JsonMessage(cosmos_profile.settings()))
+
+courses_collection_link = get_collection_link(
+    cosmosdb_database_id, cosmosdb_courses_collection_id
+)
+dataset_collection_link = get_collection_link(
+    cosmosdb_database_id, cosmosdb_dataset_collection_id
+)
+
+
+def load_latest_dataset_version():
+    # Initialise dataset helper - used for retrieving latest dataset version
+    dsh = DataSetHelper(client, dataset_collection_link)
+    return dsh.get_highest_successful_version_number()
+
+
+def load_dataset_published_at(version):
+    dsh = DataSetHelper(client, dataset_collection_link)
+    return dsh.get_version_published_at(version)
+
+
+def load_ukprn_aliases(version):
+    return CourseFetcher(client, courses_collection_link).get_ukprn_aliases(version)
+
+
+def prepare_version(previous_version, version):
+    """Runs on the version refresh thread before a new version is served"""
+    if hot_set_prefetcher is not None:
+        hot_set_prefetcher.prefetch(previous_version, version)
+
+
+# Shared by every invocation in this worker process
+version_cache = VersionCache(
+    load_latest_dataset_version,
+    version_cache_ttl_seconds,
+    published_at_loader=load_dataset_published_at,
+    before_version_change=prepare_version,
+)
+response_cache = ResponseCache(response_cache_max_entries, response_cache_max_bytes)
+negative_cache = NegativeCache(negative_cache_max_entries, negative_cache_ttl_seconds)
+ukprn_alias_indexes = (
+    UkprnAliasIndexCache(load_ukprn_aliases) if ukprn_alias_index_enabled else None
+)
+
+# How course documents are looked up: "query" runs cross-partition
+# queries, "partition" single-partition queries and "point" point reads.
+course_locator = None
+if course_lookup_mode == "partition":
+    course_locator = CourseLocator(courses_partition_key_template)
+elif course_lookup_mode == "point":
+    course_locator = CourseLocator(courses_partition_key_template, courses_document_id_template)
+
+# Versions with a snapshot file are served from it instead of Cosmos DB
+widget_snapshots = (
+    WidgetSnapshotStore(widget_snapshot_dir, widget_snapshot_recheck_seconds)
+    if widget_snapshot_dir
+    else None
+)
+
+# Versions whose widgets have been materialized are read from their container
+widget_store = (
+    WidgetStore(
+        client,
+        get_collection_link(cosmosdb_database_id, cosmosdb_widgets_collection_id),
+        widget_store_recheck_seconds,
+    )
+    if cosmosdb_widgets_collection_id
+    else None
+)
 
+cache_header_policy = CacheHeaderPolicy(
+    cache_max_age_fraction,
+    cache_min_max_age_seconds,
+    cache_max_max_age_seconds,
+    not_found_cache_max_age_seconds,
+)
 
-def main(req: func.HttpRequest) -> func.HttpResponse:
+serializer = StdlibSerializer()
+
+# Compressed bodies are cached next to the identity bodies
+response_encoder = ResponseEncoder(
+    [e.strip() for e in response_compression_encodings.split(",") if e.strip()],
+    response_compression_min_bytes,
+    response_cache,
+)
+
+# The most requested courses are fetched for a new dataset version before
+# it is served, so the caches don't all go cold at once
+hot_set_tracker = None
+hot_set_prefetcher = None
+if hot_set_prefetch_count > 0:
+    hot_set_tracker = HotSetTracker(hot_set_prefetch_count, decay_interval=hot_set_decay_interval)
+    hot_set_prefetcher = HotSetPrefetcher(
+        hot_set_tracker,
+        lambda: create_course_fetcher(),
+        response_cache,
+        hot_set_prefetch_count,
+        hot_set_prefetch_concurrency,
+        response_encoder=response_encoder,
+    )
+
+# The Cosmos DB SDK only blocks, so the async handler runs its queries here
+cosmos_executor = ThreadPoolExecutor(
+    max_workers=async_cosmos_max_workers, thread_name_prefix="cosmos"
+)
+
+# Without an alias index, a course requested by ukprn takes three queries
+# in turn; this runs the ukprn ones alongside the pub_ukprn one
+lookup_executor = None
+if speculative_lookup_enabled:
+    lookup_executor = ThreadPoolExecutor(
+        max_workers=speculative_lookup_max_workers, thread_name_prefix="speculative-lookup"
+    )
+
+# In "sampled" mode the INFO records of only a sample of requests are
+# written, by the handlers already in place on the invocation thread;
+# failed and slow requests are always written in full.
+request_log_sampler = None
+if request_logging_mode == "sampled":
+    request_log_sampler = install_sampled_logging(
+        RequestLogSampler(request_log_sample_rate, slow_request_log_seconds)
+    )
+
+# The not found body is the same for every request, so serialize it once
+COURSE_NOT_FOUND_BODY = get_http_error_response_json(
+    serializer, "Not Found", "course", "Course was not found."
+)
+
+
+def main_sync(req: func.HttpRequest) -> func.HttpResponse:
     """Implements the REST API endpoint for getting course documents.
 
     The endpoint implemented is:
@@ -31,61 +258,316 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     as this module.
     """
 
+    timer = start_request_timer()
+    log_token = start_request_log()
     try:
-        logging.info("Process a request for a course.")
-        logging.info(f"url: {req.url}")
-        logging.info(f"route_params: {req.route_params}")
-
-        params = dict(req.route_params)
-
-        #
-        # The params are used in DB queries, so let's do
-        # some basic sanitisation of them.
-        #
-        if not valid_course_params(params):
-            logging.error(f"valid_course_params returned false for {params}")
-            return func.HttpResponse(
-                get_http_error_response_json(
-                    "Bad Request", "Parameter Error", "Invalid parameter passed"
-                ),
-                headers={"Content-Type": "application/json"},
-                status_code=400,
-            )
-
-        logging.info("The parameters look good")
-
-        courses_collection_link = get_collection_link(
-            cosmosdb_database_id, cosmosdb_courses_collection_id
-        )
-        dataset_collection_link = get_collection_link(
-            cosmosdb_database_id, cosmosdb_dataset_collection_id
-        )
+        with span(timer, "validation"):
+            params, errors = get_valid_params(req)
+        if errors:
+            return finish_request(timer, invalid_parameter_response(errors), log_token)
 
-        # Intialise a CourseFetcher
-        course_fetcher = CourseFetcher(client, courses_collection_link)
+        with span(timer, "version"):
+            version = version_cache.get_version()
+        encoding = response_encoder.negotiate(req.headers.get("Accept-Encoding"))
 
-        # Initialise dataset helper - used for retrieving latest dataset version
-        dsh = DataSetHelper(client, dataset_collection_link)
-        version = dsh.get_highest_successful_version_number()
+        # A client that already has this version of the course gets a 304
+        not_modified = not_modified_response(req, version, params, encoding)
+        if not_modified is not None:
+            record_hot_course(params)
+            return finish_request(timer, not_modified, log_token)
+
+        # Intialise a CourseFetcher
+        course_fetcher = create_course_fetcher(timer)
 
         # Get the course
         course = course_fetcher.get_course(version=version, **params)
 
         if course:
-            return func.HttpResponse(
-                course, headers={"Content-Type": "application/json"}, status_code=200
-            )
-        else:
-            return func.HttpResponse(
-                get_http_error_response_json(
-                    "Not Found", "course", "Course was not found."
-                ),
-                headers={"Content-Type": "application/json"},
-                status_code=404,
-            )
+            record_hot_course(params)
+            not_modified = not_modified_response(req, version, params, encoding, course)
+            if not_modified is not None:
+                return finish_request(timer, not_modified, log_token)
+
+        with span(timer, "response"):
+            response = course_response(course, version, params, encoding)
+        return finish_request(timer, response, log_token)
 
     except Exception as e:
         logging.error(traceback.format_exc())
+        finish_request_log(log_token)
 
         # Raise so Azure sends back the HTTP 500
         raise e
+
+
+async def main_async(req: func.HttpRequest) -> func.HttpResponse:
+    """Implements the same endpoint as main_sync as a coroutine.
+
+    Cosmos DB queries run on cosmos_executor, so the worker can keep
+    many invocations in flight instead of blocking a thread on each.
+    """
+
+    timer = start_request_timer()
+    log_token = start_request_log()
+    try:
+        with span(timer, "validation"):
+            params, errors = get_valid_params(req)
+        if errors:
+            return finish_request(timer, invalid_parameter_response(errors), log_token)
+
+        with span(timer, "version"):
+            version = await version_cache.get_version_async(cosmos_executor)
+        encoding = response_encoder.negotiate(req.headers.get("Accept-Encoding"))
+
+        not_modified = not_modified_response(req, version, params, encoding)
+        if not_modified is not None:
+            record_hot_course(params)
+            return finish_request(timer, not_modified, log_token)
+
+        course_fetcher = create_course_fetcher(timer)
+
+        course = await course_fetcher.get_course_async(
+            version=version, executor=cosmos_executor, **params
+        )
+
+        if course:
+            record_hot_course(params)
+            not_modified = not_modified_response(req, version, params, encoding, course)
+            if not_modified is not None:
+                return finish_request(timer, not_modified, log_token)
+
+        with span(timer, "response"):
+            encoded = None
+            if course:
+                encoded = await response_encoder.encode_async(
+                    version, course_key(params), course, encoding, executor=cosmos_executor
+                )
+            response = course_response(course, version, params, encoding, encoded)
+        return finish_request(timer, response, log_token)
+
+    except Exception as e:
+        logging.error(traceback.format_exc())
+        finish_request_log(log_token)
+
+        # Raise so Azure sends back the HTTP 500
+        raise e
+
+
+# The Functions worker runs whichever handler is bound to main.
+main = main_async if async_handler_enabled else main_sync
+
+
+def get_valid_params(req):
+    """Returns the route params and a list of the errors found in them"""
+    logging.info("Process a request for a course.")
+    logging.info("url: %s", req.url)
+    logging.info("route_params: %s", req.route_params)
+
+    params = dict(req.route_params)
+
+    #
+    # The params are used in DB queries, so let's do
+    # some basic sanitisation of them.
+    #
+    errors = course_params_validator.validate(params)
+    if errors:
+        logging.error("Invalid parameters %s: %s", params, errors)
+        return params, errors
+
+    logging.info("The parameters look good")
+    return params, errors
+
+
+def record_hot_course(params):
+    if hot_set_tracker is not None:
+        hot_set_tracker.record(course_key(params))
+
+
+def start_request_timer():
+    return RequestTimer() if request_timing_enabled else None
+
+
+def start_request_log():
+    return request_log_sampler.start_request() if request_log_sampler is not None else None
+
+
+def finish_request_log(log_token, status_code=None):
+    if log_token is not None:
+        request_log_sampler.finish_request(log_token, status_code)
+
+
+def finish_request(timer, response, log_token=None):
+    """Logs the request's timings and adds them to the response if enabled"""
+    if timer is not None:
+        if server_timing_enabled:
+            response.headers["Server-Timing"] = timer.server_timing()
+        log_request_timing(timer, status=response.status_code)
+    finish_request_log(log_token, response.status_code)
+    return response
+
+
+def create_course_fetcher(timer=None):
+    return CourseFetcher(
+        client,
+        courses_collection_link,
+        response_cache,
+        negative_cache,
+        ukprn_alias_indexes,
+        course_locator,
+        widget_snapshots,
+        widget_store,
+        serializer,
+        timer,
+        lookup_executor,
+        combined_ukprn_query_enabled,
+    )
+
+
+def build_widget_snapshot(version=None):
+    """Writes the snapshot for a dataset version, the latest by default"""
+    if widget_snapshots is None:
+        raise RuntimeError("WidgetSnapshotDir is not set")
+    if version is None:
+        version = load_latest_dataset_version()
+    course_fetcher = CourseFetcher(client, courses_collection_link, serializer=serializer)
+    widget_snapshots.build(version, course_fetcher.get_version_courses(version))
+    return version
+
+
+def materialize_widgets(version=None):
+    """Writes the widgets for a dataset version to the widget store, the latest by default"""
+    if widget_store is None:
+        raise RuntimeError("AzureCosmosDbWidgetsCollectionId is not set")
+    if version is None:
+        version = load_latest_dataset_version()
+    course_fetcher = CourseFetcher(client, courses_collection_link, serializer=serializer)
+    widget_store.write(version, course_fetcher.get_version_courses(version))
+    return version
+
+
+def warm_up(keys=None):
+    """Readies this worker for traffic before it is sent any.
+
+    Compiles the route parameter validators from swagger.yml, makes the
+    first Cosmos DB call, which opens the connection, loads the current
+    dataset version and its ukprn aliases, waiting up to
+    WarmUpAliasIndexWaitSeconds for those, and fetches the courses
+    given, WarmUpCourses by default, into the response cache along with
+    their compressed variants. Safe to call again: anything already
+    cached is not fetched twice. Returns a summary of the work, with the
+    number of ukprn aliases loaded, or None if they aren't yet.
+    """
+    started = time.perf_counter()
+    route_validators.load()
+    version = version_cache.get_version()
+    ukprn_aliases = None
+    if ukprn_alias_indexes is not None:
+        index = ukprn_alias_indexes.wait_for_index(version, warm_up_alias_index_wait_seconds)
+        if index is not None:
+            ukprn_aliases = len(index.aliases)
+    if widget_snapshots is not None:
+        widget_snapshots.get_snapshot(version)
+
+    if keys is None:
+        keys = warm_up_courses
+    valid_keys = []
+    for key in keys:
+        params = dict(zip(("institution_id", "course_id", "mode"), key))
+        if course_params_validator.validate(params):
+            logging.warning("Not warming up invalid course %s", "/".join(key))
+        else:
+            valid_keys.append(tuple(key))
+
+    courses = create_course_fetcher().get_courses(version, valid_keys) if valid_keys else {}
+    for key, body in courses.items():
+        if body:
+            for encoding in response_encoder.encodings:
+                response_encoder.encode(version, key, body, encoding)
+
+    summary = {
+        "version": version,
+        "courses": len(courses),
+        "found": sum(1 for body in courses.values() if body),
+        "ukprn_aliases": ukprn_aliases,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    logging.info("Warmed up: %s", summary)
+    return summary
+
+
+def invalid_parameter_response(errors):
+    body = get_http_errors_response_json(
+        serializer, "Bad Request", [(error.name, error.message) for error in errors]
+    )
+    return func.HttpResponse(
+        body,
+        headers={"Content-Type": "application/json"},
+        status_code=400,
+    )
+
+
+def course_headers(version, params, content_encoding):
+    """Returns the ETag and caching headers for a course"""
+    etag = get_course_etag(version, **params)
+    if content_encoding is not None:
+        etag = get_encoded_etag(etag, content_encoding)
+    headers = {"ETag": etag}
+    if response_encoder.encodings:
+        headers["Vary"] = "Accept-Encoding"
+    headers.update(
+        cache_header_policy.course_headers(
+            version, version_cache.get_version_age(), params["institution_id"]
+        )
+    )
+    return headers
+
+
+def not_modified_response(req, version, params, encoding, course=None):
+    """Returns a 304 if the client already has the course, otherwise None
+
+    If-None-Match: * matches whichever representation of the course
+    exists, so it is only answered once the course has been found and
+    is passed in; a list of ETags is answered before the course lookup.
+    """
+    if_none_match = req.headers.get("If-None-Match")
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        if course is None:
+            return None
+        if len(course) < response_encoder.min_bytes:
+            encoding = None
+    elif course is not None:
+        return None
+    # Small bodies are sent uncompressed, so the identity ETag can match too
+    for content_encoding in dict.fromkeys((encoding, None)):
+        headers = course_headers(version, params, content_encoding)
+        if etag_matches(if_none_match, headers["ETag"]):
+            return func.HttpResponse(status_code=304, headers=headers)
+    return None
+
+
+def course_key(params):
+    return (params["institution_id"], params["course_id"], params["mode"])
+
+
+def course_response(course, version, params, encoding=None, encoded=None):
+    """Returns the response for a course, encoded already if encoded is given"""
+    headers = {"Content-Type": "application/json"}
+    if course:
+        if encoded is None:
+            encoded = response_encoder.encode(version, course_key(params), course, encoding)
+        content_encoding, course = encoded
+        headers.update(course_headers(version, params, content_encoding))
+        if content_encoding is not None:
+            headers["Content-Encoding"] = content_encoding
+        return func.HttpResponse(course, headers=headers, status_code=200)
+    else:
+        headers.update(
+            cache_header_policy.not_found_headers(version, params["institution_id"])
+        )
+        return func.HttpResponse(
+            COURSE_NOT_FOUND_BODY,
+            headers=headers,
+            status_code=404,
+        )
@@ -0,0 +1,51 @@
+class CacheHeaderPolicy:
+    """Works out the caching headers for course responses.
+
+    A dataset version that has been current for a long time is unlikely
+    to be replaced soon, so responses may be cached for longer the older
+    the version is: max-age is max_age_fraction of the version's age,
+    kept between min_max_age and max_max_age. Caches may serve a stale
+    response for as long again while they revalidate it. Not found
+    responses are cached for not_found_max_age.
+
+    Every response carries surrogate keys for its dataset version and
+    institution, so a CDN can purge them when a new dataset is published.
+    """
+
+    def __init__(self, max_age_fraction, min_max_age, max_max_age, not_found_max_age):
+        self.max_age_fraction = max_age_fraction
+        self.min_max_age = min_max_age
+        self.max_max_age = max_max_age
+        self.not_found_max_age = not_found_max_age
+
+    def max_age(self, version_age):
+        if version_age is None:
+            return min(self.max_max_age, self.min_max_age)
+        max_age = int(version_age * self.max_age_fraction)
+        return min(self.max_max_age, max(self.min_max_age, max_age))
+
+    def course_headers(self, version, version_age, institution_id):
+        max_age = self.max_age(version_age)
+        return {
+            "Cache-Control": self.cache_control(max_age, max_age),
+            "Surrogate-Key": self.surrogate_key(version, institution_id),
+        }
+
+    def not_found_headers(self, version, institution_id):
+        return {
+            "Cache-Control": self.cache_control(self.not_found_max_age, 0),
+            "Surrogate-Key": self.surrogate_key(version, institution_id),
+        }
+
+    @staticmethod
+    def cache_control(max_age, stale_while_revalidate):
+        if max_age <= 0:
+            return "no-cache"
+        cache_control = f"public, max-age={max_age}"
+        if stale_while_revalidate > 0:
+            cache_control += f", stale-while-revalidate={stale_while_revalidate}"
+        return cache_control
+
+    @staticmethod
+    def surrogate_key(version, institution_id):
+        return f"widget widget-version-{version} widget-institution-{institution_id}"
@@ -0,0 +1,111 @@
+import asyncio
+import gzip
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip is offered
+    brotli = None
+
+
+def _gzip(body):
+    # A fixed mtime keeps the output, and so the ETag, the same every time
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+def _brotli(body):
+    return brotli.compress(body, quality=11)
+
+
+ENCODERS = {"gzip": _gzip}
+if brotli is not None:
+    ENCODERS["br"] = _brotli
+
+
+def parse_accept_encoding(accept_encoding):
+    """Returns a dict of the codings in an Accept-Encoding header to their q-values"""
+    codings = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding] = q
+    return codings
+
+
+class ResponseEncoder:
+    """Negotiates and caches compressed variants of course responses.
+
+    encodings lists the content codings to offer, in order of preference.
+    Bodies shorter than min_bytes are always sent as they are. Each
+    variant is compressed once per course per dataset version and kept
+    in the response cache next to the identity body, under the course
+    key with the coding appended.
+    """
+
+    def __init__(self, encodings, min_bytes, response_cache=None):
+        self.encodings = [e for e in encodings if e in ENCODERS]
+        self.min_bytes = min_bytes
+        self.response_cache = response_cache
+
+    def negotiate(self, accept_encoding):
+        """Returns the preferred coding the client accepts, or None for identity"""
+        if not self.encodings or not accept_encoding:
+            return None
+        codings = parse_accept_encoding(accept_encoding)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            q = codings.get(encoding, codings.get("*", 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def encode(self, version, key, body, encoding, prefetch=False):
+        """Returns (coding, body) to send, coding being None for identity
+
+        A prefetched variant is cached like a prefetched body, next to
+        the current generation of the response cache.
+        """
+        encoded = self.get_cached(version, key, body, encoding)
+        if encoded is not None:
+            return encoded
+        return self.compress(version, key, body, encoding, prefetch)
+
+    async def encode_async(self, version, key, body, encoding, executor=None):
+        """Returns (coding, body) like encode, without blocking the event loop.
+
+        A cached variant is returned on the event loop; compressing a
+        new one runs on the executor.
+        """
+        encoded = self.get_cached(version, key, body, encoding)
+        if encoded is not None:
+            return encoded
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.compress, version, key, body, encoding)
+
+    def get_cached(self, version, key, body, encoding):
+        """Returns (coding, body) if no compressing is needed, else None"""
+        if encoding is None or len(body) < self.min_bytes:
+            return None, body
+        if self.response_cache is not None:
+            compressed = self.response_cache.get(version, key + (encoding,))
+            if compressed is not None:
+                return encoding, compressed
+        return None
+
+    def compress(self, version, key, body, encoding, prefetch=False):
+        """Compresses the body, caching the variant if it is smaller"""
+        compressed = ENCODERS[encoding](body)
+        if len(compressed) >= len(body):
+            return None, body
+        if self.response_cache is not None:
+            self.response_cache.put(version, key + (encoding,), compressed, prefetch=prefetch)
+        return encoding, compressed
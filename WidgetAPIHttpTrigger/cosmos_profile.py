@@ -0,0 +1,84 @@
+import azure.cosmos.documents as documents
+import azure.cosmos.retry_options as retry_options
+from requests.adapters import HTTPAdapter
+
+CONSISTENCY_LEVELS = [
+    documents.ConsistencyLevel.Strong,
+    documents.ConsistencyLevel.BoundedStaleness,
+    documents.ConsistencyLevel.Session,
+    documents.ConsistencyLevel.ConsistentPrefix,
+    documents.ConsistencyLevel.Eventual,
+]
+
+
+class CosmosConnectionProfile:
+    """How the function app connects to Cosmos DB.
+
+    The SDK's defaults suit a batch job more than a read API: a request
+    may wait 60 seconds for a response, and a throttled (429) request is
+    retried up to 9 times for up to 30 seconds, long after the caller has
+    given up. Here a request times out after request_timeout seconds and
+    a throttled one is retried at most max_retry_attempts times, for at
+    most max_retry_wait seconds in all, waiting as long as Cosmos DB's
+    x-ms-retry-after-ms asks each time. The SDK checks the wait before
+    adding the next one, so the total can go over max_retry_wait by one
+    retry interval.
+
+    Reads go to the first available of preferred_locations, in order.
+    pool_size connections to Cosmos DB are kept open for reuse; requests
+    keeps 10 by default, fewer than the threads that query at once.
+    consistency_level can only be the account's level or a weaker one.
+    """
+
+    def __init__(
+        self,
+        request_timeout=60,
+        max_retry_attempts=9,
+        max_retry_wait=30,
+        preferred_locations=(),
+        pool_size=10,
+        consistency_level=documents.ConsistencyLevel.Session,
+    ):
+        levels = {level.lower(): level for level in CONSISTENCY_LEVELS}
+        if consistency_level.lower() not in levels:
+            raise ValueError(
+                f"Unknown consistency level {consistency_level!r}, expected one of {', '.join(CONSISTENCY_LEVELS)}"
+            )
+        self.request_timeout = request_timeout
+        self.max_retry_attempts = max_retry_attempts
+        self.max_retry_wait = max_retry_wait
+        self.preferred_locations = list(preferred_locations)
+        self.pool_size = pool_size
+        self.consistency_level = levels[consistency_level.lower()]
+
+    def connection_policy(self):
+        policy = documents.ConnectionPolicy()
+        # The SDK takes the timeout in milliseconds
+        policy.RequestTimeout = int(self.request_timeout * 1000)
+        policy.PreferredLocations = list(self.preferred_locations)
+        policy.RetryOptions = retry_options.RetryOptions(
+            max_retry_attempt_count=self.max_retry_attempts,
+            max_wait_time_in_seconds=self.max_retry_wait,
+        )
+        return policy
+
+    def configure_pool(self, client):
+        """Sizes the connection pool of a client made with connection_policy"""
+        session = getattr(client, "_requests_session", None)
+        if session is None:
+            return
+        retries = client.connection_policy.ConnectionRetryConfiguration
+        adapter = HTTPAdapter(pool_maxsize=self.pool_size, max_retries=retries if retries is not None else 0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+    def settings(self):
+        """Returns the effective settings, to log"""
+        return {
+            "request_timeout_seconds": self.request_timeout,
+            "max_retry_attempts": self.max_retry_attempts,
+            "max_retry_wait_seconds": self.max_retry_wait,
+            "preferred_locations": self.preferred_locations,
+            "pool_size": self.pool_size,
+            "consistency_level": self.consistency_level,
+        }
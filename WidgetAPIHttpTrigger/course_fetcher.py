@@ -1,13 +1,126 @@
+import asyncio
+import contextvars
 import json
 import logging
+import re
+import threading
+from contextlib import nullcontext
+
+from azure.cosmos.errors import HTTPFailure
+
+
+class QueryTemplate:
+    """A Cosmos DB query whose values are passed as parameters.
+
+    The query text never changes, so Cosmos DB can reuse its query plan,
+    and values never become part of the SQL.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.parameter_names = tuple(dict.fromkeys(re.findall(r"@(\w+)", text)))
+
+    def bind(self, **values):
+        """Returns the query with the values for its parameters"""
+        return {
+            "query": self.text,
+            "parameters": [{"name": f"@{name}", "value": values[name]} for name in self.parameter_names],
+        }
 
 
 class CourseFetcher:
     """Handles retrieving courses from Cosmos DB"""
 
-    def __init__(self, client, collection_link):
+    WIDGET = '{"institution_id": c.course.institution.pub_ukprn, "pub_ukprn": c.course.institution.pub_ukprn, "course_id": c.course_id, "course_name": {"english": c.course.title.english, "welsh": c.course.title.welsh}, "course_mode": c.course_mode, "institution_name":{"english": c.course.institution.pub_ukprn_name, "welsh": c.course.institution.pub_ukprn_welsh_name}, "country": c.course.country, "statistics": { "employment": c.course.statistics.employment, "nss": c.course.statistics.nss} }'
+
+    WIDGET_PROJECTION = "SELECT " + WIDGET + " AS widget from c "
+
+    UKPRN_PROJECTION = 'SELECT {"institution_id": c.course.institution.ukprn, "pub_ukprn": c.course.institution.pub_ukprn, "course_id": c.course_id, "course_mode": c.course_mode} AS widget from c '
+
+    COURSE_BY_PUB_UKPRN = QueryTemplate(
+        WIDGET_PROJECTION
+        + "where c.course.institution.pub_ukprn = @institution_id "
+        "and c.course_id = @course_id "
+        "and c.course_mode = @mode "
+        "and c.version = @version"
+    )
+
+    PUB_UKPRN_BY_UKPRN = QueryTemplate(
+        UKPRN_PROJECTION
+        + "where c.course.institution.ukprn = @institution_id "
+        "and c.course_id = @course_id "
+        "and c.course_mode = @mode "
+        "and c.version = @version"
+    )
+
+    # Matches the course by either field; pub_ukprn_match says which,
+    # as a course can be under one institution_id and reported by another
+    COURSE_BY_PUB_UKPRN_OR_UKPRN = QueryTemplate(
+        "SELECT " + WIDGET + " AS widget, "
+        "c.course.institution.pub_ukprn = @institution_id AS pub_ukprn_match from c "
+        "where (c.course.institution.pub_ukprn = @institution_id or c.course.institution.ukprn = @institution_id) "
+        "and c.course_id = @course_id "
+        "and c.course_mode = @mode "
+        "and c.version = @version"
+    )
+
+    # The batch queries match every combination of the ids, modes and
+    # course ids passed in; the caller picks out the courses it asked for.
+    COURSES_BY_PUB_UKPRNS = QueryTemplate(
+        WIDGET_PROJECTION
+        + "where ARRAY_CONTAINS(@institution_ids, c.course.institution.pub_ukprn) "
+        "and ARRAY_CONTAINS(@course_ids, c.course_id) "
+        "and ARRAY_CONTAINS(@modes, c.course_mode) "
+        "and c.version = @version"
+    )
+
+    PUB_UKPRNS_BY_UKPRNS = QueryTemplate(
+        UKPRN_PROJECTION
+        + "where ARRAY_CONTAINS(@institution_ids, c.course.institution.ukprn) "
+        "and ARRAY_CONTAINS(@course_ids, c.course_id) "
+        "and ARRAY_CONTAINS(@modes, c.course_mode) "
+        "and c.version = @version"
+    )
+
+    VERSION_WIDGETS = QueryTemplate(WIDGET_PROJECTION + "where c.version = @version")
+
+    VERSION_COURSE_KEYS = QueryTemplate(
+        "SELECT c.course.institution.ukprn AS ukprn, c.course.institution.pub_ukprn AS pub_ukprn, c.course_id AS course_id, c.course_mode AS course_mode from c "
+        "where c.version = @version"
+    )
+
+    UKPRN_ALIASES = QueryTemplate(
+        "SELECT DISTINCT c.course.institution.ukprn AS ukprn, c.course.institution.pub_ukprn AS pub_ukprn from c "
+        "where c.version = @version"
+    )
+
+    def __init__(
+        self,
+        client,
+        collection_link,
+        response_cache=None,
+        negative_cache=None,
+        ukprn_alias_indexes=None,
+        course_locator=None,
+        widget_snapshots=None,
+        widget_store=None,
+        serializer=None,
+        timer=None,
+        lookup_executor=None,
+        combined_ukprn_query=False,
+    ):
         self.client = client
         self.collection_link = collection_link
+        self.response_cache = response_cache
+        self.negative_cache = negative_cache
+        self.ukprn_alias_indexes = ukprn_alias_indexes
+        self.course_locator = course_locator
+        self.widget_snapshots = widget_snapshots
+        self.widget_store = widget_store
+        self.dumps = serializer.dumps if serializer is not None else _dumps
+        self.timer = timer
+        self.lookup_executor = lookup_executor
+        self.combined_ukprn_query = combined_ukprn_query
 
     def get_course(self, version, institution_id, course_id, mode):
         """Retrieves a course document from Cosmos DB.
@@ -15,23 +128,132 @@ class CourseFetcher:
         Queries the Cosmos DB container for a course using the
         arguments passed in. If a course is found, it removes
         the additonal fields Cosmos DB added before returning it
-        to the caller. If no course is found it returns None.
+        to the caller as UTF-8 encoded JSON. If no course is found
+        it returns None.
+
+        If the fetcher has a response cache, courses already
+        serialized for this dataset version are returned from it
+        without querying Cosmos DB. Likewise, courses recorded in the
+        negative cache return None without querying Cosmos DB.
 
         """
 
-        # Query the course container using the sql query and options
-        courses_list = list(
-            self.search_with_pub_ukprn(
-                institution_id=institution_id, course_id=course_id, mode=mode, version=version
-            )
+        key = (institution_id, course_id, mode)
+        with self.span("cache"):
+            cached, body = self.get_cached_course(version, key)
+        if cached:
+            return body
+
+        body = self.fetch_course(version, institution_id, course_id, mode)
+        self.cache_course(version, key, body)
+        return body
+
+    async def get_course_async(self, version, institution_id, course_id, mode, executor=None):
+        """Retrieves a course like get_course, without blocking the event loop.
+
+        The caches are checked on the event loop. The Cosmos DB SDK only
+        offers blocking calls, so the queries run on the executor.
+        """
+        key = (institution_id, course_id, mode)
+        with self.span("cache"):
+            cached, body = self.get_cached_course(version, key)
+        if cached:
+            return body
+
+        loop = asyncio.get_running_loop()
+        # Run in a copy of the context, so records logged by the query belong to this request
+        context = contextvars.copy_context()
+        body = await loop.run_in_executor(
+            executor, context.run, self.fetch_course, version, institution_id, course_id, mode
         )
+        self.cache_course(version, key, body)
+        return body
+
+    def get_cached_course(self, version, key):
+        """Returns (True, course) if the caches know the answer for the course
+
+        The course is None when it is known not to exist. A dataset
+        version with a snapshot is answered entirely from the snapshot.
+        """
+        if self.widget_snapshots is not None:
+            snapshot = self.widget_snapshots.get_snapshot(version)
+            if snapshot is not None:
+                body = snapshot.get(key)
+                # The HTTP response needs its own bytes.
+                return True, None if body is None else bytes(body)
+
+        if self.response_cache is not None:
+            body = self.response_cache.get(version, key)
+            if body is not None:
+                return True, body
+
+        if self.negative_cache is not None and self.negative_cache.contains(version, key):
+            return True, None
+
+        return False, None
+
+    def cache_course(self, version, key, body):
+        if body is None:
+            if self.negative_cache is not None:
+                self.negative_cache.add(version, key)
+        elif self.response_cache is not None:
+            self.response_cache.put(version, key, body)
+
+    def fetch_course(self, version, institution_id, course_id, mode):
+        """Queries Cosmos DB for a course and serializes it"""
+
+        # Materialized widgets are ready to send, so read one of those
+        if self.widget_store is not None:
+            key = (institution_id, course_id, mode)
+            with self.span("widget_store"):
+                stored = self.read_widget_store(version, [key])
+            if stored is not None:
+                return stored[key]
+
+        # Query the course container using the sql query and options
+        alias_index = None
+        if self.ukprn_alias_indexes is not None:
+            alias_index = self.ukprn_alias_indexes.get_index(version)
+
+        if alias_index is None and (self.combined_ukprn_query or self.lookup_executor is not None):
+            if self.combined_ukprn_query:
+                with self.span("combined_query"):
+                    courses_list = self.search_with_pub_ukprn_or_ukprn(institution_id, course_id, mode, version)
+            else:
+                with self.span("speculative_lookup"):
+                    courses_list = self.search_speculatively(institution_id, course_id, mode, version)
+            if not len(courses_list):
+                return None
+            return self.render_course(courses_list)
+
+        # Skip the pub_ukprn query when the alias index shows the
+        # institution_id isn't a pub_ukprn in this dataset version.
+        courses_list = []
+        if alias_index is None or alias_index.is_pub_ukprn(institution_id):
+            with self.span("primary_query"):
+                courses_list = list(
+                    self.search_with_pub_ukprn(
+                        institution_id=institution_id, course_id=course_id, mode=mode, version=version
+                    )
+                )
 
         # If no course matched the arguments passed in return None
         if not len(courses_list):
-            courses_list = self.force_ukprn(institution_id, course_id, mode, version)
+            with self.span("ukprn_fallback"):
+                if alias_index is None:
+                    courses_list = self.force_ukprn(institution_id, course_id, mode, version)
+                else:
+                    courses_list = self.search_with_ukprn_alias(
+                        alias_index, institution_id, course_id, mode, version
+                    )
             if not len(courses_list):
                 return None
 
+        return self.render_course(courses_list)
+
+    def render_course(self, courses_list):
+        """Tidies the course found by a query and serializes it"""
+
         # Log an error if more than one course is returned by query.
         if len(courses_list) > 1:
             # Something's wrong; there should be only one matching course.
@@ -41,47 +263,392 @@ class CourseFetcher:
         # Get the course from the list.
         course = courses_list[0]["widget"]
         # Remove unnecessary keys from the course.
-        course["multiple_subjects"] = self.check_multiple_subjects(course["statistics"])
-        stats = CourseFetcher.tidy_widget_stats(course["statistics"], course["country"])
-        course["statistics"] = stats
+        with self.span("tidy"):
+            course["multiple_subjects"] = self.check_multiple_subjects(course["statistics"])
+            stats = CourseFetcher.tidy_widget_stats(course["statistics"], course["country"])
+            course["statistics"] = stats
         # Convert the course to JSON and return
-        return json.dumps(course)
+        with self.span("serialize"):
+            return self.dumps(course)
+
+    def span(self, name):
+        """Times a block with the request's timer, if it has one"""
+        if self.timer is None:
+            return nullcontext()
+        return self.timer.span(name)
+
+    def cosmos_calls(self):
+        """Records the Cosmos DB responses of a block with the request's timer, if it has one"""
+        if self.timer is None:
+            return nullcontext()
+        return self.timer.cosmos_calls()
+
+    def get_courses(self, version, keys):
+        """Retrieves several courses with a handful of queries.
+
+        Takes (institution_id, course_id, mode) keys and returns a dict
+        mapping each key to the course as get_course would return it, or
+        None if the course wasn't found. Courses missing from the caches
+        are looked up together: one query for the pub_ukprns, and for
+        the misses one query for their ukprns and one more for the
+        pub_ukprns those lead to.
+        """
+        courses = {}
+        pending = []
+        for key in dict.fromkeys(keys):
+            cached, body = self.get_cached_course(version, key)
+            if cached:
+                courses[key] = body
+            else:
+                pending.append(key)
+
+        if pending:
+            found = self.fetch_courses(version, pending)
+            for key in pending:
+                body = found.get(key)
+                self.cache_course(version, key, body)
+                courses[key] = body
+        return courses
+
+    def load_courses(self, version, keys):
+        """Returns courses like get_courses, without the response caches
+
+        For filling the caches for a version before it is served. A
+        version with a snapshot is read from the snapshot and one with a
+        complete widget store from the store, so only versions with
+        neither are queried.
+        """
+        if self.widget_snapshots is not None:
+            snapshot = self.widget_snapshots.get_snapshot(version)
+            if snapshot is not None:
+                bodies = {key: snapshot.get(key) for key in keys}
+                return {key: None if body is None else bytes(body) for key, body in bodies.items()}
+        return self.fetch_courses(version, keys)
+
+    def read_widget_store(self, version, keys):
+        """Returns the keys' widgets from the widget store, or None to query for them
+
+        The store only answers for versions it holds completely. A
+        failed read, such as a throttled one, is logged and the courses
+        are queried instead, as they would be without the store.
+        """
+        if self.widget_store is None:
+            return None
+        try:
+            if not self.widget_store.is_complete(version):
+                return None
+            return {key: self.widget_store.get(version, key) for key in keys}
+        except HTTPFailure as e:
+            logging.warning(f"Reading dataset version {version} from the widget store failed: {e}")
+            return None
+
+    def fetch_courses(self, version, keys):
+        """Queries Cosmos DB for several courses and serializes them"""
+        stored = self.read_widget_store(version, keys)
+        if stored is not None:
+            return stored
+
+        alias_index = None
+        if self.ukprn_alias_indexes is not None:
+            alias_index = self.ukprn_alias_indexes.get_index(version)
+
+        # Same order of lookups as fetch_course, one query per step.
+        pub_ukprns = {
+            key: key[0]
+            for key in keys
+            if alias_index is None or alias_index.is_pub_ukprn(key[0])
+        }
+        found = self.search_batch_with_pub_ukprns(version, pub_ukprns)
+
+        aliases = {}
+        unresolved = []
+        for key in keys:
+            if key in found:
+                continue
+            if alias_index is None:
+                unresolved.append(key)
+                continue
+            alias_pub_ukprns = alias_index.get_pub_ukprns(key[0])
+            if len(alias_pub_ukprns) == 1:
+                aliases[key], = alias_pub_ukprns
+            elif len(alias_pub_ukprns) > 1:
+                unresolved.append(key)
+
+        aliases.update(self.search_batch_with_ukprns(version, unresolved))
+        found.update(self.search_batch_with_pub_ukprns(version, aliases))
+
+        return {key: self.render_course(courses_list) for key, courses_list in found.items()}
+
+    def search_batch_with_pub_ukprns(self, version, pub_ukprns):
+        """Takes a dict of key to pub_ukprn and returns the courses found per key"""
+        if not pub_ukprns:
+            return {}
+        query = self.COURSES_BY_PUB_UKPRNS.bind(
+            institution_ids=sorted(set(pub_ukprns.values())),
+            course_ids=sorted({key[1] for key in pub_ukprns}),
+            modes=sorted({int(key[2]) for key in pub_ukprns}),
+            version=version,
+        )
+        results = {}
+        for item in self.fetch_from_cosmos(query):
+            widget = item["widget"]
+            results.setdefault(
+                (widget.get("institution_id"), widget.get("course_id"), str(widget.get("course_mode"))), []
+            ).append(item)
+
+        found = {}
+        for key, pub_ukprn in pub_ukprns.items():
+            courses_list = results.get((pub_ukprn, key[1], key[2]))
+            if courses_list:
+                # Each key gets its own copy to tidy.
+                found[key] = json.loads(json.dumps(courses_list))
+        return found
+
+    def search_batch_with_ukprns(self, version, keys):
+        """Returns the pub_ukprn of each key found by its ukprn"""
+        if not keys:
+            return {}
+        query = self.PUB_UKPRNS_BY_UKPRNS.bind(
+            institution_ids=sorted({key[0] for key in keys}),
+            course_ids=sorted({key[1] for key in keys}),
+            modes=sorted({int(key[2]) for key in keys}),
+            version=version,
+        )
+        results = {}
+        for item in self.fetch_from_cosmos(query):
+            widget = item["widget"]
+            lookup = (widget.get("institution_id"), widget.get("course_id"), str(widget.get("course_mode")))
+            results.setdefault(lookup, widget["pub_ukprn"])
+        return {key: results[key] for key in keys if key in results}
+
+    def get_version_courses(self, version):
+        """Yields every course in the dataset version, tidied and serialized.
+
+        Yields (keys, body) pairs, where keys are the lookups get_course
+        answers with the body: the course's pub_ukprn key, plus its ukprn
+        key when that differs and isn't the key of another course.
+        """
+        courses = {}
+        ukprns = {}
+        for row in self.fetch_from_cosmos(self.VERSION_COURSE_KEYS.bind(version=version)):
+            key = (row.get("pub_ukprn"), row.get("course_id"), str(row.get("course_mode")))
+            courses[key] = [key]
+            ukprns.setdefault((row.get("ukprn"), key[1], key[2]), key)
+        for alias, key in ukprns.items():
+            if alias not in courses and alias[0] is not None:
+                courses[key].append(alias)
+
+        logging.info("Serializing %d courses for dataset version %s", len(courses), version)
+        for item in self.fetch_from_cosmos(self.VERSION_WIDGETS.bind(version=version)):
+            widget = item["widget"]
+            key = (widget.get("institution_id"), widget.get("course_id"), str(widget.get("course_mode")))
+            keys = courses.pop(key, None)
+            if keys is not None:
+                yield keys, self.render_course([item])
 
     def force_ukprn(self, institution_id: int, course_id: int, mode: int, version):
         ukprn_search = list(self.search_with_ukprn(institution_id=institution_id, course_id=course_id, mode=mode,
                                                    version=version))
+        if not ukprn_search:
+            return []
         pub_ukprn = ukprn_search[0]["widget"]["pub_ukprn"]
         courses_list = list(
             self.search_with_pub_ukprn(institution_id=pub_ukprn, course_id=course_id, mode=mode, version=version)
         )
         return courses_list
 
+    def search_with_pub_ukprn_or_ukprn(self, institution_id, course_id, mode, version):
+        """Finds what search_with_pub_ukprn and then force_ukprn would, in one query
+
+        The courses under the institution_id win, as they do when the
+        lookups run in turn. Otherwise the courses reported by it are
+        returned, for the pub_ukprn of the first, as force_ukprn looks
+        that pub_ukprn up.
+        """
+        if self.course_locator is not None and self.course_locator.document_id_template:
+            # Only a course under the institution_id has the id, so a miss still needs the query
+            documents = self.read_course(institution_id, course_id, mode, version)
+            if documents:
+                return [{"widget": self.project_widget(documents[0])}]
+
+        query = self.COURSE_BY_PUB_UKPRN_OR_UKPRN.bind(
+            institution_id=institution_id, course_id=course_id, mode=int(mode), version=version
+        )
+        results = list(self.query_courses(query, institution_id, course_id, mode, version, by_pub_ukprn=False))
+        matches = [item for item in results if item.get("pub_ukprn_match")]
+        if not matches and results:
+            pub_ukprn = results[0]["widget"].get("pub_ukprn")
+            matches = [item for item in results if item["widget"].get("pub_ukprn") == pub_ukprn]
+        return [{"widget": item["widget"]} for item in matches]
+
+    def search_speculatively(self, institution_id, course_id, mode, version):
+        """Runs the pub_ukprn lookup and force_ukprn at once, rather than in turn
+
+        The ukprn lookup and the pub_ukprn query it leads to run on the
+        lookup executor while the pub_ukprn lookup runs here. Whatever
+        the pub_ukprn lookup finds wins, as it would have without
+        force_ukprn, so a course found by its pub_ukprn takes one round
+        trip and one found by its ukprn two, rather than three.
+        """
+        settled = threading.Event()
+        # Run in a copy of the context, so records logged by the query belong to this request
+        context = contextvars.copy_context()
+        by_ukprn = self.lookup_executor.submit(
+            context.run, self.resolve_ukprn, settled, institution_id, course_id, mode, version
+        )
+        try:
+            courses_list = list(
+                self.search_with_pub_ukprn(
+                    institution_id=institution_id, course_id=course_id, mode=mode, version=version
+                )
+            )
+            if courses_list:
+                return courses_list
+            return by_ukprn.result()
+        finally:
+            # Once answered, or failed, nothing needs the rest of the ukprn lookup
+            settled.set()
+            by_ukprn.cancel()
+
+    def resolve_ukprn(self, settled, institution_id, course_id, mode, version):
+        """force_ukprn, skipping the pub_ukprn query if the course has been found already"""
+        ukprn_search = list(self.search_with_ukprn(institution_id=institution_id, course_id=course_id, mode=mode,
+                                                   version=version))
+        if not ukprn_search:
+            return []
+        pub_ukprn = ukprn_search[0]["widget"]["pub_ukprn"]
+        # The pub_ukprn lookup running alongside answers for the institution_id itself
+        if settled.is_set() or pub_ukprn == institution_id:
+            return []
+        return list(
+            self.search_with_pub_ukprn(institution_id=pub_ukprn, course_id=course_id, mode=mode, version=version)
+        )
+
+    def search_with_ukprn_alias(self, alias_index, institution_id, course_id, mode, version):
+        """Uses the alias index in place of the ukprn query in force_ukprn"""
+        pub_ukprns = alias_index.get_pub_ukprns(institution_id)
+        if not pub_ukprns:
+            return []
+        if len(pub_ukprns) > 1:
+            # Only the course itself says which pub_ukprn it's under.
+            return self.force_ukprn(institution_id, course_id, mode, version)
+        pub_ukprn, = pub_ukprns
+        return list(
+            self.search_with_pub_ukprn(institution_id=pub_ukprn, course_id=course_id, mode=mode, version=version)
+        )
+
+    def get_ukprn_aliases(self, version):
+        """Returns each distinct ukprn and pub_ukprn pair of the courses in the dataset version"""
+        query = self.UKPRN_ALIASES.bind(version=version)
+        logging.info("obtaining ukprn aliases for dataset version %s", version)
+        return self.fetch_from_cosmos(query)
+
     def search_with_ukprn(self, institution_id: int, course_id: int, mode: int, version):
         """Searches with ukprn then uses the pubukprn to search correctly"""
-        query = (
-            'SELECT {"institution_id": c.course.institution.ukprn, "pub_ukprn": c.course.institution.pub_ukprn, "course_id": c.course_id, "course_mode": c.course_mode} AS widget from c '
-            f"where c.course.institution.ukprn = '{institution_id}' "
-            f"and c.course_id = '{course_id}' "
-            f"and c.course_mode = {mode} "
-            f"and c.version = {version} "
+        query = self.PUB_UKPRN_BY_UKPRN.bind(
+            institution_id=institution_id, course_id=course_id, mode=int(mode), version=version
         )
-        logging.info(f"obtaining pubukprn with ukprn")
-        return self.fetch_from_cosmos(query)
+        logging.info("obtaining pubukprn with ukprn")
+        return self.query_courses(query, institution_id, course_id, mode, version, by_pub_ukprn=False)
 
     def search_with_pub_ukprn(self, institution_id: int, course_id: int, mode: int, version):
-        query = (
-            'SELECT {"institution_id": c.course.institution.pub_ukprn, "pub_ukprn": c.course.institution.pub_ukprn, "course_id": c.course_id, "course_name": {"english": c.course.title.english, "welsh": c.course.title.welsh}, "course_mode": c.course_mode, "institution_name":{"english": c.course.institution.pub_ukprn_name, "welsh": c.course.institution.pub_ukprn_welsh_name}, "country": c.course.country, "statistics": { "employment": c.course.statistics.employment, "nss": c.course.statistics.nss} } AS widget from c '
-            f"where c.course.institution.pub_ukprn = '{institution_id}' "
-            f"and c.course_id = '{course_id}' "
-            f"and c.course_mode = {mode} "
-            f"and c.version = {version} "
+        if self.course_locator is not None and self.course_locator.document_id_template:
+            documents = self.read_course(institution_id, course_id, mode, version)
+            if documents is not None:
+                return [{"widget": self.project_widget(document)} for document in documents]
+
+        query = self.COURSE_BY_PUB_UKPRN.bind(
+            institution_id=institution_id, course_id=course_id, mode=int(mode), version=version
         )
-        logging.info(f"query: {query}")
+        return self.query_courses(query, institution_id, course_id, mode, version)
+
+    def query_courses(self, query, institution_id, course_id, mode, version, by_pub_ukprn=True):
+        """Runs a course query, within one partition if the locator allows
+
+        What the single-partition query finds is the answer, as every
+        course with the lookup fields is in that partition; only a query
+        that fails falls back to the cross-partition query. A query that
+        matches institution_id to other than the pub_ukprn, by_pub_ukprn
+        False, finds courses under other institutions, so it runs
+        cross-partition when the partition key is built from it.
+        """
+        if self.course_locator is not None and (by_pub_ukprn or not self.course_locator.keyed_on_institution):
+            partition_key = self.course_locator.partition_key(version, institution_id, course_id, mode)
+            try:
+                return list(self.fetch_from_cosmos(query, partition_key))
+            except HTTPFailure as e:
+                logging.warning(f"Single partition query for {partition_key} failed: {e}")
         return self.fetch_from_cosmos(query)
 
-    def fetch_from_cosmos(self, query):
-        options = {"enableCrossPartitionQuery": True}
-        return self.client.QueryItems(self.collection_link, query, options)
+    def read_course(self, institution_id, course_id, mode, version):
+        """Point reads the course document
+
+        Returns [document], [] when there is no such document, or None
+        when the read can't tell, as it failed or the id template led to
+        another course, and the course has to be queried for.
+        """
+        document_id = self.course_locator.document_id(version, institution_id, course_id, mode)
+        partition_key = self.course_locator.partition_key(version, institution_id, course_id, mode)
+        document_link = f"{self.collection_link}/docs/{document_id}"
+        try:
+            with self.cosmos_calls():
+                document = self.client.ReadItem(document_link, {"partitionKey": partition_key})
+        except HTTPFailure as e:
+            if e.status_code == 404:
+                return []
+            logging.warning(f"Point read of {document_link} failed: {e}")
+            return None
+
+        # Make sure the id template led to the course that was asked for.
+        course = document.get("course", {})
+        if (
+            course.get("institution", {}).get("pub_ukprn") != institution_id
+            or document.get("course_id") != course_id
+            or str(document.get("course_mode")) != str(mode)
+            or document.get("version") != version
+        ):
+            return None
+        return [document]
+
+    @staticmethod
+    def project_widget(document):
+        """Builds the widget search_with_pub_ukprn projects from a course document"""
+        course = document.get("course", {})
+        institution = course.get("institution", {})
+        title = course.get("title", {})
+        statistics = course.get("statistics", {})
+        widget = {
+            "institution_id": institution.get("pub_ukprn"),
+            "pub_ukprn": institution.get("pub_ukprn"),
+            "course_id": document.get("course_id"),
+            "course_name": _defined({"english": title.get("english"), "welsh": title.get("welsh")}),
+            "course_mode": document.get("course_mode"),
+            "institution_name": _defined(
+                {
+                    "english": institution.get("pub_ukprn_name"),
+                    "welsh": institution.get("pub_ukprn_welsh_name"),
+                }
+            ),
+            "country": course.get("country"),
+            "statistics": _defined(
+                {"employment": statistics.get("employment"), "nss": statistics.get("nss")}
+            ),
+        }
+        return _defined(widget)
+
+    def fetch_from_cosmos(self, query, partition_key=None):
+        if partition_key is None:
+            options = {"enableCrossPartitionQuery": True}
+        else:
+            options = {"partitionKey": partition_key}
+        if self.timer is None:
+            return self.client.QueryItems(self.collection_link, query, options)
+
+        # The SDK fetches results lazily, so read them all while the
+        # responses of every page are recorded.
+        options["populateQueryMetrics"] = True
+        with self.cosmos_calls():
+            return list(self.client.QueryItems(self.collection_link, query, options))
 
     @staticmethod
     def check_multiple_subjects(course) -> bool:
@@ -117,3 +684,12 @@ class CourseFetcher:
             n.append(j)
         data["nss"] = n
         return data
+
+
+def _dumps(obj):
+    return json.dumps(obj).encode("utf-8")
+
+
+def _defined(fields):
+    """Drops the fields a document didn't have, as a Cosmos DB projection does"""
+    return {name: value for name, value in fields.items() if value is not None}
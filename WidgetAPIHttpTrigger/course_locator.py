@@ -0,0 +1,51 @@
+import string
+
+# The type each lookup field has in a course document, where version and
+# course_mode are numbers and the ukprns and course id strings.
+FIELD_TYPES = {"version": int, "institution_id": str, "course_id": str, "mode": int}
+
+
+class CourseLocator:
+    """Works out where a course document lives in the courses container.
+
+    The partition key, and optionally the document id, are built from
+    str.format templates over the lookup fields institution_id,
+    course_id, mode and version, for example "{version}" or
+    "{version}-{institution_id}-{course_id}-{mode}". Without a document
+    id template courses can only be found with single-partition queries.
+
+    A partition key template that is a single field, like "{version}",
+    gives the field with the type it has in the documents, so it matches
+    a container partitioned on that path, /version. Any other template
+    gives a string.
+    """
+
+    def __init__(self, partition_key_template, document_id_template=None):
+        self.partition_key_template = partition_key_template
+        self.document_id_template = document_id_template or None
+        fields = list(string.Formatter().parse(partition_key_template))
+        self.partition_key_fields = {field for _, field, _, _ in fields if field is not None}
+        self.partition_key_field = None
+        if len(fields) == 1:
+            literal, field, spec, conversion = fields[0]
+            if not literal and field in FIELD_TYPES and not spec and conversion is None:
+                self.partition_key_field = field
+
+    @property
+    def keyed_on_institution(self):
+        """True if courses are partitioned by the institution they are under"""
+        return "institution_id" in self.partition_key_fields
+
+    def partition_key(self, version, institution_id, course_id, mode):
+        values = dict(version=version, institution_id=institution_id, course_id=course_id, mode=mode)
+        if self.partition_key_field is not None:
+            field = self.partition_key_field
+            return FIELD_TYPES[field](values[field])
+        return self.partition_key_template.format(**values)
+
+    def document_id(self, version, institution_id, course_id, mode):
+        if self.document_id_template is None:
+            return None
+        return self.document_id_template.format(
+            version=version, institution_id=institution_id, course_id=course_id, mode=mode
+        )
@@ -1,18 +1,38 @@
 import os
 import logging
 
+from .course_fetcher import QueryTemplate
+
 
 class DataSetHelper:
+    HIGHEST_SUCCESSFUL_VERSION = "SELECT VALUE MAX(c.version) from c WHERE c.status = 'succeeded'"
+
+    # _ts is when the dataset document was last written, which for a
+    # succeeded dataset is when it was marked as succeeded.
+    VERSION_PUBLISHED_AT = QueryTemplate(
+        "SELECT VALUE c._ts from c WHERE c.version = @version AND c.status = 'succeeded'"
+    )
+
     def __init__(self, client, collection_link):
         self.client = client
         self.collection_link = collection_link
 
     def get_highest_successful_version_number(self):
-        query = "SELECT VALUE MAX(c.version) from c WHERE c.status = 'succeeded'"
         options = {"enableCrossPartitionQuery": True}
         max_version_number_list = list(
-            self.client.QueryItems(self.collection_link, query, options)
+            self.client.QueryItems(
+                self.collection_link, self.HIGHEST_SUCCESSFUL_VERSION, options
+            )
         )
         version = max_version_number_list[0]
         logging.info(f"Highest successful dataset version: {version}")
         return version
+
+    def get_version_published_at(self, version):
+        """Returns when the dataset version succeeded, in seconds since the epoch"""
+        options = {"enableCrossPartitionQuery": True}
+        query = self.VERSION_PUBLISHED_AT.bind(version=version)
+        published_at_list = list(self.client.QueryItems(self.collection_link, query, options))
+        if not published_at_list:
+            return None
+        return published_at_list[0]
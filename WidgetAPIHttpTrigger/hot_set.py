@@ -0,0 +1,156 @@
+import heapq
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# A Mersenne prime for the sketch's row hashes, ((a * hash + b) mod p) mod width
+SKETCH_PRIME = (1 << 61) - 1
+
+
+class HotSetTracker:
+    """Tracks the most requested course keys in bounded memory.
+
+    Request counts are kept in a count-min sketch of depth rows of width
+    counters, so memory doesn't grow with the number of distinct keys;
+    a key's estimate is the smallest of its counters and can only be an
+    overestimate. The capacity keys with the highest estimates are kept
+    as candidates for top, with a heap of their estimates to find the
+    coldest one to replace. Raising a candidate's estimate pushes a new
+    entry and leaves the old one in the heap, to be dropped when it
+    reaches the top, so recording a key stays O(log capacity). Every
+    decay_interval requests all counts are halved, so keys that were
+    hot a while ago give way to the ones that are hot now.
+    """
+
+    def __init__(self, capacity, width=4096, depth=4, decay_interval=100000, seed=None):
+        self.capacity = capacity
+        self.width = width
+        self.decay_interval = decay_interval
+        rng = random.Random(seed)
+        self._hashes = [(rng.randrange(1, SKETCH_PRIME), rng.randrange(SKETCH_PRIME)) for _ in range(depth)]
+        self._rows = [[0] * width for _ in range(depth)]
+        self._candidates = {}
+        self._heap = []
+        self._recorded = 0
+        self._lock = threading.Lock()
+
+    def record(self, key):
+        with self._lock:
+            estimate = None
+            for index, row in zip(self._indexes(key), self._rows):
+                row[index] += 1
+                if estimate is None or row[index] < estimate:
+                    estimate = row[index]
+
+            candidates = self._candidates
+            if key in candidates or len(candidates) < self.capacity:
+                self._set_candidate(key, estimate)
+            elif estimate > self._coldest_estimate():
+                _, coldest = heapq.heappop(self._heap)
+                del candidates[coldest]
+                self._set_candidate(key, estimate)
+
+            self._recorded += 1
+            if self._recorded >= self.decay_interval:
+                self._decay()
+
+    def estimate(self, key):
+        with self._lock:
+            return min(row[index] for index, row in zip(self._indexes(key), self._rows))
+
+    def top(self, count=None):
+        """Returns up to count keys, the most requested first"""
+        with self._lock:
+            ranked = sorted(self._candidates.items(), key=lambda item: -item[1])
+        return [key for key, _ in ranked[:count]]
+
+    def _set_candidate(self, key, estimate):
+        self._candidates[key] = estimate
+        heapq.heappush(self._heap, (estimate, key))
+        # Outdated entries are dropped once they outnumber the candidates
+        if len(self._heap) > 2 * max(self.capacity, 16):
+            self._rebuild_heap()
+
+    def _coldest_estimate(self):
+        """Returns the smallest candidate estimate, leaving its entry on top of the heap"""
+        heap = self._heap
+        while self._candidates.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0]
+
+    def _rebuild_heap(self):
+        self._heap = [(estimate, key) for key, estimate in self._candidates.items()]
+        heapq.heapify(self._heap)
+
+    def _indexes(self, key):
+        h = hash(key) & SKETCH_PRIME
+        return [(a * h + b) % SKETCH_PRIME % self.width for a, b in self._hashes]
+
+    def _decay(self):
+        for row in self._rows:
+            row[:] = [count >> 1 for count in row]
+        self._candidates = {key: count >> 1 for key, count in self._candidates.items() if count > 1}
+        self._rebuild_heap()
+        self._recorded = 0
+
+
+class HotSetPrefetcher:
+    """Fetches the hot set for a new dataset version before it is served.
+
+    Called with the current and the new version when the version cache
+    sees a new one, before it switches to it. The most requested keys
+    are fetched for the new version in batches of batch_size, at most
+    max_workers batches at a time, and added to the response cache
+    alongside the current generation, which keeps serving until the
+    switch. Keys are read from the version's snapshot or widget store
+    when it has one, so only versions served from Cosmos DB are queried.
+    With a response_encoder, each body is also compressed in every
+    coding it offers.
+    """
+
+    def __init__(self, tracker, fetcher_factory, response_cache, count, max_workers=4, batch_size=50,
+                 response_encoder=None):
+        self.tracker = tracker
+        self.fetcher_factory = fetcher_factory
+        self.response_cache = response_cache
+        self.count = count
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.response_encoder = response_encoder
+
+    def prefetch(self, previous_version, version):
+        """Returns the number of courses fetched for the version"""
+        keys = self.tracker.top(self.count)
+        if not keys:
+            return 0
+
+        started = time.perf_counter()
+        batches = [keys[i:i + self.batch_size] for i in range(0, len(keys), self.batch_size)]
+        fetched = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hot-set-prefetch") as executor:
+            for found in executor.map(lambda batch: self.fetch(version, batch), batches):
+                for key, body in found.items():
+                    if body:
+                        self.response_cache.put(version, key, body, prefetch=True)
+                        self.encode(version, key, body)
+                        fetched += 1
+        logging.info(
+            "Prefetched %d of %d hot courses for dataset version %s in %.2fs",
+            fetched, len(keys), version, time.perf_counter() - started,
+        )
+        return fetched
+
+    def encode(self, version, key, body):
+        if self.response_encoder is None:
+            return
+        for encoding in self.response_encoder.encodings:
+            self.response_encoder.encode(version, key, body, encoding, prefetch=True)
+
+    def fetch(self, version, keys):
+        try:
+            return self.fetcher_factory().load_courses(version, keys)
+        except Exception:
+            logging.exception("Prefetching %d hot courses for dataset version %s failed", len(keys), version)
+            return {}
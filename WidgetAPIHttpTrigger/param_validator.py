@@ -0,0 +1,161 @@
+import re
+import threading
+from collections import namedtuple
+
+
+ParameterError = namedtuple("ParameterError", ["name", "message"])
+
+NO_ERRORS = ()
+
+# The keys of an OpenAPI path item that are operations; the others, like
+# parameters, summary and servers, apply to or describe all of them
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+
+
+def load_spec(path):
+    # PyYAML is the slowest import the function makes, so it is only
+    # imported when a spec is loaded, not at cold start
+    import yaml
+
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)  # SafeLoader without libyaml
+    with open(path) as f:
+        return yaml.load(f, Loader=loader)
+
+
+def resolve(spec, item):
+    """Follows a local $ref, e.g. '#/components/parameters/mode'"""
+    while "$ref" in item:
+        node = spec
+        for part in item["$ref"].lstrip("#/").split("/"):
+            node = node[part]
+        item = node
+    return item
+
+
+class ParamChecker:
+    """Checks one string parameter against its OpenAPI schema.
+
+    Supports the string keywords the API uses: minLength, maxLength,
+    pattern and enum. The pattern must match the whole value.
+    """
+
+    def __init__(self, name, required, schema):
+        self.name = name
+        self.required = required
+        self.min_length = schema.get("minLength", 0)
+        self.max_length = schema.get("maxLength")
+        pattern = schema.get("pattern")
+        self.fullmatch = re.compile(pattern).fullmatch if pattern is not None else None
+        enum = schema.get("enum")
+        self.enum = frozenset(enum) if enum is not None else None
+
+    def check(self, value):
+        """Returns the reason the value is invalid, or None if it is valid"""
+        if not isinstance(value, str):
+            return "must be a string"
+        if len(value) < self.min_length:
+            return f"must be at least {self.min_length} characters long"
+        if self.max_length is not None and len(value) > self.max_length:
+            return f"must be at most {self.max_length} characters long"
+        if self.enum is not None and value not in self.enum:
+            return f"must be one of {', '.join(sorted(self.enum))}"
+        if self.fullmatch is not None and self.fullmatch(value) is None:
+            return "contains invalid characters"
+        return None
+
+
+class RouteValidator:
+    """Validates the path parameters of one operation in swagger.yml.
+
+    The operation's parameters are those of its path item, overridden by
+    its own with the same name and location. The parameter definitions
+    are read and their patterns compiled once,
+    so validating a request only runs the precompiled checks. validate
+    returns NO_ERRORS for valid parameters, and only builds a list of
+    ParameterErrors when there is something to report.
+    """
+
+    def __init__(self, spec, path, method):
+        path_item = resolve(spec, spec["paths"][path])
+        operation = path_item[method]
+        parameters = {}
+        for parameter in path_item.get("parameters", []) + operation.get("parameters", []):
+            parameter = resolve(spec, parameter)
+            parameters[parameter["name"], parameter["in"]] = parameter
+        self.checkers = tuple(
+            ParamChecker(parameter["name"], parameter.get("required", False), parameter.get("schema", {}))
+            for parameter in parameters.values()
+            if parameter["in"] == "path"
+        )
+
+    def validate(self, params):
+        errors = NO_ERRORS
+        for checker in self.checkers:
+            value = params.get(checker.name)
+            if value is None:
+                message = "is required" if checker.required else None
+            else:
+                message = checker.check(value)
+            if message is not None:
+                if errors is NO_ERRORS:
+                    errors = []
+                errors.append(ParameterError(checker.name, message))
+        return errors
+
+
+class LazyRouteValidators:
+    """The RouteValidators of every operation in a spec, built on first use.
+
+    Loading the spec parses swagger.yml with PyYAML, so it is left out of
+    the cold start: the first validation loads it, or load() does it
+    ahead of traffic. validator() returns a stand-in for one operation's
+    RouteValidator that can be handed out before the spec is loaded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._validators = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._validators is not None
+
+    def load(self):
+        """Returns the validators keyed by (path, method), loading them the first time"""
+        validators = self._validators
+        if validators is None:
+            with self._lock:
+                if self._validators is None:
+                    self._validators = load_route_validators(self.path)
+                validators = self._validators
+        return validators
+
+    def validator(self, route, method):
+        return LazyRouteValidator(self, route, method)
+
+
+class LazyRouteValidator:
+    """Validates like the RouteValidator of one operation, loading the spec when first asked"""
+
+    def __init__(self, validators, route, method):
+        self.validators = validators
+        self.key = (route, method)
+        self._validator = None
+
+    def validate(self, params):
+        validator = self._validator
+        if validator is None:
+            validator = self._validator = self.validators.load()[self.key]
+        return validator.validate(params)
+
+
+def load_route_validators(path):
+    """Returns a RouteValidator for every operation in the spec, keyed by (path, method)"""
+    spec = load_spec(path)
+    return {
+        (route, method): RouteValidator(spec, route, method)
+        for route, path_item in spec["paths"].items()
+        for method in resolve(spec, path_item)
+        if method in HTTP_METHODS
+    }
@@ -0,0 +1,121 @@
+import contextvars
+import logging
+import random
+import time
+
+# The RequestLog of the request being handled, if any
+current_request_log = contextvars.ContextVar("current_request_log", default=None)
+
+
+class RequestLog:
+    """The INFO records of one request, held back unless it is sampled"""
+
+    def __init__(self, sampled, started):
+        self.sampled = sampled
+        self.started = started
+        self.records = []
+        self.dropped = 0
+        # Each handler filters the same record in turn, but it is held once
+        self.last_record = None
+
+
+class RequestLogSampler(logging.Filter):
+    """Passes the INFO and DEBUG records of a sample of requests.
+
+    start_request decides whether a request is sampled, at sample_rate.
+    Records of requests that aren't are held in the RequestLog instead,
+    and written anyway if the request logs a warning or error, fails or
+    takes longer than slow_request_seconds, so those requests are always
+    logged in full. Warnings, errors and records logged outside a
+    request always pass.
+    """
+
+    def __init__(self, sample_rate, slow_request_seconds, max_held_records=50,
+                 rng=random.random, clock=time.perf_counter):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.slow_request_seconds = slow_request_seconds
+        self.max_held_records = max_held_records
+        self.rng = rng
+        self.clock = clock
+        self.handlers = []
+
+    def start_request(self):
+        """Starts a RequestLog for the current context and returns the token to finish it with"""
+        sampled = self.sample_rate >= 1 or self.rng() < self.sample_rate
+        return current_request_log.set(RequestLog(sampled, self.clock()))
+
+    def finish_request(self, token, status_code=None):
+        """Writes the held records if the request failed or was slow, and ends its RequestLog"""
+        request_log = current_request_log.get()
+        try:
+            if request_log is not None and not request_log.sampled:
+                slow = self.clock() - request_log.started >= self.slow_request_seconds
+                failed = status_code is None or status_code >= 500
+                if slow or failed:
+                    self.release(request_log)
+        finally:
+            current_request_log.reset(token)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            request_log = current_request_log.get()
+            if request_log is not None and not request_log.sampled:
+                self.release(request_log)
+            return True
+        request_log = current_request_log.get()
+        if request_log is None or request_log.sampled:
+            return True
+        if record is request_log.last_record:
+            return False
+        request_log.last_record = record
+        if len(request_log.records) < self.max_held_records:
+            request_log.records.append(record)
+        else:
+            request_log.dropped += 1
+        return False
+
+    def release(self, request_log):
+        """Writes the records held for a request and passes the rest of its records"""
+        request_log.sampled = True
+        records, request_log.records = request_log.records, []
+        if request_log.dropped:
+            records.append(logging.makeLogRecord({
+                "name": __name__,
+                "msg": "%d more INFO records were not kept for this request",
+                "args": (request_log.dropped,),
+                "levelno": logging.INFO,
+                "levelname": "INFO",
+            }))
+            request_log.dropped = 0
+        for record in records:
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+
+def install_sampled_logging(sampler, logger=None):
+    """Adds sampler as a filter to each of the logger's handlers.
+
+    The handlers stay where they are and write on the thread that logs,
+    so they see the invocation the record was logged in, as the Azure
+    Functions worker's handler needs to. Records held back and then
+    released are written on the thread that releases them, in the same
+    invocation. Installing again replaces the previous installation.
+    """
+    logger = logger or logging.getLogger()
+    uninstall_sampled_logging(logger)
+
+    sampler.handlers = logger.handlers[:]
+    for handler in sampler.handlers:
+        handler.addFilter(sampler)
+    return sampler
+
+
+def uninstall_sampled_logging(logger=None):
+    """Removes the sampler from the logger's handlers"""
+    logger = logger or logging.getLogger()
+    for handler in logger.handlers:
+        # Looked up by attribute, as the module may have been imported again since
+        for existing in [f for f in handler.filters if hasattr(f, "finish_request")]:
+            handler.removeFilter(existing)
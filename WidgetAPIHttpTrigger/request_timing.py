@@ -0,0 +1,146 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+REQUEST_CHARGE_HEADER = "x-ms-request-charge"
+QUERY_METRICS_HEADER = "x-ms-documentdb-query-metrics"
+
+# Query metrics that are summed over the Cosmos DB calls of a request
+QUERY_METRICS = ("totalExecutionTimeInMs", "retrievedDocumentCount", "outputDocumentCount")
+
+# The timer of the Cosmos DB calls made in the current context, if any
+_cosmos_timer = contextvars.ContextVar("cosmos_timer", default=None)
+
+
+def parse_query_metrics(value):
+    """Parses a "name=value;name=value" query metrics header into a dict"""
+    metrics = {}
+    for item in value.split(";"):
+        name, _, number = item.partition("=")
+        try:
+            metrics[name.strip()] = float(number)
+        except ValueError:
+            continue
+    return metrics
+
+
+class RequestTimer:
+    """Times the stages of one request and the Cosmos DB calls it makes.
+
+    span adds the time spent in a block to a named stage; a stage
+    entered more than once accumulates. record_cosmos reads the request
+    charge and query metrics from the headers of a Cosmos DB response,
+    and is called for every response of the calls made in cosmos_calls.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.stages = {}
+        self.cosmos_requests = 0
+        self.request_charge = 0.0
+        self.query_metrics = {}
+        # Cosmos DB calls of one request can run on more than one thread
+        self._cosmos_lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + self.clock() - start
+
+    @contextmanager
+    def cosmos_calls(self):
+        """Records the response of every Cosmos DB call made in the block
+
+        The client's last_response_headers only hold the last response
+        of the last call made on any thread, so the responses are taken
+        as they arrive instead, by the hook capture_cosmos_responses adds.
+        """
+        token = _cosmos_timer.set(self)
+        try:
+            yield
+        finally:
+            _cosmos_timer.reset(token)
+
+    def record_cosmos(self, headers):
+        with self._cosmos_lock:
+            self.cosmos_requests += 1
+            if not headers:
+                return
+            try:
+                self.request_charge += float(headers.get(REQUEST_CHARGE_HEADER, 0))
+            except ValueError:
+                pass
+            metrics = headers.get(QUERY_METRICS_HEADER)
+            if metrics:
+                parsed = parse_query_metrics(metrics)
+                for name in QUERY_METRICS:
+                    if name in parsed:
+                        self.query_metrics[name] = self.query_metrics.get(name, 0.0) + parsed[name]
+
+    def elapsed(self):
+        return self.clock() - self.started
+
+    def server_timing(self):
+        """Returns the stages as a Server-Timing header value"""
+        timings = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        timings.append(f'cosmos;desc="{self.request_charge:.2f} RU"')
+        timings.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(timings)
+
+    def summary(self, **fields):
+        """Returns the timings as a dict for one structured log line"""
+        summary = dict(fields)
+        summary["total_ms"] = round(self.elapsed() * 1000, 3)
+        summary["stages_ms"] = {name: round(s * 1000, 3) for name, s in self.stages.items()}
+        summary["cosmos_requests"] = self.cosmos_requests
+        summary["request_charge"] = round(self.request_charge, 2)
+        if self.query_metrics:
+            summary["query_metrics"] = self.query_metrics
+        return summary
+
+
+def span(timer, name):
+    """Times a block with the timer, or does nothing if timing is off"""
+    if timer is None:
+        return nullcontext()
+    return timer.span(name)
+
+
+def record_cosmos_response(response, *args, **kwargs):
+    """A requests response hook passing the response to the timer of the call that made it"""
+    timer = _cosmos_timer.get()
+    if timer is not None:
+        timer.record_cosmos(response.headers)
+
+
+def capture_cosmos_responses(client):
+    """Hooks every HTTP response of the Cosmos DB client, for cosmos_calls
+
+    The SDK sends its requests on the calling thread through one
+    requests session, whose hooks see every page of a query and every
+    throttled attempt, not only the last response of a call.
+    """
+    session = getattr(client, "_requests_session", None)
+    if session is not None and record_cosmos_response not in session.hooks["response"]:
+        session.hooks["response"].append(record_cosmos_response)
+
+
+class JsonMessage:
+    """Serializes its value when the log record is formatted, not when it is logged"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return json.dumps(self.value)
+
+
+def log_request_timing(timer, **fields):
+    logging.info("request_timing %s", JsonMessage(timer.summary(**fields)))
@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Bounded LRU cache of serialized widget responses.
+
+    Entries are keyed by dataset version and course key, where the course
+    key is the (institution_id, course_id, mode) tuple from the route. A
+    response can't change within a dataset version, so entries never
+    expire; they are evicted least recently used first once either the
+    entry count or the byte budget for the bodies is exceeded. Caching an
+    entry for a newer dataset version drops every entry belonging to the
+    older versions in one go, unless it is prefetched: prefetched entries
+    for a newer version are held alongside the current generation until
+    the first ordinary entry for that version retires it.
+
+    A max_entries or max_bytes of zero or less disables the cache.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = max_entries > 0 and max_bytes > 0
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, version, key):
+        """Returns the cached body for the course, or None on a miss"""
+        with self._lock:
+            body = self._entries.get((version, key))
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((version, key))
+            self.hits += 1
+            return body
+
+    def put(self, version, key, body, prefetch=False):
+        """Caches the body, evicting older entries if necessary"""
+        if not self.enabled or len(body) > self.max_bytes:
+            return
+
+        with self._lock:
+            if self.version is None or version > self.version:
+                if prefetch:
+                    self._store(version, key, body)
+                    return
+                self._drop_generations_before(version)
+                self.version = version
+            elif version < self.version:
+                # A request that started before the version moved on.
+                return
+            self._store(version, key, body)
+
+    def stats(self):
+        """Returns the cache counters and current size"""
+        with self._lock:
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _store(self, version, key, body):
+        previous = self._entries.pop((version, key), None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[(version, key)] = body
+        self._bytes += len(body)
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def _drop_generations_before(self, version):
+        for entry_key in [k for k in self._entries if k[0] < version]:
+            self._bytes -= len(self._entries.pop(entry_key))
+
+
+class NegativeCache:
+    """Bounded cache of course keys that were not found.
+
+    Remembers the (institution_id, course_id, mode) keys that returned no
+    course for a dataset version, so repeated requests for courses that
+    don't exist can be answered without querying Cosmos DB again. Entries
+    expire after the TTL and the least recently added entry is dropped
+    once max_entries is reached. Adding a key for a newer dataset version
+    clears the keys recorded for older versions.
+
+    A max_entries or ttl_seconds of zero or less disables the cache.
+    """
+
+    def __init__(self, max_entries, ttl_seconds, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.enabled = max_entries > 0 and ttl_seconds > 0
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._expiry_times = OrderedDict()
+        self._lock = threading.Lock()
+
+    def contains(self, version, key):
+        """Returns True if the course is known not to exist"""
+        with self._lock:
+            if version != self.version or key not in self._expiry_times:
+                self.misses += 1
+                return False
+            if self._expiry_times[key] <= self.clock():
+                del self._expiry_times[key]
+                self.misses += 1
+                return False
+            self.hits += 1
+            return True
+
+    def add(self, version, key):
+        """Records that the course was not found in the dataset version"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if self.version is None or version > self.version:
+                self._expiry_times.clear()
+                self.version = version
+            elif version < self.version:
+                return
+
+            self._expiry_times.pop(key, None)
+            self._expiry_times[key] = self.clock() + self.ttl_seconds
+            while len(self._expiry_times) > self.max_entries:
+                self._expiry_times.popitem(last=False)
+
+    def stats(self):
+        """Returns the cache counters and current size"""
+        with self._lock:
+            return {
+                "version": self.version,
+                "entries": len(self._expiry_times),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
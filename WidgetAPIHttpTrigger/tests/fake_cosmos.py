@@ -0,0 +1,661 @@
+"""In-memory stand-in for the parts of the Cosmos DB client the API uses.
+
+FakeCosmosClient implements QueryItems, ReadItem and UpsertItem from
+azure.cosmos.cosmos_client.CosmosClient over documents held in memory,
+so lookups can be exercised and measured without a Cosmos DB account.
+
+Queries are evaluated by a small interpreter for the subset of the
+Cosmos DB SQL dialect the API sends: SELECT [DISTINCT] [TOP n] [VALUE] with object
+literal, aliased-path or aggregate (MAX, MIN, COUNT) projections, FROM c,
+and WHERE clauses built from comparisons, IN, AND, OR, NOT and the
+ARRAY_CONTAINS, ARRAY_LENGTH and IS_DEFINED functions. Query text can be
+a string or a {"query": ..., "parameters": [...]} dict.
+
+Each collection is spread over a number of physical partitions by
+partition key, read from partition_key_path, /version as the courses
+and datasets containers are partitioned, or from the collection's own
+path in partition_key_paths. As in Cosmos DB a partition key only
+matches a value of the same type, so 3 and "3" are different keys.
+Every call records an approximate request charge in
+last_response_headers["x-ms-request-charge"] and in the running totals,
+using a simple model of Cosmos DB pricing: a query costs a fixed amount
+for each physical partition it visits plus an amount per KB returned,
+a point read costs 1 RU per KB returned and a write 5 RU per KB
+written. Setting latency_seconds makes each call sleep for that long
+per physical partition it visits, as the SDK fetches cross-partition
+results one partition at a time. Queries with populateQueryMetrics set
+also return x-ms-documentdb-query-metrics.
+
+As with the SDK, last_response_headers only hold the last response of
+a call: a query answers with a page, and a share of the charge, per
+physical partition it visits. Each page, 404 and 429 is passed to the
+response hooks of _requests_session, the requests session the SDK sends
+every request through.
+
+Setting throttle_rate answers that share of calls with 429 (request rate
+too large) and an x-ms-retry-after-ms of retry_after_ms, retried with
+the SDK's own throttle retry policy configured from the connection
+policy the client was made with, so the effect of a connection profile
+on latency under throttling can be measured. A call whose retries run
+out raises the HTTPFailure the SDK would.
+
+Equality conditions ANDed together at the top of a WHERE clause, like
+c.version = @version, are answered from a hash index built per path on
+first use, so queries over large corpora don't scan every document in
+Python. The index only narrows the documents the WHERE clause is then
+evaluated on; results, order and request charges are the same as a scan.
+"""
+
+import copy
+import json
+import math
+import random
+import re
+import time
+import zlib
+
+import azure.cosmos.documents as documents
+import requests
+from azure.cosmos.errors import HTTPFailure
+from azure.cosmos.http_constants import HttpHeaders
+from azure.cosmos.resource_throttle_retry_policy import _ResourceThrottleRetryPolicy
+
+
+QUERY_RU_PER_PARTITION = 2.8
+QUERY_RU_PER_KB = 0.4
+READ_RU_PER_KB = 1.0
+WRITE_RU_PER_KB = 5.0
+
+
+class Undefined:
+    """The value of a property that a document doesn't have"""
+
+    def __repr__(self):
+        return "undefined"
+
+
+UNDEFINED = Undefined()
+
+
+class FakeCosmosClient:
+    def __init__(self, partition_key_path="/version", physical_partitions=4, latency_seconds=0.0,
+                 throttle_rate=0.0, retry_after_ms=100, seed=None, partition_key_paths=None):
+        self.partition_key_path = partition_key_path
+        self.partition_key_paths = dict(partition_key_paths or {})
+        self.physical_partitions = physical_partitions
+        self.latency_seconds = latency_seconds
+        self.throttle_rate = throttle_rate
+        self.retry_after_ms = retry_after_ms
+        self.connection_policy = documents.ConnectionPolicy()
+        self.consistency_level = documents.ConsistencyLevel.Session
+        self.collections = {}
+        self.last_response_headers = None
+        # Only its response hooks are used, which see every response as the SDK's session does
+        self._requests_session = requests.Session()
+        self.request_count = 0
+        self.request_charge = 0.0
+        self.partitions_visited = 0
+        self.throttled_count = 0
+        self._rng = random.Random(seed)
+        self._parsed_queries = {}
+        self._indexes = {}
+
+    def connect(self, url_connection, auth, connection_policy=None, consistency_level="Session"):
+        """Stands in for the CosmosClient constructor, keeping its connection settings"""
+        if connection_policy is not None:
+            self.connection_policy = connection_policy
+        self.consistency_level = consistency_level
+        return self
+
+    def add_documents(self, collection_link, documents):
+        collection = self.collections.setdefault(
+            collection_link, [[] for _ in range(self.physical_partitions)]
+        )
+        for document in documents:
+            partition_key = self.get_partition_key(collection_link, document)
+            collection[self.physical_partition(partition_key)].append(document)
+        self.drop_indexes(collection_link)
+
+    def reset_stats(self):
+        self.request_count = 0
+        self.request_charge = 0.0
+        self.partitions_visited = 0
+        self.throttled_count = 0
+
+    def throttle(self):
+        """Answers with 429 at throttle_rate, retrying as the SDK's retry utility does"""
+        if not self.throttle_rate:
+            return
+        options = self.connection_policy.RetryOptions
+        policy = _ResourceThrottleRetryPolicy(
+            options.MaxRetryAttemptCount, options.FixedRetryIntervalInMilliseconds, options.MaxWaitTimeInSeconds
+        )
+        while self._rng.random() < self.throttle_rate:
+            self.throttled_count += 1
+            if self.latency_seconds:
+                time.sleep(self.latency_seconds)
+            error = HTTPFailure(
+                429, "Request rate is large", {HttpHeaders.RetryAfterInMilliseconds: str(self.retry_after_ms)}
+            )
+            self.respond(429, error.headers)
+            if not policy.ShouldRetry(error):
+                self.last_response_headers = {
+                    HttpHeaders.ThrottleRetryCount: policy.current_retry_attempt_count,
+                    HttpHeaders.ThrottleRetryWaitTimeInMs: policy.cummulative_wait_time_in_milliseconds,
+                }
+                raise error
+            time.sleep(policy.retry_after_in_milliseconds / 1000)
+
+    def get_partition_key(self, collection_link, document):
+        path = self.partition_key_paths.get(collection_link, self.partition_key_path)
+        value = document
+        for name in path.strip("/").split("/"):
+            value = value.get(name) if isinstance(value, dict) else None
+        return value
+
+    def physical_partition(self, partition_key):
+        return zlib.crc32(json.dumps(partition_key).encode()) % self.physical_partitions
+
+    def QueryItems(self, database_or_Container_link, query, options=None, partition_key=None):
+        options = options or {}
+        self.throttle()
+        parameters = {}
+        if isinstance(query, dict):
+            parameters = {p["name"]: p["value"] for p in query.get("parameters", [])}
+            query = query["query"]
+
+        parsed = self._parsed_queries.get(query)
+        if parsed is None:
+            parsed = self._parsed_queries[query] = SqlQuery(query)
+
+        partitions = self.collections.get(database_or_Container_link, [])
+        if "partitionKey" in options:
+            partition_key = options["partitionKey"]
+            index = self.physical_partition(partition_key)
+            candidates = [partitions[index]] if partitions else []
+            candidates = self.indexed_candidates(database_or_Container_link, parsed, parameters, candidates)
+            documents = [
+                d for d in candidates[0] if self.get_partition_key(database_or_Container_link, d) == partition_key
+            ] if candidates else []
+            visited = 1
+        elif options.get("enableCrossPartitionQuery"):
+            candidates = self.indexed_candidates(database_or_Container_link, parsed, parameters, partitions)
+            documents = [d for partition in candidates for d in partition]
+            visited = max(len(partitions), 1)
+        else:
+            raise HTTPFailure(
+                400, "Cross partition query is required but disabled. Please set x-ms-documentdb-query-enablecrosspartition to true."
+            )
+
+        results = parsed.run(documents, parameters)
+        results = json.loads(json.dumps(results))
+        body_size = len(json.dumps(results))
+        charge = visited * QUERY_RU_PER_PARTITION + body_size / 1024 * QUERY_RU_PER_KB
+        headers = {}
+        if options.get("populateQueryMetrics"):
+            headers["x-ms-documentdb-query-metrics"] = (
+                f"retrievedDocumentCount={len(documents)};"
+                f"outputDocumentCount={len(results)};"
+                f"totalExecutionTimeInMs={self.latency_seconds * visited * 1000:.2f}"
+            )
+        self.record(charge, visited, headers)
+        return results
+
+    def ReadItem(self, document_link, options=None):
+        options = options or {}
+        self.throttle()
+        collection_link, _, document_id = document_link.rpartition("/docs/")
+        if "partitionKey" not in options:
+            raise HTTPFailure(400, "PartitionKey value must be supplied for this operation.")
+        partition_key = options["partitionKey"]
+
+        partitions = self.collections.get(collection_link, [])
+        documents = partitions[self.physical_partition(partition_key)] if partitions else []
+        for document in documents:
+            if document.get("id") == document_id and self.get_partition_key(collection_link, document) == partition_key:
+                result = copy.deepcopy(document)
+                self.record(max(1.0, math.ceil(len(json.dumps(result)) / 1024) * READ_RU_PER_KB), 1)
+                return result
+
+        self.record(1.0, 1, status_code=404)
+        raise HTTPFailure(404, "Entity with the specified id does not exist in the system.")
+
+    def UpsertItem(self, database_or_Container_link, document, options=None):
+        self.throttle()
+        document = copy.deepcopy(document)
+        partition_key = self.get_partition_key(database_or_Container_link, document)
+        partitions = self.collections.setdefault(
+            database_or_Container_link, [[] for _ in range(self.physical_partitions)]
+        )
+        documents = partitions[self.physical_partition(partition_key)]
+        documents[:] = [
+            d for d in documents
+            if d.get("id") != document.get("id")
+            or self.get_partition_key(database_or_Container_link, d) != partition_key
+        ]
+        documents.append(document)
+        self.drop_indexes(database_or_Container_link)
+        self.record(max(1.0, math.ceil(len(json.dumps(document)) / 1024) * WRITE_RU_PER_KB), 1)
+        return copy.deepcopy(document)
+
+    def drop_indexes(self, collection_link):
+        for key in [key for key in self._indexes if key[0] == collection_link]:
+            del self._indexes[key]
+
+    def get_index(self, collection_link, path, partition_documents):
+        """Returns {index_key(value): [document, ...]} for one physical partition"""
+        key = (collection_link, path, id(partition_documents))
+        index = self._indexes.get(key)
+        if index is None:
+            index = {}
+            expression = ("path", list(path))
+            for document in partition_documents:
+                value = index_key(evaluate(expression, document, {}))
+                if value is not None:
+                    index.setdefault(value, []).append(document)
+            self._indexes[key] = index
+        return index
+
+    def indexed_candidates(self, collection_link, parsed, parameters, partitions):
+        """Narrows each partition to the documents matching the query's
+        indexable equalities, keeping their order; leaves them as they are
+        if the query has none."""
+        lookups = []
+        for path, operand in parsed.equalities:
+            value = index_key(evaluate(operand, None, parameters))
+            if value is not None:
+                lookups.append((path, value))
+        if not lookups:
+            return partitions
+        narrowed = []
+        for partition_documents in partitions:
+            best = None
+            for path, value in lookups:
+                matches = self.get_index(collection_link, path, partition_documents).get(value, [])
+                if best is None or len(matches) < len(best):
+                    best = matches
+            narrowed.append(best)
+        return narrowed
+
+    def record(self, charge, visited, headers=None, status_code=200):
+        self.request_count += 1
+        self.request_charge += charge
+        self.partitions_visited += visited
+        # The SDK fetches a page from each physical partition a query
+        # visits, each its own response; the last is left in
+        # last_response_headers and the headers go with it.
+        for page in range(visited):
+            page_headers = {"x-ms-request-charge": f"{charge / visited:.2f}"}
+            if page == visited - 1:
+                page_headers.update(headers or {})
+            self.last_response_headers = page_headers
+            self.respond(status_code, page_headers)
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds * visited)
+
+    def respond(self, status_code, headers):
+        """Passes a response to the session's response hooks, as requests would"""
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers)
+        requests.hooks.dispatch_hook("response", self._requests_session.hooks, response)
+
+
+TOKEN_PATTERN = re.compile(
+    r"""\s*(?:
+        (?P<number>-?\d+(?:\.\d+)?)
+        |(?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+        |(?P<param>@\w+)
+        |(?P<name>[A-Za-z_]\w*)
+        |(?P<op><=|>=|!=|<>|[=<>{}\[\](),.:*])
+    )""",
+    re.VERBOSE,
+)
+
+KEYWORDS = {
+    "SELECT", "DISTINCT", "TOP", "VALUE", "AS", "FROM", "WHERE", "AND", "OR", "NOT", "IN",
+    "TRUE", "FALSE", "NULL",
+}
+AGGREGATES = {"MAX", "MIN", "COUNT"}
+
+
+def tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if not match:
+            raise HTTPFailure(400, f"Syntax error near {text[position:position + 20]!r}")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "name" and value.upper() in KEYWORDS:
+            kind, value = "keyword", value.upper()
+        elif kind == "string":
+            value = re.sub(r"\\(.)", r"\1", value[1:-1])
+        elif kind == "number":
+            value = float(value) if "." in value else int(value)
+        tokens.append((kind, value))
+    return tokens
+
+
+class SqlQuery:
+    """Parses a query once and runs it over a list of documents"""
+
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.position = 0
+        self.distinct = False
+        self.top = None
+        self.value = False
+        self.projections = []
+        self.where = None
+        self.parse()
+        self.equalities = list(find_equalities(self.where)) if self.where is not None else []
+
+    def run(self, documents, parameters):
+        matched = [
+            d for d in documents
+            if self.where is None or evaluate(self.where, d, parameters) is True
+        ]
+
+        if self.is_aggregate():
+            _, (name, argument) = self.projections[0][0]
+            values = [evaluate(argument, d, parameters) for d in matched]
+            values = [v for v in values if v is not UNDEFINED]
+            if name == "COUNT":
+                return [len(values)]
+            if not values:
+                return []
+            return [max(values) if name == "MAX" else min(values)]
+
+        results = []
+        seen = set()
+        for document in matched:
+            if self.value:
+                result = evaluate(self.projections[0][0], document, parameters)
+            elif self.projections == [("*", None)]:
+                result = document
+            else:
+                result = {}
+                for expression, alias in self.projections:
+                    value = evaluate(expression, document, parameters)
+                    if value is not UNDEFINED:
+                        result[alias] = value
+            if result is UNDEFINED:
+                continue
+            if self.distinct:
+                identity = json.dumps(result, sort_keys=True)
+                if identity in seen:
+                    continue
+                seen.add(identity)
+            results.append(result)
+            if self.top is not None and len(results) == self.top:
+                break
+        return results
+
+    def is_aggregate(self):
+        return self.projections and self.projections[0][0][0] == "aggregate"
+
+    def parse(self):
+        self.expect("keyword", "SELECT")
+        if self.accept("keyword", "DISTINCT"):
+            self.distinct = True
+        if self.accept("keyword", "TOP"):
+            self.top = self.next()[1]
+        if self.accept("keyword", "VALUE"):
+            self.value = True
+
+        if self.accept("op", "*"):
+            self.projections.append(("*", None))
+        else:
+            while True:
+                expression = self.parse_expression()
+                alias = None
+                if self.accept("keyword", "AS"):
+                    alias = self.next()[1]
+                elif expression[0] == "path":
+                    alias = expression[1][-1]
+                self.projections.append((expression, alias))
+                if not self.accept("op", ","):
+                    break
+
+        self.expect("keyword", "FROM")
+        self.next()
+        if self.accept("keyword", "WHERE"):
+            self.where = self.parse_expression()
+        if self.position != len(self.tokens):
+            raise HTTPFailure(400, f"Unexpected token {self.tokens[self.position]!r}")
+
+    def parse_expression(self):
+        left = self.parse_and()
+        while self.accept("keyword", "OR"):
+            left = ("or", left, self.parse_and())
+        return left
+
+    def parse_and(self):
+        left = self.parse_not()
+        while self.accept("keyword", "AND"):
+            left = ("and", left, self.parse_not())
+        return left
+
+    def parse_not(self):
+        if self.accept("keyword", "NOT"):
+            return ("not", self.parse_not())
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        left = self.parse_primary()
+        if self.accept("keyword", "IN"):
+            self.expect("op", "(")
+            values = [self.parse_expression()]
+            while self.accept("op", ","):
+                values.append(self.parse_expression())
+            self.expect("op", ")")
+            return ("in", left, values)
+        kind, value = self.peek()
+        if kind == "op" and value in ("=", "!=", "<>", "<", ">", "<=", ">="):
+            self.next()
+            return ("compare", value, left, self.parse_primary())
+        return left
+
+    def parse_primary(self):
+        kind, value = self.next()
+        if kind in ("number", "string"):
+            return ("literal", value)
+        if kind == "keyword" and value in ("TRUE", "FALSE", "NULL"):
+            return ("literal", {"TRUE": True, "FALSE": False, "NULL": None}[value])
+        if kind == "param":
+            return ("param", value)
+        if kind == "op" and value == "(":
+            expression = self.parse_expression()
+            self.expect("op", ")")
+            return expression
+        if kind == "op" and value == "{":
+            fields = []
+            while not self.accept("op", "}"):
+                name = self.next()[1]
+                self.expect("op", ":")
+                fields.append((name, self.parse_expression()))
+                self.accept("op", ",")
+            return ("object", fields)
+        if kind == "op" and value == "[":
+            items = []
+            while not self.accept("op", "]"):
+                items.append(self.parse_expression())
+                self.accept("op", ",")
+            return ("array", items)
+        if kind == "name" and self.peek() == ("op", "("):
+            self.next()
+            arguments = []
+            while not self.accept("op", ")"):
+                arguments.append(self.parse_expression())
+                self.accept("op", ",")
+            if value.upper() in AGGREGATES:
+                return ("aggregate", (value.upper(), arguments[0]))
+            return ("function", value.upper(), arguments)
+        if kind == "name":
+            path = []
+            while True:
+                if self.accept("op", "."):
+                    path.append(self.next()[1])
+                elif self.accept("op", "["):
+                    path.append(self.next()[1])
+                    self.expect("op", "]")
+                else:
+                    return ("path", path)
+        raise HTTPFailure(400, f"Unexpected token {value!r}")
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def next(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def accept(self, kind, value):
+        if self.peek() == (kind, value):
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, kind, value):
+        if not self.accept(kind, value):
+            raise HTTPFailure(400, f"Expected {value} but found {self.peek()[1]!r}")
+
+
+def evaluate(expression, document, parameters):
+    kind = expression[0]
+    if kind == "literal":
+        return expression[1]
+    if kind == "param":
+        return parameters.get(expression[1], UNDEFINED)
+    if kind == "path":
+        value = document
+        for name in expression[1]:
+            if isinstance(value, dict) and isinstance(name, str) and name in value:
+                value = value[name]
+            elif isinstance(value, list) and isinstance(name, int) and 0 <= name < len(value):
+                value = value[name]
+            else:
+                return UNDEFINED
+        return value
+    if kind == "object":
+        result = {}
+        for name, field in expression[1]:
+            value = evaluate(field, document, parameters)
+            if value is not UNDEFINED:
+                result[name] = value
+        return result
+    if kind == "array":
+        values = [evaluate(item, document, parameters) for item in expression[1]]
+        return [v for v in values if v is not UNDEFINED]
+    if kind == "and":
+        left = evaluate(expression[1], document, parameters)
+        if left is False:
+            return False
+        right = evaluate(expression[2], document, parameters)
+        if left is True and right is True:
+            return True
+        return False if right is False else UNDEFINED
+    if kind == "or":
+        left = evaluate(expression[1], document, parameters)
+        if left is True:
+            return True
+        right = evaluate(expression[2], document, parameters)
+        if right is True:
+            return True
+        return False if left is False and right is False else UNDEFINED
+    if kind == "not":
+        value = evaluate(expression[1], document, parameters)
+        return (not value) if isinstance(value, bool) else UNDEFINED
+    if kind == "in":
+        value = evaluate(expression[1], document, parameters)
+        if value is UNDEFINED:
+            return UNDEFINED
+        candidates = [evaluate(item, document, parameters) for item in expression[2]]
+        return any(same_value(value, candidate) for candidate in candidates)
+    if kind == "compare":
+        return compare(
+            expression[1],
+            evaluate(expression[2], document, parameters),
+            evaluate(expression[3], document, parameters),
+        )
+    if kind == "function":
+        arguments = [evaluate(a, document, parameters) for a in expression[2]]
+        return call_function(expression[1], arguments)
+    raise HTTPFailure(400, f"Aggregate {expression[1][0]} can only be used with SELECT VALUE")
+
+
+def find_equalities(expression):
+    """Yields (path, operand) for each path = literal or parameter
+    comparison that must hold for the whole expression to be true"""
+    if expression[0] == "and":
+        yield from find_equalities(expression[1])
+        yield from find_equalities(expression[2])
+    elif expression[0] == "compare" and expression[1] == "=":
+        left, right = expression[2], expression[3]
+        if right[0] == "path":
+            left, right = right, left
+        if (
+            left[0] == "path" and right[0] in ("literal", "param")
+            and all(isinstance(name, str) for name in left[1])
+        ):
+            yield tuple(left[1]), right
+
+
+def index_key(value):
+    """Returns a hashable key that is equal for values same_value treats
+    as equal, or None for values that aren't indexed"""
+    if isinstance(value, bool):
+        return ("bool", value)
+    if isinstance(value, (int, float)):
+        return ("number", value)
+    if isinstance(value, str):
+        return ("string", value)
+    return None
+
+
+def same_value(left, right):
+    """Equality without Python's 1 == True and 1 == 1.0 == "1" confusion"""
+    if isinstance(left, bool) or isinstance(right, bool):
+        return type(left) is type(right) and left == right
+    if isinstance(left, (int, float)) and isinstance(right, (int, float)):
+        return left == right
+    return type(left) is type(right) and left == right
+
+
+def compare(operator, left, right):
+    if left is UNDEFINED or right is UNDEFINED:
+        return UNDEFINED
+    if operator == "=":
+        return same_value(left, right)
+    if operator in ("!=", "<>"):
+        return not same_value(left, right)
+    numbers = all(
+        isinstance(v, (int, float)) and not isinstance(v, bool) for v in (left, right)
+    )
+    if not numbers and not (isinstance(left, str) and isinstance(right, str)):
+        return UNDEFINED
+    return {
+        "<": left < right,
+        ">": left > right,
+        "<=": left <= right,
+        ">=": left >= right,
+    }[operator]
+
+
+def call_function(name, arguments):
+    if name == "IS_DEFINED":
+        return arguments[0] is not UNDEFINED
+    if name == "ARRAY_LENGTH":
+        return len(arguments[0]) if isinstance(arguments[0], list) else UNDEFINED
+    if name == "ARRAY_CONTAINS":
+        if not isinstance(arguments[0], list) or arguments[1] is UNDEFINED:
+            return UNDEFINED
+        return any(same_value(item, arguments[1]) for item in arguments[0])
+    raise HTTPFailure(400, f"Unsupported function {name}")
@@ -0,0 +1,154 @@
+"""Fixtures shared by the tests and the benchmarks
+
+The function app is loaded against the in-memory Cosmos DB stand-in in
+fake_cosmos.py, so neither needs a Cosmos DB account.
+"""
+
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+
+import azure.cosmos.cosmos_client as cosmos_client
+import azure.functions as func
+
+DEFAULT_SETTINGS = {
+    "AzureCosmosDbUri": "https://localhost:8081/",
+    "AzureCosmosDbKey": "local",
+    "AzureCosmosDbDatabaseId": "discoveruni",
+    "AzureCosmosDbCoursesCollectionId": "courses",
+    "AzureCosmosDbDataSetCollectionId": "datasets",
+}
+
+COURSES_COLLECTION_LINK = "dbs/discoveruni/colls/courses"
+DATASETS_COLLECTION_LINK = "dbs/discoveruni/colls/datasets"
+DOCUMENT_ID_TEMPLATE = "{version}-{institution_id}-{course_id}-{mode}"
+
+SWAGGER_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "swagger.yml"
+)
+COURSE_ROUTE = "/widget/institutions/{institution_id}/courses/{course_id}/modes/{mode}"
+
+KEY = ("10000055", "AB37", "1")
+OTHER_KEY = ("10000055", "AB38", "1")
+
+
+def load_function_app(client, **settings):
+    """Imports a fresh copy of WidgetAPIHttpTrigger that uses the client
+
+    The settings are placed in the environment while the function is
+    imported, as it reads its configuration at import.
+    """
+    for name in list(sys.modules):
+        if name == "WidgetAPIHttpTrigger" or name.startswith("WidgetAPIHttpTrigger."):
+            del sys.modules[name]
+
+    environ = dict(os.environ)
+    original = cosmos_client.CosmosClient
+    os.environ.update(DEFAULT_SETTINGS)
+    os.environ.update(settings)
+    cosmos_client.CosmosClient = client.connect
+    try:
+        return importlib.import_module("WidgetAPIHttpTrigger")
+    finally:
+        cosmos_client.CosmosClient = original
+        os.environ.clear()
+        os.environ.update(environ)
+
+
+def add_dataset(client, version, status="succeeded", published_at=None):
+    if published_at is None:
+        published_at = int(time.time())
+    client.add_documents(
+        DATASETS_COLLECTION_LINK,
+        [
+            {
+                "id": str(version),
+                "version": version,
+                "status": status,
+                "_ts": published_at,
+            }
+        ],
+    )
+
+
+def make_request(institution_id, course_id, mode, headers=None):
+    return func.HttpRequest(
+        method="GET",
+        body=None,
+        url=f"/api/institutions/{institution_id}/courses/{course_id}/modes/{mode}",
+        headers=headers or {},
+        route_params={
+            "institution_id": institution_id,
+            "course_id": course_id,
+            "mode": mode,
+        },
+    )
+
+
+def make_course_document(version, ukprn, pub_ukprn, course_id, mode):
+    return {
+        "id": f"{version}-{pub_ukprn}-{course_id}-{mode}",
+        "version": version,
+        "course_id": course_id,
+        "course_mode": mode,
+        "course": {
+            "institution": {
+                "ukprn": ukprn,
+                "pub_ukprn": pub_ukprn,
+                "pub_ukprn_name": "Test University",
+                "pub_ukprn_welsh_name": "Prifysgol Prawf",
+            },
+            "title": {"english": "Law", "welsh": "Y Gyfraith"},
+            "country": {"code": "XF", "name": "England"},
+            "statistics": {
+                "employment": [{"aggregation_level": 14, "in_work_or_study": 95}],
+                "nss": [{"aggregation_level": 14, "question_16": {}, "question_28": {}}],
+            },
+        },
+    }
+
+
+class StubClient:
+    """Returns the same widget for every query and counts the queries"""
+
+    def __init__(self, widget):
+        self.widget = widget
+        self.queries = 0
+
+    def QueryItems(self, collection_link, query, options):
+        self.queries += 1
+        if self.widget is None:
+            return []
+        return [{"widget": json.loads(json.dumps(self.widget))}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def wait_for_load(cache):
+    thread = cache._load_thread
+    if thread is not None:
+        thread.join()
+
+
+def wait_for_refresh(cache):
+    thread = cache._refresh_thread
+    if thread is not None:
+        thread.join()
@@ -0,0 +1,44 @@
+import unittest
+
+from cache_headers import CacheHeaderPolicy
+
+
+class TestCacheHeaderPolicy(unittest.TestCase):
+    def setUp(self):
+        self.policy = CacheHeaderPolicy(
+            max_age_fraction=0.1, min_max_age=60, max_max_age=3600, not_found_max_age=30
+        )
+
+    def test_max_age_grows_with_version_age(self):
+        self.assertEqual(self.policy.max_age(0), 60)
+        self.assertEqual(self.policy.max_age(6000), 600)
+        self.assertEqual(self.policy.max_age(10 ** 7), 3600)
+        self.assertEqual(self.policy.max_age(None), 60)
+
+    def test_course_headers(self):
+        headers = self.policy.course_headers(3, 6000, "10000055")
+
+        self.assertEqual(
+            headers["Cache-Control"], "public, max-age=600, stale-while-revalidate=600"
+        )
+        self.assertEqual(
+            headers["Surrogate-Key"], "widget widget-version-3 widget-institution-10000055"
+        )
+
+    def test_not_found_headers_use_their_own_max_age(self):
+        headers = self.policy.not_found_headers(3, "10000055")
+
+        self.assertEqual(headers["Cache-Control"], "public, max-age=30")
+        self.assertIn("widget-version-3", headers["Surrogate-Key"])
+
+    def test_zero_max_age_disables_caching(self):
+        policy = CacheHeaderPolicy(
+            max_age_fraction=0.1, min_max_age=60, max_max_age=0, not_found_max_age=0
+        )
+
+        self.assertEqual(policy.course_headers(3, 6000, "10000055")["Cache-Control"], "no-cache")
+        self.assertEqual(policy.not_found_headers(3, "10000055")["Cache-Control"], "no-cache")
+
+
+if __name__ == "__main__":
+    unittest.main()
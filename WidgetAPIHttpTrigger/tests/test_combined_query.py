@@ -0,0 +1,91 @@
+import json
+import unittest
+
+from course_fetcher import CourseFetcher
+from course_locator import CourseLocator
+
+from fake_cosmos import FakeCosmosClient
+from fixtures import COURSES_COLLECTION_LINK, DOCUMENT_ID_TEMPLATE, make_course_document
+
+
+# (ukprn, pub_ukprn, course_id, mode), some reported by another institution
+COURSES = [
+    ("10000010", "10000010", "AB10", 1),
+    ("10000010", "10000010", "AB11", 2),
+    ("10000011", "10000012", "CD20", 1),
+    ("10000011", "10000013", "CD21", 1),
+    ("10000014", "10000014", "EF30", 1),
+    ("10000015", "10000016", "EF30", 2),
+    ("10000017", "10000017", "GH40", 1),
+    ("10000018", "10000019", "GH41", 1),
+]
+
+LOCATORS = {
+    "query": None,
+    "partition": CourseLocator("{version}"),
+    "point": CourseLocator("{version}", DOCUMENT_ID_TEMPLATE),
+}
+
+
+class TestCombinedUkprnQuery(unittest.TestCase):
+    by_pub_ukprn = [(pub_ukprn, course_id, str(mode)) for _, pub_ukprn, course_id, mode in COURSES]
+    by_ukprn = [(ukprn, course_id, str(mode)) for ukprn, pub_ukprn, course_id, mode in COURSES if ukprn != pub_ukprn]
+    missing = [(pub_ukprn, "ZZ999", str(mode)) for _, pub_ukprn, _, mode in COURSES[:4]]
+    keys = by_pub_ukprn + by_ukprn + missing
+
+    def setUp(self):
+        self.client = FakeCosmosClient(physical_partitions=4)
+        self.client.add_documents(
+            COURSES_COLLECTION_LINK,
+            [make_course_document(version, *course) for version in (1, 2) for course in COURSES],
+        )
+
+    def lookup(self, fetcher, keys):
+        self.client.reset_stats()
+        return {key: fetcher.get_course(2, *key) for key in keys}
+
+    def test_courses_match_sequential_lookups(self):
+        for name, locator in LOCATORS.items():
+            with self.subTest(mode=name):
+                sequential = CourseFetcher(self.client, COURSES_COLLECTION_LINK, course_locator=locator)
+                combined = CourseFetcher(
+                    self.client, COURSES_COLLECTION_LINK, course_locator=locator, combined_ukprn_query=True
+                )
+
+                expected = self.lookup(sequential, self.keys)
+                courses = self.lookup(combined, self.keys)
+
+                self.assertEqual(courses, expected)
+                self.assertTrue(all(courses[key] for key in self.by_ukprn))
+
+    def test_course_under_institution_id_wins_over_course_reported_by_it(self):
+        self.client.add_documents(
+            COURSES_COLLECTION_LINK,
+            [
+                make_course_document(2, "10000090", "10000091", "XY12", 1),
+                make_course_document(2, "10000092", "10000090", "XY12", 1),
+            ],
+        )
+        combined = CourseFetcher(self.client, COURSES_COLLECTION_LINK, combined_ukprn_query=True)
+
+        course = json.loads(combined.get_course(2, "10000090", "XY12", "1"))
+
+        self.assertEqual(course["pub_ukprn"], "10000090")
+
+    def test_request_charge(self):
+        sequential = CourseFetcher(self.client, COURSES_COLLECTION_LINK)
+        combined = CourseFetcher(self.client, COURSES_COLLECTION_LINK, combined_ukprn_query=True)
+
+        charges = {}
+        for name, keys in (("pub_ukprn", self.by_pub_ukprn), ("ukprn", self.by_ukprn)):
+            for fetcher in (sequential, combined):
+                self.lookup(fetcher, keys)
+                charges[name, fetcher.combined_ukprn_query] = (self.client.request_charge, self.client.request_count)
+
+        # One query per lookup either way by pub_ukprn, for the few bytes of the marker
+        self.assertEqual(charges["pub_ukprn", True][1], charges["pub_ukprn", False][1])
+        self.assertLess(charges["pub_ukprn", True][0], charges["pub_ukprn", False][0] * 1.05)
+        # One query rather than three by ukprn
+        self.assertEqual(charges["ukprn", True][1], len(self.by_ukprn))
+        self.assertEqual(charges["ukprn", False][1], 3 * len(self.by_ukprn))
+        self.assertLess(charges["ukprn", True][0], charges["ukprn", False][0] / 2)
@@ -0,0 +1,88 @@
+import asyncio
+import gzip
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from compression import ENCODERS, ResponseEncoder, parse_accept_encoding
+from response_cache import ResponseCache
+
+KEY = ("10000055", "AB37", "1")
+BODY = b'{"course_name": {"english": "Law", "welsh": "Y Gyfraith"}}' * 40
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.submitted = 0
+
+    def submit(self, fn, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(fn, *args, **kwargs)
+
+
+class TestAcceptEncoding(unittest.TestCase):
+    def test_q_values_are_parsed(self):
+        self.assertEqual(
+            parse_accept_encoding("gzip;q=0.5, br, identity;q=0"),
+            {"gzip": 0.5, "br": 1.0, "identity": 0.0},
+        )
+
+    def test_preferred_accepted_coding_is_chosen(self):
+        encoder = ResponseEncoder(["br", "gzip"], 0)
+
+        self.assertEqual(encoder.negotiate("gzip, deflate"), "gzip")
+        self.assertEqual(encoder.negotiate("gzip;q=0, deflate"), None)
+        self.assertEqual(encoder.negotiate("*"), "br" if "br" in ENCODERS else "gzip")
+        self.assertIsNone(encoder.negotiate(None))
+
+    def test_nothing_is_negotiated_without_encodings(self):
+        self.assertIsNone(ResponseEncoder([], 0).negotiate("gzip"))
+
+
+class TestResponseEncoder(unittest.TestCase):
+    def test_body_is_compressed_once_per_version(self):
+        cache = ResponseCache(max_entries=10, max_bytes=100000)
+        encoder = ResponseEncoder(["gzip"], 100, cache)
+
+        encoding, body = encoder.encode(1, KEY, BODY, "gzip")
+
+        self.assertEqual(encoding, "gzip")
+        self.assertEqual(gzip.decompress(body), BODY)
+        self.assertEqual(cache.get(1, KEY + ("gzip",)), body)
+        self.assertEqual(encoder.encode(1, KEY, BODY, "gzip"), (encoding, body))
+
+    def test_small_body_is_not_compressed(self):
+        encoder = ResponseEncoder(["gzip"], len(BODY) + 1)
+
+        self.assertEqual(encoder.encode(1, KEY, BODY, "gzip"), (None, BODY))
+
+    def test_identity_is_sent_as_is(self):
+        encoder = ResponseEncoder(["gzip"], 0)
+
+        self.assertEqual(encoder.encode(1, KEY, BODY, None), (None, BODY))
+
+    def test_async_encode_compresses_on_the_executor(self):
+        cache = ResponseCache(max_entries=10, max_bytes=100000)
+        encoder = ResponseEncoder(["gzip"], 100, cache)
+        executor = CountingExecutor()
+        self.addCleanup(executor.shutdown)
+
+        first = asyncio.run(encoder.encode_async(1, KEY, BODY, "gzip", executor=executor))
+        second = asyncio.run(encoder.encode_async(1, KEY, BODY, "gzip", executor=executor))
+
+        self.assertEqual(first, encoder.encode(1, KEY, BODY, "gzip"))
+        self.assertEqual(second, first)
+        self.assertEqual(executor.submitted, 1)
+
+    @unittest.skipUnless("br" in ENCODERS, "brotli is not installed")
+    def test_brotli(self):
+        import brotli
+
+        encoding, body = ResponseEncoder(["br"], 0).encode(1, KEY, BODY, "br")
+
+        self.assertEqual(encoding, "br")
+        self.assertEqual(brotli.decompress(body), BODY)
+
+
+if __name__ == "__main__":
+    unittest.main()
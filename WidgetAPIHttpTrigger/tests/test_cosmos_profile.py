@@ -0,0 +1,105 @@
+import collections
+import logging
+import time
+import types
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from azure.cosmos.errors import HTTPFailure
+
+from cosmos_profile import CosmosConnectionProfile
+
+from fake_cosmos import FakeCosmosClient
+from fixtures import COURSES_COLLECTION_LINK, add_dataset, load_function_app, make_course_document, make_request
+
+
+class TestCosmosConnectionProfile(unittest.TestCase):
+    def test_connection_policy(self):
+        profile = CosmosConnectionProfile(
+            request_timeout=2.5, max_retry_attempts=3, max_retry_wait=5, preferred_locations=["UK South", "UK West"]
+        )
+
+        policy = profile.connection_policy()
+
+        self.assertEqual(policy.RequestTimeout, 2500)
+        self.assertEqual(policy.PreferredLocations, ["UK South", "UK West"])
+        self.assertEqual(policy.RetryOptions.MaxRetryAttemptCount, 3)
+        self.assertEqual(policy.RetryOptions.MaxWaitTimeInSeconds, 5)
+
+    def test_consistency_level(self):
+        self.assertEqual(CosmosConnectionProfile(consistency_level="eventual").consistency_level, "Eventual")
+        with self.assertRaises(ValueError):
+            CosmosConnectionProfile(consistency_level="Linearizable")
+
+    def test_configure_pool(self):
+        profile = CosmosConnectionProfile(pool_size=64)
+        client = types.SimpleNamespace(_requests_session=requests.Session(), connection_policy=profile.connection_policy())
+
+        profile.configure_pool(client)
+
+        self.assertEqual(client._requests_session.get_adapter("https://example.documents.azure.com/")._pool_maxsize, 64)
+
+    def test_function_app_logs_the_profile(self):
+        client = FakeCosmosClient()
+
+        with self.assertLogs(level="INFO") as logs:
+            load_function_app(client, CosmosMaxRetryAttempts="2", CosmosConsistencyLevel="Eventual")
+
+        self.assertTrue(any("Cosmos DB connection profile" in line and '"max_retry_attempts": 2' in line
+                            for line in logs.output))
+        self.assertEqual(client.connection_policy.RetryOptions.MaxRetryAttemptCount, 2)
+        self.assertEqual(client.consistency_level, "Eventual")
+
+
+class TestThrottling(unittest.TestCase):
+    def test_throttled_call_gives_up_when_retries_run_out(self):
+        client = FakeCosmosClient(throttle_rate=1.0, retry_after_ms=1)
+        client.connection_policy = CosmosConnectionProfile(max_retry_attempts=2).connection_policy()
+
+        with self.assertRaises(HTTPFailure) as raised:
+            client.QueryItems(COURSES_COLLECTION_LINK, "SELECT * FROM c", {"enableCrossPartitionQuery": True})
+
+        self.assertEqual(raised.exception.status_code, 429)
+        self.assertEqual(client.throttled_count, 3)
+        self.assertEqual(client.last_response_headers["x-ms-throttle-retry-count"], 2)
+
+    def test_tail_latency_is_bounded_under_throttling(self):
+        client = FakeCosmosClient(physical_partitions=4, retry_after_ms=100, seed=1)
+        add_dataset(client, 1)
+        keys = [(f"100000{number:02}", "AB37", "1") for number in range(60)]
+        client.add_documents(
+            COURSES_COLLECTION_LINK,
+            [make_course_document(1, institution_id, institution_id, course_id, 1)
+             for institution_id, course_id, _ in keys],
+        )
+        app = load_function_app(
+            client,
+            ResponseCacheMaxEntries="0",
+            NegativeCacheMaxEntries="0",
+            HotSetPrefetchCount="0",
+            CosmosMaxRetryWaitSeconds="0.2",
+        )
+        client.throttle_rate = 0.5
+
+        def invoke(key):
+            start = time.perf_counter()
+            try:
+                status_code = app.main_sync(make_request(*key)).status_code
+            except HTTPFailure:
+                status_code = 500
+            return time.perf_counter() - start, status_code
+
+        logging.disable(logging.ERROR)
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(invoke, keys))
+        finally:
+            logging.disable(logging.NOTSET)
+
+        statuses = collections.Counter(status_code for _, status_code in results)
+        self.assertGreater(client.throttled_count, 0)
+        # Every request is answered by one query for the course, or fails when it is throttled too long
+        self.assertEqual(statuses[200] + statuses[500], 60)
+        # At most 0.2s of waits plus the 0.1s retry that takes them over, then the request fails
+        self.assertLess(max(latency for latency, _ in results), 0.2 + 0.1 + 0.2)
@@ -0,0 +1,131 @@
+import unittest
+
+from azure.cosmos.errors import HTTPFailure
+
+from course_fetcher import CourseFetcher
+from course_locator import CourseLocator
+
+from fake_cosmos import FakeCosmosClient
+from fixtures import COURSES_COLLECTION_LINK, DOCUMENT_ID_TEMPLATE, make_course_document
+
+
+class FailingPartitionClient:
+    """Fails single-partition queries, passing everything else to the client"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def QueryItems(self, collection_link, query, options=None):
+        if "partitionKey" in (options or {}):
+            raise HTTPFailure(503, "Service is currently unavailable.")
+        return self.client.QueryItems(collection_link, query, options)
+
+
+class TestCourseLocator(unittest.TestCase):
+    def test_templates_are_filled_from_lookup_fields(self):
+        locator = CourseLocator("{version}", DOCUMENT_ID_TEMPLATE)
+
+        self.assertEqual(locator.partition_key(3, "10000055", "AB37", "1"), 3)
+        self.assertEqual(locator.document_id(3, "10000055", "AB37", "1"), "3-10000055-AB37-1")
+
+    def test_partition_key_has_the_type_of_the_field(self):
+        self.assertEqual(CourseLocator("{mode}").partition_key(3, "10000055", "AB37", "1"), 1)
+        self.assertEqual(CourseLocator("{institution_id}").partition_key(3, 10000055, "AB37", "1"), "10000055")
+        self.assertEqual(CourseLocator("v{version}").partition_key(3, "10000055", "AB37", "1"), "v3")
+        self.assertEqual(
+            CourseLocator("{version}-{institution_id}").partition_key(3, "10000055", "AB37", "1"), "3-10000055"
+        )
+
+    def test_no_document_id_without_template(self):
+        locator = CourseLocator("{version}")
+
+        self.assertIsNone(locator.document_id(3, "10000055", "AB37", "1"))
+
+
+class TestCourseFetcherLookupModes(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeCosmosClient(physical_partitions=4)
+        self.client.add_documents(
+            COURSES_COLLECTION_LINK,
+            [
+                make_course_document(version, "10000055", "10000055", "AB37", 1)
+                for version in (1, 2, 3)
+            ]
+            + [make_course_document(3, "10000056", "10000057", "CD12", 2)],
+        )
+
+    def get_course(self, locator, institution_id, course_id, mode):
+        fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK, course_locator=locator)
+        self.client.reset_stats()
+        return fetcher.get_course(3, institution_id, course_id, mode)
+
+    def test_single_partition_query_matches_cross_partition_query(self):
+        expected = self.get_course(None, "10000055", "AB37", "1")
+
+        course = self.get_course(CourseLocator("{version}"), "10000055", "AB37", "1")
+
+        self.assertEqual(course, expected)
+        self.assertEqual(self.client.partitions_visited, 1)
+
+    def test_point_read_matches_cross_partition_query(self):
+        expected = self.get_course(None, "10000055", "AB37", "1")
+
+        locator = CourseLocator("{version}", DOCUMENT_ID_TEMPLATE)
+        course = self.get_course(locator, "10000055", "AB37", "1")
+
+        self.assertEqual(course, expected)
+        self.assertEqual(self.client.request_count, 1)
+
+    def test_reporting_ukprn_is_found_with_single_partition_queries(self):
+        expected = self.get_course(None, "10000056", "CD12", "2")
+
+        locator = CourseLocator("{version}", DOCUMENT_ID_TEMPLATE)
+        course = self.get_course(locator, "10000056", "CD12", "2")
+
+        self.assertIsNotNone(course)
+        self.assertEqual(course, expected)
+
+    def test_single_partition_query_miss_is_not_retried_cross_partition(self):
+        course = self.get_course(CourseLocator("{version}"), "10000055", "ZZ99", "1")
+
+        self.assertIsNone(course)
+        self.assertEqual(self.client.partitions_visited, 2)
+
+    def test_point_read_miss_is_not_queried_for(self):
+        locator = CourseLocator("{version}", DOCUMENT_ID_TEMPLATE)
+
+        self.assertIsNone(self.get_course(locator, "10000055", "ZZ99", "1"))
+        # The point read, then the ukprn query in the version's partition
+        self.assertEqual(self.client.request_count, 2)
+        self.assertEqual(self.client.partitions_visited, 2)
+
+    def test_failed_single_partition_query_falls_back_to_cross_partition_query(self):
+        expected = self.get_course(None, "10000055", "AB37", "1")
+        self.client = FailingPartitionClient(self.client)
+
+        course = self.get_course(CourseLocator("{version}"), "10000055", "AB37", "1")
+
+        self.assertEqual(course, expected)
+
+    def test_ukprn_query_runs_cross_partition_when_partitioned_by_institution(self):
+        client = FakeCosmosClient(
+            physical_partitions=4, partition_key_paths={COURSES_COLLECTION_LINK: "/course/institution/pub_ukprn"}
+        )
+        client.add_documents(COURSES_COLLECTION_LINK, [make_course_document(3, "10000056", "10000057", "CD12", 2)])
+        fetcher = CourseFetcher(client, COURSES_COLLECTION_LINK, course_locator=CourseLocator("{institution_id}"))
+
+        course = fetcher.get_course(3, "10000056", "CD12", "2")
+
+        self.assertIsNotNone(course)
+
+    def test_missing_course_returns_none(self):
+        locator = CourseLocator("{version}", DOCUMENT_ID_TEMPLATE)
+
+        self.assertIsNone(self.get_course(locator, "10000055", "ZZ99", "1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+from fake_cosmos import FakeCosmosClient
+from fixtures import COURSES_COLLECTION_LINK, make_course_document
+
+
+class TestFakeCosmosIndex(unittest.TestCase):
+    QUERY = {
+        "query": "SELECT * FROM c WHERE c.version = @version AND c.course.institution.pub_ukprn = @pub_ukprn",
+        "parameters": [{"name": "@version", "value": 1}, {"name": "@pub_ukprn", "value": "10000002"}],
+    }
+
+    def setUp(self):
+        self.client = FakeCosmosClient(physical_partitions=4)
+        self.client.add_documents(
+            COURSES_COLLECTION_LINK,
+            [
+                make_course_document(version, ukprn, pub_ukprn, f"AB{number}", mode)
+                for version in (1, 2)
+                for ukprn, pub_ukprn in (("10000001", "10000001"), ("10000001", "10000002"), ("10000003", "10000003"))
+                for number in range(10)
+                for mode in (1, 2)
+            ],
+        )
+        self.expected = len(self.scan())
+
+    def scan(self):
+        documents = [d for p in self.client.collections[COURSES_COLLECTION_LINK] for d in p]
+        return [d for d in documents if d["version"] == 1 and d["course"]["institution"]["pub_ukprn"] == "10000002"]
+
+    def test_indexed_query_matches_a_scan(self):
+        results = self.client.QueryItems(
+            COURSES_COLLECTION_LINK, self.QUERY, {"enableCrossPartitionQuery": True}
+        )
+
+        self.assertEqual(results, self.scan())
+        self.assertGreater(len(results), 1)
+
+    def test_upsert_updates_the_index(self):
+        options = {"enableCrossPartitionQuery": True}
+        document = self.client.QueryItems(COURSES_COLLECTION_LINK, self.QUERY, options)[0]
+        document["course"]["institution"]["pub_ukprn"] = "10000099"
+        self.client.UpsertItem(COURSES_COLLECTION_LINK, document)
+
+        results = self.client.QueryItems(COURSES_COLLECTION_LINK, self.QUERY, options)
+
+        self.assertEqual(len(results), self.expected - 1)
+        self.assertNotIn(document["id"], [r["id"] for r in results])
+
+    def test_numbers_match_regardless_of_type(self):
+        query = dict(self.QUERY, parameters=[{"name": "@version", "value": 1.0}, self.QUERY["parameters"][1]])
+
+        results = self.client.QueryItems(COURSES_COLLECTION_LINK, query, {"enableCrossPartitionQuery": True})
+
+        self.assertEqual(len(results), self.expected)
+
+    def test_distinct_drops_repeated_rows(self):
+        query = dict(
+            self.QUERY,
+            query="SELECT DISTINCT c.course.institution.ukprn AS ukprn, c.course.institution.pub_ukprn AS pub_ukprn "
+            "FROM c WHERE c.version = @version",
+            parameters=self.QUERY["parameters"][:1],
+        )
+
+        results = self.client.QueryItems(COURSES_COLLECTION_LINK, query, {"enableCrossPartitionQuery": True})
+
+        self.assertEqual(
+            sorted((r["ukprn"], r["pub_ukprn"]) for r in results),
+            [("10000001", "10000001"), ("10000001", "10000002"), ("10000003", "10000003")],
+        )
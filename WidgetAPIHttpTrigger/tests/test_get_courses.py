@@ -0,0 +1,88 @@
+import unittest
+
+from course_fetcher import CourseFetcher
+from response_cache import NegativeCache, ResponseCache
+from ukprn_alias_index import UkprnAliasIndexCache
+
+from fake_cosmos import FakeCosmosClient
+from fixtures import COURSES_COLLECTION_LINK, make_course_document, wait_for_load
+
+
+KEYS = [
+    ("10000055", "AB37", "1"),
+    ("10000055", "AB38", "2"),
+    ("10000056", "CD12", "2"),
+    ("10000060", "EF34", "1"),
+    ("10000055", "ZZ99", "1"),
+]
+
+
+class TestGetCourses(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeCosmosClient()
+        self.client.add_documents(
+            COURSES_COLLECTION_LINK,
+            [
+                make_course_document(3, "10000055", "10000055", "AB37", 1),
+                make_course_document(3, "10000055", "10000055", "AB38", 2),
+                make_course_document(3, "10000056", "10000057", "CD12", 2),
+                make_course_document(3, "10000060", "10000061", "EF34", 1),
+                make_course_document(3, "10000060", "10000062", "GH56", 1),
+                make_course_document(2, "10000055", "10000055", "ZZ99", 1),
+            ],
+        )
+
+    def expected_courses(self):
+        fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK)
+        return {key: fetcher.get_course(3, *key) for key in KEYS}
+
+    def test_courses_match_single_lookups(self):
+        expected = self.expected_courses()
+        fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK)
+        self.client.reset_stats()
+
+        courses = fetcher.get_courses(3, KEYS)
+
+        self.assertEqual(courses, expected)
+        self.assertIsNone(courses[("10000055", "ZZ99", "1")])
+        self.assertEqual(self.client.request_count, 3)
+
+    def test_courses_match_single_lookups_with_alias_index(self):
+        expected = self.expected_courses()
+        alias_indexes = UkprnAliasIndexCache(CourseFetcher(self.client, COURSES_COLLECTION_LINK).get_ukprn_aliases)
+        alias_indexes.get_index(3)
+        wait_for_load(alias_indexes)
+        fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK, ukprn_alias_indexes=alias_indexes)
+        self.client.reset_stats()
+
+        courses = fetcher.get_courses(3, KEYS)
+
+        self.assertEqual(courses, expected)
+        self.assertLessEqual(self.client.request_count, 3)
+
+    def test_cached_courses_are_not_queried(self):
+        expected = self.expected_courses()
+        fetcher = CourseFetcher(
+            self.client,
+            COURSES_COLLECTION_LINK,
+            response_cache=ResponseCache(max_entries=100, max_bytes=100000),
+            negative_cache=NegativeCache(max_entries=100, ttl_seconds=60),
+        )
+        fetcher.get_courses(3, KEYS)
+        self.client.reset_stats()
+
+        courses = fetcher.get_courses(3, KEYS)
+
+        self.assertEqual(courses, expected)
+        self.assertEqual(self.client.request_count, 0)
+
+    def test_duplicate_keys_are_returned_once(self):
+        fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK)
+
+        courses = fetcher.get_courses(3, [KEYS[0], KEYS[0]])
+
+        self.assertEqual(list(courses), [KEYS[0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import gzip
+import random
+import tempfile
+import unittest
+
+from compression import ResponseEncoder
+from course_fetcher import CourseFetcher
+from hot_set import HotSetPrefetcher, HotSetTracker
+from response_cache import ResponseCache
+from widget_snapshot import WidgetSnapshotStore
+
+from fake_cosmos import FakeCosmosClient
+from fixtures import COURSES_COLLECTION_LINK, make_course_document
+
+
+def key(n):
+    return ("10000055", f"C{n:04d}", "1")
+
+
+class TestHotSetTracker(unittest.TestCase):
+    def test_finds_the_most_requested_keys(self):
+        rng = random.Random(1)
+        tracker = HotSetTracker(capacity=10, width=256, seed=1)
+        # Keys 0-9 are requested far more often than a long tail of 2000 others
+        for _ in range(20000):
+            if rng.random() < 0.5:
+                tracker.record(key(rng.randrange(10)))
+            else:
+                tracker.record(key(10 + rng.randrange(2000)))
+
+        self.assertEqual(set(tracker.top()), {key(n) for n in range(10)})
+
+    def test_top_is_ordered_and_limited(self):
+        tracker = HotSetTracker(capacity=5, seed=1)
+        for n in range(1, 6):
+            for _ in range(n * 10):
+                tracker.record(key(n))
+
+        self.assertEqual(tracker.top(3), [key(5), key(4), key(3)])
+
+    def test_heap_tracks_the_coldest_candidate(self):
+        rng = random.Random(1)
+        tracker = HotSetTracker(capacity=50, width=256, seed=1)
+        # A flat tail, where most requests replace a candidate
+        for _ in range(20000):
+            tracker.record(key(rng.randrange(5000)))
+
+        self.assertEqual(len(tracker._candidates), 50)
+        self.assertLessEqual(len(tracker._heap), 100)
+        self.assertEqual(tracker._coldest_estimate(), min(tracker._candidates.values()))
+
+    def test_old_counts_decay(self):
+        tracker = HotSetTracker(capacity=1, decay_interval=100, seed=1)
+        for _ in range(90):
+            tracker.record(key(1))
+        for _ in range(110):
+            tracker.record(key(2))
+
+        self.assertEqual(tracker.top(), [key(2)])
+        self.assertLess(tracker.estimate(key(1)), 90)
+
+
+class StubFetcher:
+    def __init__(self, calls, padding=b""):
+        self.calls = calls
+        self.padding = padding
+
+    def load_courses(self, version, keys):
+        self.calls.append((version, list(keys)))
+        return {k: None if k == key(3) else f"{version}:{k[1]}".encode() + self.padding for k in keys}
+
+
+class TestHotSetPrefetcher(unittest.TestCase):
+    def setUp(self):
+        self.tracker = HotSetTracker(capacity=10, seed=1)
+        for n in range(5):
+            for _ in range(5 - n):
+                self.tracker.record(key(n))
+        self.cache = ResponseCache(max_entries=100, max_bytes=10000)
+        self.cache.put(1, key(0), b"1:C0000")
+        self.calls = []
+        self.prefetcher = HotSetPrefetcher(
+            self.tracker, lambda: StubFetcher(self.calls), self.cache, count=4, max_workers=2, batch_size=3
+        )
+
+    def test_prefetches_top_keys_in_batches(self):
+        fetched = self.prefetcher.prefetch(1, 2)
+
+        self.assertEqual(fetched, 3)
+        self.assertEqual(sorted(len(keys) for _, keys in self.calls), [1, 3])
+        self.assertEqual(self.cache.get(2, key(0)), b"2:C0000")
+        self.assertIsNone(self.cache.get(2, key(4)))
+
+    def test_current_generation_is_kept_until_the_switch(self):
+        self.prefetcher.prefetch(1, 2)
+
+        self.assertEqual(self.cache.get(1, key(0)), b"1:C0000")
+        self.cache.put(1, key(9), b"1:C0009")
+        self.assertEqual(self.cache.get(1, key(9)), b"1:C0009")
+
+        self.cache.put(2, key(8), b"2:C0008")
+        self.assertIsNone(self.cache.get(1, key(0)))
+        self.assertEqual(self.cache.get(2, key(0)), b"2:C0000")
+
+    def test_prefetches_compressed_variants(self):
+        encoder = ResponseEncoder(["gzip"], min_bytes=0, response_cache=self.cache)
+        prefetcher = HotSetPrefetcher(
+            self.tracker, lambda: StubFetcher(self.calls, b" " * 100), self.cache, count=4, response_encoder=encoder
+        )
+
+        prefetcher.prefetch(1, 2)
+
+        compressed = self.cache.get(2, key(0) + ("gzip",))
+        self.assertEqual(gzip.decompress(compressed), b"2:C0000" + b" " * 100)
+        # Still alongside the current generation
+        self.assertEqual(self.cache.get(1, key(0)), b"1:C0000")
+
+    def test_failed_batch_is_logged_and_skipped(self):
+        def failing_fetcher():
+            raise RuntimeError("throttled")
+
+        prefetcher = HotSetPrefetcher(self.tracker, failing_fetcher, self.cache, count=4)
+
+        with self.assertLogs(level="ERROR"):
+            self.assertEqual(prefetcher.prefetch(1, 2), 0)
+
+
+class TestHotSetPrefetcherSources(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.client = FakeCosmosClient(physical_partitions=4)
+        self.client.add_documents(
+            COURSES_COLLECTION_LINK,
+            [make_course_document(3, "10000055", "10000055", f"C{n:04d}", 1) for n in range(5)],
+        )
+        self.tracker = HotSetTracker(capacity=10, seed=1)
+        for n in range(6):
+            self.tracker.record(key(n))
+        self.cache = ResponseCache(max_entries=100, max_bytes=100000)
+
+    def test_version_with_a_snapshot_is_not_queried(self):
+        snapshots = WidgetSnapshotStore(self.directory.name)
+        snapshots.build(3, CourseFetcher(self.client, COURSES_COLLECTION_LINK).get_version_courses(3))
+        expected = CourseFetcher(self.client, COURSES_COLLECTION_LINK).get_course(3, *key(0))
+        prefetcher = HotSetPrefetcher(
+            self.tracker,
+            lambda: CourseFetcher(self.client, COURSES_COLLECTION_LINK, widget_snapshots=snapshots),
+            self.cache,
+            count=6,
+        )
+        self.client.reset_stats()
+
+        self.assertEqual(prefetcher.prefetch(2, 3), 5)
+        self.assertEqual(self.client.request_count, 0)
+        self.assertEqual(self.cache.get(3, key(0)), expected)
+
+    def test_version_without_a_snapshot_is_queried(self):
+        prefetcher = HotSetPrefetcher(
+            self.tracker,
+            lambda: CourseFetcher(self.client, COURSES_COLLECTION_LINK, response_cache=self.cache),
+            self.cache,
+            count=6,
+        )
+
+        self.assertEqual(prefetcher.prefetch(2, 3), 5)
+        self.assertGreater(self.client.request_count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
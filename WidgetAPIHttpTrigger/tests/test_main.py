@@ -0,0 +1,372 @@
+import asyncio
+import gzip
+import json
+import logging
+import tempfile
+import time
+import unittest
+
+from request_logging import uninstall_sampled_logging
+
+from fake_cosmos import FakeCosmosClient
+from fixtures import (
+    COURSES_COLLECTION_LINK,
+    ListHandler,
+    add_dataset,
+    load_function_app,
+    make_course_document,
+    make_request,
+)
+
+
+def load_app(**settings):
+    client = FakeCosmosClient()
+    add_dataset(client, 2)
+    add_dataset(client, 3)
+    add_dataset(client, 4, status="failed")
+    client.add_documents(
+        COURSES_COLLECTION_LINK,
+        [
+            make_course_document(3, "10000055", "10000055", "AB37", 1),
+            make_course_document(3, "10000056", "10000057", "CD12", 2),
+        ],
+    )
+    return load_function_app(client, **settings), client
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        self.app, self.client = load_app()
+
+    def test_existing_course(self):
+        resp = self.app.main(make_request("10000055", "AB37", "1"))
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["content-type"], "application/json")
+        course = json.loads(resp.get_body())
+        self.assertEqual(course["pub_ukprn"], "10000055")
+        self.assertEqual(course["course_mode"], 1)
+
+    def test_course_requested_by_ukprn(self):
+        resp = self.app.main(make_request("10000056", "CD12", "2"))
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(json.loads(resp.get_body())["pub_ukprn"], "10000057")
+
+    def test_missing_course(self):
+        resp = self.app.main(make_request("10000055", "ZZ99", "1"))
+
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(json.loads(resp.get_body())["errors"][0]["error"], "Not Found")
+
+    def test_invalid_params(self):
+        resp = self.app.main(make_request("1000005", "AB37", "1"))
+
+        self.assertEqual(resp.status_code, 400)
+
+
+class TestMainTiming(unittest.TestCase):
+    def test_request_timing_is_logged(self):
+        app, _ = load_app()
+
+        with self.assertLogs(level="INFO") as logs:
+            app.main(make_request("10000056", "CD12", "2"))
+
+        lines = [line for line in logs.output if "request_timing" in line]
+        self.assertEqual(len(lines), 1)
+        timing = json.loads(lines[0].split("request_timing ", 1)[1])
+        self.assertEqual(timing["status"], 200)
+        self.assertIn("primary_query", timing["stages_ms"])
+        self.assertGreater(timing["request_charge"], 0)
+
+    def test_server_timing_header(self):
+        app, _ = load_app(ServerTimingEnabled="true")
+
+        resp = app.main(make_request("10000055", "AB37", "1"))
+
+        self.assertIn("validation;dur=", resp.headers["server-timing"])
+        self.assertIn("RU", resp.headers["server-timing"])
+
+    def test_no_server_timing_header_by_default(self):
+        app, _ = load_app()
+
+        resp = app.main(make_request("10000055", "AB37", "1"))
+
+        self.assertNotIn("server-timing", resp.headers)
+
+
+class TestMainSampledLogging(unittest.TestCase):
+    def setUp(self):
+        root = logging.getLogger()
+        self.written = ListHandler()
+        root.addHandler(self.written)
+        self.addCleanup(root.removeHandler, self.written)
+        self.addCleanup(root.setLevel, root.level)
+        root.setLevel(logging.INFO)
+
+    def load_app(self, **settings):
+        app, _ = load_app(RequestLoggingMode="sampled", **settings)
+        self.addCleanup(uninstall_sampled_logging)
+        return app
+
+    def test_requests_that_are_not_sampled_are_not_logged(self):
+        app = self.load_app(RequestLogSampleRate="0")
+
+        app.main(make_request("10000055", "AB37", "1"))
+        uninstall_sampled_logging()
+
+        self.assertFalse([m for m in self.written.messages if m.startswith(("url:", "request_timing"))])
+
+    def test_invalid_request_is_logged_in_full(self):
+        app = self.load_app(RequestLogSampleRate="0")
+
+        app.main(make_request("1000005", "AB37", "1"))
+        uninstall_sampled_logging()
+
+        self.assertTrue([m for m in self.written.messages if m.startswith("url:")])
+        self.assertTrue([m for m in self.written.messages if m.startswith("Invalid parameters")])
+
+    def test_slow_requests_are_logged(self):
+        app = self.load_app(RequestLogSampleRate="0", SlowRequestLogSeconds="0")
+
+        app.main(make_request("10000055", "AB37", "1"))
+        uninstall_sampled_logging()
+
+        self.assertTrue([m for m in self.written.messages if m.startswith("request_timing")])
+
+
+class TestMainWarmUp(unittest.TestCase):
+    def test_warm_up_caches_the_courses(self):
+        app, client = load_app(WarmUpCourses="10000055/AB37/1, 10000056/CD12/2,10000055/ZZ99/1")
+
+        summary = app.warm_up()
+        client.reset_stats()
+        resp = app.main(make_request("10000056", "CD12", "2"))
+
+        self.assertEqual(summary["version"], 3)
+        self.assertEqual((summary["courses"], summary["found"]), (3, 2))
+        self.assertEqual(summary["ukprn_aliases"], 1)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(client.request_count, 0)
+
+    def test_warm_up_skips_invalid_courses(self):
+        app, _ = load_app(WarmUpCourses="1000005/AB37/1,not-a-key")
+
+        with self.assertLogs(level="WARNING"):
+            summary = app.warm_up()
+
+        self.assertEqual(summary["courses"], 0)
+
+    def test_swagger_is_parsed_by_warm_up_not_at_import(self):
+        app, _ = load_app(WarmUpCourses="")
+        self.assertFalse(app.route_validators.loaded)
+
+        app.warm_up()
+
+        self.assertTrue(app.route_validators.loaded)
+
+    def test_warm_up_takes_courses(self):
+        app, _ = load_app()
+
+        summary = app.warm_up([("10000055", "AB37", "1")])
+
+        self.assertEqual(summary["found"], 1)
+
+
+class TestMainConditional(unittest.TestCase):
+    def setUp(self):
+        self.app, self.client = load_app()
+
+    def test_course_has_etag(self):
+        resp = self.app.main(make_request("10000055", "AB37", "1"))
+        other = self.app.main(make_request("10000056", "CD12", "2"))
+
+        self.assertTrue(resp.headers["etag"].startswith('"3-'))
+        self.assertNotEqual(resp.headers["etag"], other.headers["etag"])
+
+    def test_matching_etag_is_not_modified_without_cosmos(self):
+        etag = self.app.main(make_request("10000055", "AB37", "1")).headers["etag"]
+
+        self.client.reset_stats()
+        resp = self.app.main(
+            make_request("10000055", "AB37", "1", headers={"If-None-Match": f'W/"x", {etag}'})
+        )
+
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.get_body(), b"")
+        self.assertEqual(resp.headers["etag"], etag)
+        self.assertEqual(self.client.request_count, 0)
+
+    def test_any_etag_is_not_modified_if_the_course_exists(self):
+        etag = self.app.main(make_request("10000055", "AB37", "1")).headers["etag"]
+
+        resp = self.app.main(make_request("10000055", "AB37", "1", headers={"If-None-Match": "*"}))
+        missing = self.app.main(make_request("10000055", "ZZ99", "1", headers={"If-None-Match": "*"}))
+
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.get_body(), b"")
+        self.assertEqual(resp.headers["etag"], etag)
+        self.assertEqual(missing.status_code, 404)
+
+    def test_etag_changes_with_dataset_version(self):
+        etag = self.app.main(make_request("10000055", "AB37", "1")).headers["etag"]
+        client = FakeCosmosClient()
+        add_dataset(client, 5)
+        client.add_documents(
+            COURSES_COLLECTION_LINK, [make_course_document(5, "10000055", "10000055", "AB37", 1)]
+        )
+        app = load_function_app(client)
+
+        resp = app.main(make_request("10000055", "AB37", "1", headers={"If-None-Match": etag}))
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp.headers["etag"], etag)
+
+    def test_cache_headers_follow_dataset_age(self):
+        client = FakeCosmosClient()
+        add_dataset(client, 3, published_at=int(time.time()) - 6000)
+        client.add_documents(
+            COURSES_COLLECTION_LINK, [make_course_document(3, "10000055", "10000055", "AB37", 1)]
+        )
+        app = load_function_app(client)
+
+        resp = app.main(make_request("10000055", "AB37", "1"))
+        not_modified = app.main(
+            make_request("10000055", "AB37", "1", headers={"If-None-Match": resp.headers["etag"]})
+        )
+        missing = app.main(make_request("10000055", "ZZ99", "1"))
+
+        self.assertRegex(resp.headers["cache-control"], r"^public, max-age=(599|600), ")
+        self.assertIn("widget-institution-10000055", resp.headers["surrogate-key"])
+        self.assertEqual(not_modified.headers["cache-control"], resp.headers["cache-control"])
+        self.assertEqual(missing.headers["cache-control"], "public, max-age=60")
+        self.assertIn("widget-version-3", missing.headers["surrogate-key"])
+
+    def test_bodies_are_written_by_json_dumps(self):
+        found = self.app.main(make_request("10000055", "AB37", "1"))
+        missing = self.app.main(make_request("10000055", "ZZ99", "1"))
+
+        for resp in (found, missing):
+            body = resp.get_body()
+            self.assertEqual(body, json.dumps(json.loads(body)).encode("utf-8"))
+
+    def test_async_handler_is_not_modified(self):
+        etag = self.app.main(make_request("10000055", "AB37", "1")).headers["etag"]
+
+        resp = asyncio.run(
+            self.app.main_async(
+                make_request("10000055", "AB37", "1", headers={"If-None-Match": etag})
+            )
+        )
+
+        self.assertEqual(resp.status_code, 304)
+
+    def test_async_handler_any_etag_is_not_modified(self):
+        resp = asyncio.run(
+            self.app.main_async(make_request("10000055", "AB37", "1", headers={"If-None-Match": "*"}))
+        )
+
+        self.assertEqual(resp.status_code, 304)
+
+
+class TestMainCompression(unittest.TestCase):
+    def setUp(self):
+        self.app, self.client = load_app(ResponseCompressionMinBytes="100")
+
+    def test_gzip_is_negotiated(self):
+        identity = self.app.main(make_request("10000055", "AB37", "1"))
+        resp = self.app.main(
+            make_request("10000055", "AB37", "1", headers={"Accept-Encoding": "gzip;q=1, br;q=0"})
+        )
+
+        self.assertEqual(resp.headers["content-encoding"], "gzip")
+        self.assertEqual(resp.headers["vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(resp.get_body()), identity.get_body())
+        self.assertNotEqual(resp.headers["etag"], identity.headers["etag"])
+
+    def test_compressed_etag_is_not_modified(self):
+        headers = {"Accept-Encoding": "gzip;q=1, br;q=0"}
+        etag = self.app.main(make_request("10000055", "AB37", "1", headers=headers)).headers["etag"]
+
+        resp = self.app.main(
+            make_request("10000055", "AB37", "1", headers=dict(headers, **{"If-None-Match": etag}))
+        )
+
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.headers["etag"], etag)
+
+    def test_async_handler_compresses_like_sync_handler(self):
+        headers = {"Accept-Encoding": "gzip;q=1, br;q=0"}
+        expected = self.app.main_sync(make_request("10000056", "CD12", "2", headers=headers))
+
+        resp = asyncio.run(self.app.main_async(make_request("10000056", "CD12", "2", headers=headers)))
+
+        self.assertEqual(resp.headers["content-encoding"], "gzip")
+        self.assertEqual(resp.headers["etag"], expected.headers["etag"])
+        self.assertEqual(resp.get_body(), expected.get_body())
+
+    def test_any_etag_is_not_modified_with_the_compressed_etag(self):
+        headers = {"Accept-Encoding": "gzip;q=1, br;q=0"}
+        etag = self.app.main(make_request("10000055", "AB37", "1", headers=headers)).headers["etag"]
+
+        resp = self.app.main(make_request("10000055", "AB37", "1", headers=dict(headers, **{"If-None-Match": "*"})))
+
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.headers["etag"], etag)
+
+    def test_body_under_threshold_is_not_compressed(self):
+        app, _ = load_app(ResponseCompressionMinBytes="100000")
+
+        resp = app.main(make_request("10000055", "AB37", "1", headers={"Accept-Encoding": "gzip"}))
+
+        self.assertNotIn("content-encoding", resp.headers)
+
+
+class TestMainAsync(unittest.TestCase):
+    def setUp(self):
+        self.app, self.client = load_app()
+
+    def test_async_handler_matches_sync_handler(self):
+        for params in (("10000055", "AB37", "1"), ("10000056", "CD12", "2"), ("10000055", "ZZ99", "1")):
+            expected = self.app.main_sync(make_request(*params))
+
+            resp = asyncio.run(self.app.main_async(make_request(*params)))
+
+            self.assertEqual(resp.status_code, expected.status_code)
+            self.assertEqual(resp.get_body(), expected.get_body())
+
+    def test_main_is_async_when_enabled(self):
+        app, _ = load_app(AsyncHandlerEnabled="true")
+
+        self.assertIs(app.main, app.main_async)
+
+    def test_main_is_sync_by_default(self):
+        self.assertIs(self.app.main, self.app.main_sync)
+
+
+class TestMainWidgetSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app, self.client = load_app(
+            WidgetSnapshotDir=self.directory.name, WidgetSnapshotRecheckSeconds="0"
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_snapshot_serves_latest_version_without_cosmos(self):
+        expected = self.app.main(make_request("10000056", "CD12", "2"))
+
+        self.assertEqual(self.app.build_widget_snapshot(), 3)
+        self.client.reset_stats()
+        resp = self.app.main(make_request("10000056", "CD12", "2"))
+        missing = self.app.main(make_request("10000055", "ZZ99", "1"))
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_body(), expected.get_body())
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(self.client.request_count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
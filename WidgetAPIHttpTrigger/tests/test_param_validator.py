@@ -0,0 +1,150 @@
+import os
+import tempfile
+import unittest
+
+import yaml
+
+from param_validator import NO_ERRORS, LazyRouteValidators, ParameterError, load_route_validators
+
+from fixtures import COURSE_ROUTE, SWAGGER_PATH
+
+VALID = {"institution_id": "10000233", "course_id": "KA1003", "mode": "1"}
+
+
+class TestRouteValidator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.validators = load_route_validators(SWAGGER_PATH)
+        cls.validator = cls.validators[(COURSE_ROUTE, "get")]
+
+    def test_valid_params_have_no_errors(self):
+        self.assertIs(self.validator.validate(VALID), NO_ERRORS)
+
+    def test_missing_params_are_reported(self):
+        errors = self.validator.validate({"course_id": "KA1003"})
+
+        self.assertEqual(
+            errors,
+            [
+                ParameterError("institution_id", "is required"),
+                ParameterError("mode", "is required"),
+            ],
+        )
+
+    def test_each_invalid_param_is_reported(self):
+        errors = self.validator.validate(
+            {"institution_id": "1000023", "course_id": "KA1 003", "mode": "4"}
+        )
+
+        self.assertEqual(
+            errors,
+            [
+                ParameterError("institution_id", "must be at least 8 characters long"),
+                ParameterError("course_id", "contains invalid characters"),
+                ParameterError("mode", "must be one of 1, 2, 3"),
+            ],
+        )
+
+    def test_pattern_must_match_whole_value(self):
+        errors = self.validator.validate(dict(VALID, course_id="KA1003\n"))
+
+        self.assertEqual(errors, [ParameterError("course_id", "contains invalid characters")])
+
+    def test_non_string_param_is_reported(self):
+        errors = self.validator.validate(dict(VALID, mode=1))
+
+        self.assertEqual(errors, [ParameterError("mode", "must be a string")])
+
+    def test_lengths_and_characters(self):
+        cases = [
+            (dict(VALID, course_id="KA1~(003)!$"), True),
+            (dict(VALID, course_id="K" * 30), True),
+            (dict(VALID, course_id="K" * 31), False),
+            (dict(VALID, course_id=""), False),
+            (dict(VALID, course_id="KA1/003"), False),
+            (dict(VALID, institution_id="1000023A"), False),
+            (dict(VALID, institution_id="100002333"), False),
+            (dict(VALID, mode="0"), False),
+            (dict(VALID, mode="12"), False),
+        ]
+        for params, valid in cases:
+            with self.subTest(params=params):
+                self.assertEqual(not self.validator.validate(params), valid)
+
+    def test_every_operation_gets_a_validator(self):
+        self.assertIn(("/widget/courses/batch", "post"), self.validators)
+
+    def test_lazy_validators_load_the_spec_on_first_validation(self):
+        validators = LazyRouteValidators(SWAGGER_PATH)
+        validator = validators.validator(COURSE_ROUTE, "get")
+        self.assertFalse(validators.loaded)
+
+        errors = validator.validate(dict(VALID, mode="4"))
+
+        self.assertTrue(validators.loaded)
+        self.assertEqual(errors, self.validator.validate(dict(VALID, mode="4")))
+        self.assertIs(validator.validate(VALID), NO_ERRORS)
+
+
+class TestPathItemParameters(unittest.TestCase):
+    SPEC = {
+        "openapi": "3.0.0",
+        "paths": {
+            "/institutions/{institution_id}/courses/{course_id}": {
+                "summary": "A course",
+                "parameters": [
+                    {"$ref": "#/components/parameters/institutionID"},
+                    {"name": "course_id", "in": "path", "required": True, "schema": {"maxLength": 3}},
+                ],
+                "get": {
+                    "parameters": [
+                        {"name": "course_id", "in": "path", "required": True, "schema": {"maxLength": 6}},
+                    ],
+                },
+                "delete": {},
+            },
+        },
+        "components": {
+            "parameters": {
+                "institutionID": {
+                    "name": "institution_id",
+                    "in": "path",
+                    "required": True,
+                    "schema": {"pattern": "[0-9]{8}"},
+                },
+            },
+        },
+    }
+    ROUTE = "/institutions/{institution_id}/courses/{course_id}"
+
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "swagger.yml")
+        with open(path, "w") as f:
+            yaml.safe_dump(cls.SPEC, f)
+        cls.validators = load_route_validators(path)
+
+    def test_only_operations_get_a_validator(self):
+        self.assertEqual(set(self.validators), {(self.ROUTE, "get"), (self.ROUTE, "delete")})
+
+    def test_path_item_parameters_apply_to_every_operation(self):
+        errors = self.validators[self.ROUTE, "delete"].validate({"institution_id": "1000", "course_id": "KA1003"})
+
+        self.assertEqual(
+            errors,
+            [
+                ParameterError("institution_id", "contains invalid characters"),
+                ParameterError("course_id", "must be at most 3 characters long"),
+            ],
+        )
+
+    def test_operation_parameters_override_path_item_ones(self):
+        errors = self.validators[self.ROUTE, "get"].validate({"institution_id": "10000233", "course_id": "KA1003"})
+
+        self.assertIs(errors, NO_ERRORS)
+
+
+if __name__ == "__main__":
+    unittest.main()
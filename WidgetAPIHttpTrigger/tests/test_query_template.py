@@ -0,0 +1,57 @@
+import unittest
+
+from course_fetcher import CourseFetcher, QueryTemplate
+
+from fake_cosmos import FakeCosmosClient
+from fixtures import COURSES_COLLECTION_LINK, make_course_document
+
+
+class TestQueryTemplate(unittest.TestCase):
+    def test_bind_passes_values_as_parameters(self):
+        template = QueryTemplate(
+            "SELECT * from c where c.course_id = @course_id and c.version = @version"
+        )
+
+        query = template.bind(course_id="AB37", version=3)
+
+        self.assertEqual(query["query"], template.text)
+        self.assertEqual(
+            query["parameters"],
+            [{"name": "@course_id", "value": "AB37"}, {"name": "@version", "value": 3}],
+        )
+
+    def test_repeated_parameter_is_bound_once(self):
+        template = QueryTemplate("SELECT * from c where c.a = @id or c.b = @id")
+
+        self.assertEqual(template.parameter_names, ("id",))
+
+    def test_course_queries_share_the_same_text(self):
+        first = CourseFetcher.COURSE_BY_PUB_UKPRN.bind(
+            institution_id="10000055", course_id="AB37", mode=1, version=3
+        )
+        second = CourseFetcher.COURSE_BY_PUB_UKPRN.bind(
+            institution_id="10000056", course_id="CD12", mode=2, version=3
+        )
+
+        self.assertIs(first["query"], second["query"])
+
+
+class TestParameterizedCourseQueries(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeCosmosClient()
+        self.client.add_documents(
+            COURSES_COLLECTION_LINK, [make_course_document(3, "10000055", "10000055", "AB37", 1)]
+        )
+        self.fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK)
+
+    def test_course_is_found_with_parameters(self):
+        self.assertIsNotNone(self.fetcher.get_course(3, "10000055", "AB37", "1"))
+
+    def test_quotes_in_values_are_not_interpreted_as_sql(self):
+        course_id = "AB37' or c.course_id != '"
+
+        self.assertIsNone(self.fetcher.get_course(3, "10000055", course_id, "1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
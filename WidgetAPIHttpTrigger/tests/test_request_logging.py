@@ -0,0 +1,125 @@
+import logging
+import threading
+import unittest
+
+from request_logging import RequestLogSampler, install_sampled_logging, uninstall_sampled_logging
+
+from fixtures import FakeClock, ListHandler
+
+
+class TestRequestLogSampler(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger("test_request_logging")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.written = ListHandler()
+        self.logger.addHandler(self.written)
+        self.addCleanup(self.logger.removeHandler, self.written)
+        self.clock = FakeClock()
+        self.roll = 0.5
+
+    def install(self, sample_rate, slow_request_seconds=1.0):
+        sampler = RequestLogSampler(sample_rate, slow_request_seconds, max_held_records=2,
+                                    rng=lambda: self.roll, clock=self.clock)
+        install_sampled_logging(sampler, self.logger)
+        self.addCleanup(uninstall_sampled_logging, self.logger)
+        return sampler
+
+    def request(self, sampler, status_code=200, seconds=0.1, error=None):
+        token = sampler.start_request()
+        self.logger.info("url: %s", "/widget")
+        self.logger.info("The parameters look good")
+        if error:
+            self.logger.error(error)
+        self.clock.now += seconds
+        sampler.finish_request(token, status_code)
+
+    def written_messages(self):
+        uninstall_sampled_logging(self.logger)
+        return self.written.messages
+
+    def test_sampled_request_is_written(self):
+        self.request(self.install(sample_rate=0.6))
+
+        self.assertEqual(self.written_messages(), ["url: /widget", "The parameters look good"])
+
+    def test_request_that_is_not_sampled_is_dropped(self):
+        self.request(self.install(sample_rate=0.4))
+
+        self.assertEqual(self.written_messages(), [])
+
+    def test_slow_and_failed_requests_are_written_in_full(self):
+        sampler = self.install(sample_rate=0)
+        self.request(sampler, seconds=2.0)
+        self.request(sampler, status_code=None)
+
+        self.assertEqual(self.written_messages(), ["url: /widget", "The parameters look good"] * 2)
+
+    def test_error_writes_the_records_before_it(self):
+        self.request(self.install(sample_rate=0), status_code=400, error="Invalid parameters")
+
+        self.assertEqual(
+            self.written_messages(), ["url: /widget", "The parameters look good", "Invalid parameters"]
+        )
+
+    def test_held_records_are_capped(self):
+        sampler = self.install(sample_rate=0)
+        token = sampler.start_request()
+        for n in range(5):
+            self.logger.info("record %d", n)
+        sampler.finish_request(token, None)
+
+        self.assertEqual(
+            self.written_messages(),
+            ["record 0", "record 1", "3 more INFO records were not kept for this request"],
+        )
+
+    def test_records_outside_a_request_are_written(self):
+        self.install(sample_rate=0)
+        self.logger.info("Caching dataset version %s", 3)
+
+        self.assertEqual(self.written_messages(), ["Caching dataset version 3"])
+
+    def test_records_are_written_on_the_thread_that_logs_them(self):
+        class ThreadHandler(logging.Handler):
+            def emit(self, record):
+                threads.append(threading.current_thread())
+
+        threads = []
+        handler = ThreadHandler()
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+        sampler = self.install(sample_rate=0)
+        self.request(sampler, seconds=2.0)
+        self.logger.info("Caching dataset version %s", 3)
+
+        self.assertEqual(threads, [threading.current_thread()] * 3)
+
+    def test_each_handler_writes_a_held_record_once(self):
+        other = ListHandler()
+        self.logger.addHandler(other)
+        self.addCleanup(self.logger.removeHandler, other)
+
+        self.request(self.install(sample_rate=0), status_code=None)
+
+        self.assertEqual(other.messages, ["url: /widget", "The parameters look good"])
+        self.assertEqual(self.written_messages(), ["url: /widget", "The parameters look good"])
+
+    def test_released_records_respect_the_handler_level(self):
+        self.written.setLevel(logging.WARNING)
+
+        self.request(self.install(sample_rate=0), status_code=400, error="Invalid parameters")
+
+        self.assertEqual(self.written_messages(), ["Invalid parameters"])
+
+    def test_uninstall_leaves_the_handlers_in_place(self):
+        handlers = self.logger.handlers[:]
+        self.install(sample_rate=1)
+
+        self.assertEqual(self.logger.handlers, handlers)
+        uninstall_sampled_logging(self.logger)
+        self.assertEqual(self.written.filters, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import threading
+import unittest
+
+from course_fetcher import CourseFetcher
+from request_timing import RequestTimer, capture_cosmos_responses, parse_query_metrics, span
+
+from fake_cosmos import FakeCosmosClient
+from fixtures import COURSES_COLLECTION_LINK, FakeClock, make_course_document
+
+
+class TestRequestTimer(unittest.TestCase):
+    def test_repeated_stage_accumulates(self):
+        clock = FakeClock()
+        timer = RequestTimer(clock)
+
+        for _ in range(2):
+            with timer.span("query"):
+                clock.now += 0.5
+        with timer.span("tidy"):
+            clock.now += 0.25
+
+        self.assertEqual(timer.stages, {"query": 1.0, "tidy": 0.25})
+        self.assertEqual(timer.summary(status=200)["stages_ms"], {"query": 1000.0, "tidy": 250.0})
+
+    def test_cosmos_charge_and_metrics_are_summed(self):
+        timer = RequestTimer()
+
+        timer.record_cosmos({"x-ms-request-charge": "2.90"})
+        timer.record_cosmos(
+            {
+                "x-ms-request-charge": "3.10",
+                "x-ms-documentdb-query-metrics": "retrievedDocumentCount=4;outputDocumentCount=1",
+            }
+        )
+
+        summary = timer.summary()
+        self.assertEqual(summary["cosmos_requests"], 2)
+        self.assertEqual(summary["request_charge"], 6.0)
+        self.assertEqual(
+            summary["query_metrics"], {"retrievedDocumentCount": 4.0, "outputDocumentCount": 1.0}
+        )
+
+    def test_server_timing(self):
+        clock = FakeClock()
+        timer = RequestTimer(clock)
+        with timer.span("validation"):
+            clock.now += 0.001
+        timer.record_cosmos({"x-ms-request-charge": "2.5"})
+
+        self.assertEqual(
+            timer.server_timing(), 'validation;dur=1.00, cosmos;desc="2.50 RU", total;dur=1.00'
+        )
+
+    def test_query_metrics_are_parsed(self):
+        self.assertEqual(
+            parse_query_metrics("totalExecutionTimeInMs=0.52;indexUtilizationRatio=1.00;bad"),
+            {"totalExecutionTimeInMs": 0.52, "indexUtilizationRatio": 1.0},
+        )
+
+    def test_span_without_timer_does_nothing(self):
+        with span(None, "validation"):
+            pass
+
+
+class TestCourseFetcherTiming(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeCosmosClient(physical_partitions=4)
+        self.client.add_documents(
+            COURSES_COLLECTION_LINK,
+            [
+                make_course_document(3, "10000056", "10000057", "CD12", 2),
+                make_course_document(3, "10000058", "10000058", "EF34", 1),
+            ],
+        )
+        capture_cosmos_responses(self.client)
+
+    def test_stages_and_cosmos_calls_are_recorded(self):
+        timer = RequestTimer()
+        fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK, timer=timer)
+
+        self.assertIsNotNone(fetcher.get_course(3, "10000056", "CD12", "2"))
+
+        self.assertEqual(
+            set(timer.stages), {"cache", "primary_query", "ukprn_fallback", "tidy", "serialize"}
+        )
+        # Three cross-partition queries, each a page from every partition
+        self.assertEqual(timer.cosmos_requests, self.client.partitions_visited)
+        self.assertAlmostEqual(timer.request_charge, self.client.request_charge, places=1)
+        self.assertEqual(timer.query_metrics["outputDocumentCount"], 2)
+
+    def test_every_page_of_a_query_is_charged(self):
+        timer = RequestTimer()
+        fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK, timer=timer)
+
+        fetcher.get_course(3, "10000058", "EF34", "1")
+
+        last_page_charge = float(self.client.last_response_headers["x-ms-request-charge"])
+        self.assertEqual(timer.cosmos_requests, 4)
+        self.assertAlmostEqual(timer.request_charge, self.client.request_charge, places=1)
+        self.assertGreater(timer.request_charge, 3 * last_page_charge)
+
+    def test_concurrent_requests_are_charged_apart(self):
+        keys = [("10000056", "CD12", "2"), ("10000058", "EF34", "1")] * 10
+        timers = [RequestTimer() for _ in keys]
+        start = threading.Barrier(len(keys))
+
+        def fetch(timer, key):
+            start.wait()
+            CourseFetcher(self.client, COURSES_COLLECTION_LINK, timer=timer).get_course(3, *key)
+
+        threads = [threading.Thread(target=fetch, args=(timer, key)) for timer, key in zip(timers, keys)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for timer, key in zip(timers, keys):
+            with self.subTest(key=key):
+                # Found by ukprn in three queries, or by pub_ukprn in one
+                self.assertEqual(timer.cosmos_requests, 12 if key[0] == "10000056" else 4)
+        self.assertAlmostEqual(
+            sum(timer.request_charge for timer in timers), self.client.request_charge, places=0
+        )
+
+    def test_throttled_attempts_are_recorded(self):
+        self.client.throttle_rate = 0.5
+        self.client.retry_after_ms = 1
+        self.client._rng.seed(1)
+        timer = RequestTimer()
+        fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK, timer=timer)
+
+        fetcher.get_course(3, "10000058", "EF34", "1")
+
+        self.assertGreater(self.client.throttled_count, 0)
+        self.assertEqual(timer.cosmos_requests, 4 + self.client.throttled_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
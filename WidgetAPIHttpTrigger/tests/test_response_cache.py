@@ -0,0 +1,165 @@
+import json
+import unittest
+
+from course_fetcher import CourseFetcher
+from response_cache import NegativeCache, ResponseCache
+
+from fixtures import KEY, OTHER_KEY, FakeClock, StubClient
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_miss_then_hit(self):
+        cache = ResponseCache(max_entries=10, max_bytes=1000)
+
+        self.assertIsNone(cache.get(1, KEY))
+        cache.put(1, KEY, b"{}")
+        self.assertEqual(cache.get(1, KEY), b"{}")
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_least_recently_used_entry_is_evicted_on_entry_count(self):
+        cache = ResponseCache(max_entries=2, max_bytes=1000)
+        third_key = ("10000055", "AB39", "1")
+
+        cache.put(1, KEY, b"a")
+        cache.put(1, OTHER_KEY, b"b")
+        cache.get(1, KEY)
+        cache.put(1, third_key, b"c")
+
+        self.assertEqual(cache.get(1, KEY), b"a")
+        self.assertIsNone(cache.get(1, OTHER_KEY))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entries_are_evicted_to_stay_within_byte_budget(self):
+        cache = ResponseCache(max_entries=10, max_bytes=10)
+
+        cache.put(1, KEY, b"123456")
+        cache.put(1, OTHER_KEY, b"123456")
+
+        self.assertIsNone(cache.get(1, KEY))
+        self.assertEqual(cache.stats()["bytes"], 6)
+
+    def test_body_larger_than_byte_budget_is_not_cached(self):
+        cache = ResponseCache(max_entries=10, max_bytes=4)
+
+        cache.put(1, KEY, b"123456")
+
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_newer_version_drops_older_generation(self):
+        cache = ResponseCache(max_entries=10, max_bytes=1000)
+
+        cache.put(1, KEY, b"a")
+        cache.put(1, OTHER_KEY, b"b")
+        cache.put(2, KEY, b"c")
+
+        self.assertIsNone(cache.get(1, OTHER_KEY))
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.stats()["bytes"], 1)
+
+    def test_older_version_is_not_cached(self):
+        cache = ResponseCache(max_entries=10, max_bytes=1000)
+
+        cache.put(2, KEY, b"a")
+        cache.put(1, OTHER_KEY, b"b")
+
+        self.assertIsNone(cache.get(1, OTHER_KEY))
+
+    def test_zero_entries_disables_cache(self):
+        cache = ResponseCache(max_entries=0, max_bytes=1000)
+
+        cache.put(1, KEY, b"a")
+
+        self.assertIsNone(cache.get(1, KEY))
+
+
+class TestCourseFetcherResponseCache(unittest.TestCase):
+    widget = {
+        "institution_id": "10000055",
+        "course_id": "AB37",
+        "country": {"code": "XF", "name": "England"},
+        "statistics": {"employment": [], "nss": []},
+    }
+
+    def test_second_request_is_served_from_cache(self):
+        client = StubClient(self.widget)
+        cache = ResponseCache(max_entries=10, max_bytes=10000)
+        fetcher = CourseFetcher(client, "dbs/db/colls/courses", cache)
+
+        first = fetcher.get_course(1, *KEY)
+        second = fetcher.get_course(1, *KEY)
+
+        self.assertEqual(first, second)
+        self.assertEqual(client.queries, 1)
+        self.assertFalse(json.loads(second)["multiple_subjects"])
+
+    def test_fetcher_without_cache_queries_every_time(self):
+        client = StubClient(self.widget)
+        fetcher = CourseFetcher(client, "dbs/db/colls/courses")
+
+        fetcher.get_course(1, *KEY)
+        fetcher.get_course(1, *KEY)
+
+        self.assertEqual(client.queries, 2)
+
+
+class TestNegativeCache(unittest.TestCase):
+    def test_added_key_is_contained(self):
+        cache = NegativeCache(max_entries=10, ttl_seconds=60, clock=FakeClock())
+
+        self.assertFalse(cache.contains(1, KEY))
+        cache.add(1, KEY)
+        self.assertTrue(cache.contains(1, KEY))
+        self.assertFalse(cache.contains(1, OTHER_KEY))
+
+    def test_key_expires_after_ttl(self):
+        clock = FakeClock()
+        cache = NegativeCache(max_entries=10, ttl_seconds=60, clock=clock)
+
+        cache.add(1, KEY)
+        clock.now = 60
+        self.assertFalse(cache.contains(1, KEY))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_oldest_key_is_dropped_when_full(self):
+        cache = NegativeCache(max_entries=1, ttl_seconds=60, clock=FakeClock())
+
+        cache.add(1, KEY)
+        cache.add(1, OTHER_KEY)
+
+        self.assertFalse(cache.contains(1, KEY))
+        self.assertTrue(cache.contains(1, OTHER_KEY))
+
+    def test_keys_are_scoped_to_dataset_version(self):
+        cache = NegativeCache(max_entries=10, ttl_seconds=60, clock=FakeClock())
+
+        cache.add(1, KEY)
+        self.assertFalse(cache.contains(2, KEY))
+        cache.add(2, OTHER_KEY)
+        self.assertFalse(cache.contains(1, KEY))
+        self.assertEqual(cache.stats()["entries"], 1)
+
+    def test_zero_ttl_disables_cache(self):
+        cache = NegativeCache(max_entries=10, ttl_seconds=0, clock=FakeClock())
+
+        cache.add(1, KEY)
+
+        self.assertFalse(cache.contains(1, KEY))
+
+
+class TestCourseFetcherNegativeCache(unittest.TestCase):
+    def test_repeated_missing_course_is_served_from_cache(self):
+        client = StubClient(None)
+        cache = NegativeCache(max_entries=10, ttl_seconds=60)
+        fetcher = CourseFetcher(client, "dbs/db/colls/courses", negative_cache=cache)
+
+        self.assertIsNone(fetcher.get_course(1, *KEY))
+        queries = client.queries
+        self.assertIsNone(fetcher.get_course(1, *KEY))
+        self.assertEqual(client.queries, queries)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import unittest
+
+from course_fetcher import CourseFetcher
+from serializer import StdlibSerializer
+from utils import get_http_error_response_json, get_http_errors_response_json
+
+from fixtures import KEY, StubClient
+
+
+WIDGET = {
+    "institution_id": "10007857",
+    "course_name": {"english": "Law", "welsh": "Y Gyfraith â Blwyddyn Sylfaen"},
+    "course_mode": 1,
+    "country": {"code": "XI", "name": "Wales"},
+    "statistics": {"employment": [], "nss": [{"question_16": {"agree_or_strongly_agree": 79.5}}]},
+}
+
+
+class RecordingSerializer(StdlibSerializer):
+    def __init__(self):
+        self.serialized = []
+
+    def dumps(self, obj):
+        self.serialized.append(obj)
+        return super().dumps(obj)
+
+
+class TestSerializer(unittest.TestCase):
+    def test_stdlib_serializer_matches_json_dumps(self):
+        self.assertEqual(StdlibSerializer().dumps(WIDGET), json.dumps(WIDGET).encode("utf-8"))
+
+    def test_fetcher_uses_serializer(self):
+        client = StubClient(WIDGET)
+        expected = CourseFetcher(client, "dbs/db/colls/courses").get_course(1, *KEY)
+        serializer = RecordingSerializer()
+
+        body = CourseFetcher(client, "dbs/db/colls/courses", serializer=serializer).get_course(1, *KEY)
+
+        self.assertEqual(body, expected)
+        self.assertEqual(len(serializer.serialized), 1)
+
+    def test_error_bodies_use_serializer(self):
+        serializer = RecordingSerializer()
+
+        body = get_http_error_response_json(serializer, "Not Found", "course", "Course was not found.")
+        bodies = get_http_errors_response_json(serializer, "Bad Request", [("mode", "must be one of 1, 2, 3")])
+
+        self.assertEqual(body, json.dumps(serializer.serialized[0]).encode("utf-8"))
+        self.assertEqual(
+            json.loads(bodies),
+            {"errors": [{"error": "Bad Request", "error_values": [{"mode": "must be one of 1, 2, 3"}]}]},
+        )
+        self.assertEqual(len(serializer.serialized), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
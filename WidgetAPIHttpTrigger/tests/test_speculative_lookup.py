@@ -0,0 +1,95 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.cosmos.errors import HTTPFailure
+
+from course_fetcher import CourseFetcher
+from request_timing import RequestTimer
+
+from fake_cosmos import FakeCosmosClient
+from fixtures import COURSES_COLLECTION_LINK, make_course_document
+
+
+KEYS = [
+    ("10000055", "AB37", "1"),
+    ("10000056", "CD12", "2"),
+    ("10000057", "CD12", "2"),
+    ("10000061", "EF34", "1"),
+    ("10000055", "ZZ99", "1"),
+]
+
+LATENCY_SECONDS = 0.05
+
+
+class FailingPubUkprnFetcher(CourseFetcher):
+    """Fails every pub_ukprn lookup"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failed = []
+
+    def search_with_pub_ukprn(self, institution_id, course_id, mode, version):
+        self.failed.append(institution_id)
+        raise HTTPFailure(503, "Service is currently unavailable.")
+
+
+class TestSpeculativeLookup(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeCosmosClient(physical_partitions=1)
+        self.client.add_documents(
+            COURSES_COLLECTION_LINK,
+            [
+                make_course_document(3, "10000055", "10000055", "AB37", 1),
+                make_course_document(3, "10000056", "10000057", "CD12", 2),
+                make_course_document(3, "10000060", "10000061", "EF34", 1),
+                make_course_document(2, "10000055", "10000055", "ZZ99", 1),
+            ],
+        )
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(self.executor.shutdown)
+
+    def test_courses_match_sequential_lookups(self):
+        sequential = CourseFetcher(self.client, COURSES_COLLECTION_LINK)
+        speculative = CourseFetcher(self.client, COURSES_COLLECTION_LINK, lookup_executor=self.executor)
+
+        for key in KEYS:
+            with self.subTest(key=key):
+                self.assertEqual(speculative.get_course(3, *key), sequential.get_course(3, *key))
+
+    def test_course_found_by_ukprn_takes_two_round_trips(self):
+        self.client.latency_seconds = LATENCY_SECONDS
+        fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK, lookup_executor=self.executor)
+
+        start = time.perf_counter()
+        course = fetcher.get_course(3, "10000056", "CD12", "2")
+        elapsed = time.perf_counter() - start
+
+        self.assertIsNotNone(course)
+        self.assertEqual(self.client.request_count, 3)
+        self.assertLess(elapsed, 2.8 * LATENCY_SECONDS)
+
+    def test_course_found_by_pub_ukprn_takes_one_round_trip(self):
+        self.client.latency_seconds = LATENCY_SECONDS
+        timer = RequestTimer()
+        fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK, timer=timer, lookup_executor=self.executor)
+
+        start = time.perf_counter()
+        course = fetcher.get_course(3, "10000057", "CD12", "2")
+        elapsed = time.perf_counter() - start
+
+        self.assertIsNotNone(course)
+        self.assertLess(elapsed, 1.8 * LATENCY_SECONDS)
+        self.assertIn("speculative_lookup", timer.stages)
+
+    def test_failed_pub_ukprn_lookup_stops_the_ukprn_lookup(self):
+        self.client.latency_seconds = LATENCY_SECONDS
+        fetcher = FailingPubUkprnFetcher(self.client, COURSES_COLLECTION_LINK, lookup_executor=self.executor)
+
+        with self.assertRaises(HTTPFailure):
+            fetcher.get_course(3, "10000056", "CD12", "2")
+        self.executor.shutdown()
+
+        # The ukprn query, without the pub_ukprn query it would lead to
+        self.assertEqual(self.client.request_count, 1)
+        self.assertEqual(fetcher.failed, ["10000056"])
@@ -0,0 +1,171 @@
+import threading
+import unittest
+
+from course_fetcher import CourseFetcher
+from ukprn_alias_index import UkprnAliasIndex, UkprnAliasIndexCache
+
+from fake_cosmos import FakeCosmosClient
+from fixtures import COURSES_COLLECTION_LINK, make_course_document, wait_for_load
+
+
+COURSES = [
+    {"ukprn": "10000001", "pub_ukprn": "10000001", "course_id": "AB37", "mode": "1"},
+    {"ukprn": "10000002", "pub_ukprn": "10000003", "course_id": "CD12", "mode": "1"},
+    {"ukprn": "10000004", "pub_ukprn": "10000005", "course_id": "EF34", "mode": "2"},
+    {"ukprn": "10000004", "pub_ukprn": "10000006", "course_id": "GH56", "mode": "2"},
+]
+
+
+class InMemoryCourseFetcher(CourseFetcher):
+    """Answers the course searches from COURSES and records them"""
+
+    def __init__(self, **kwargs):
+        super().__init__(client=None, collection_link=None, **kwargs)
+        self.searches = []
+
+    def search_with_pub_ukprn(self, institution_id, course_id, mode, version):
+        self.searches.append(("pub_ukprn", institution_id))
+        return [
+            {"widget": self.widget(c)}
+            for c in COURSES
+            if (c["pub_ukprn"], c["course_id"], c["mode"]) == (institution_id, course_id, mode)
+        ]
+
+    def search_with_ukprn(self, institution_id, course_id, mode, version):
+        self.searches.append(("ukprn", institution_id))
+        return [
+            {"widget": {"institution_id": c["ukprn"], "pub_ukprn": c["pub_ukprn"]}}
+            for c in COURSES
+            if (c["ukprn"], c["course_id"], c["mode"]) == (institution_id, course_id, mode)
+        ]
+
+    @staticmethod
+    def widget(course):
+        return {
+            "institution_id": course["pub_ukprn"],
+            "pub_ukprn": course["pub_ukprn"],
+            "course_id": course["course_id"],
+            "country": {"code": "XF", "name": "England"},
+            "statistics": {"employment": [], "nss": []},
+        }
+
+
+class TestUkprnAliasIndex(unittest.TestCase):
+    def test_index_maps_reporting_ukprn_to_pub_ukprns(self):
+        index = UkprnAliasIndex(COURSES)
+
+        self.assertTrue(index.is_pub_ukprn("10000001"))
+        self.assertFalse(index.is_pub_ukprn("10000002"))
+        self.assertEqual(index.get_pub_ukprns("10000002"), {"10000003"})
+        self.assertEqual(index.get_pub_ukprns("10000004"), {"10000005", "10000006"})
+
+    def test_ukprn_that_is_its_own_pub_ukprn_is_not_an_alias(self):
+        index = UkprnAliasIndex(COURSES)
+
+        self.assertEqual(index.get_pub_ukprns("10000001"), frozenset())
+
+
+class TestUkprnAliasIndexCache(unittest.TestCase):
+    def test_index_is_loaded_once_in_background(self):
+        versions = []
+
+        def loader(version):
+            versions.append(version)
+            return COURSES
+
+        cache = UkprnAliasIndexCache(loader)
+        self.assertIsNone(cache.get_index(1))
+        wait_for_load(cache)
+
+        self.assertTrue(cache.get_index(1).is_pub_ukprn("10000003"))
+        cache.get_index(1)
+        self.assertEqual(versions, [1])
+
+    def test_failed_load_is_not_retried_immediately(self):
+        calls = []
+
+        def loader(version):
+            calls.append(version)
+            raise Exception("Cosmos unavailable")
+
+        cache = UkprnAliasIndexCache(loader, retry_seconds=60)
+        cache.get_index(1)
+        wait_for_load(cache)
+
+        self.assertIsNone(cache.get_index(1))
+        self.assertEqual(calls, [1])
+
+    def test_wait_for_index(self):
+        cache = UkprnAliasIndexCache(lambda version: COURSES)
+
+        self.assertTrue(cache.wait_for_index(1, timeout=5).is_pub_ukprn("10000003"))
+
+    def test_wait_for_index_gives_up_after_timeout(self):
+        release = threading.Event()
+
+        def loader(version):
+            release.wait()
+            return COURSES
+
+        cache = UkprnAliasIndexCache(loader)
+        self.addCleanup(wait_for_load, cache)
+        self.addCleanup(release.set)
+
+        self.assertIsNone(cache.wait_for_index(1, timeout=0.01))
+
+
+class TestGetUkprnAliases(unittest.TestCase):
+    def test_each_alias_is_returned_once(self):
+        client = FakeCosmosClient()
+        client.add_documents(
+            COURSES_COLLECTION_LINK,
+            [
+                make_course_document(1, c["ukprn"], c["pub_ukprn"], f'{c["course_id"]}{number}', c["mode"])
+                for c in COURSES
+                for number in range(5)
+            ],
+        )
+
+        aliases = CourseFetcher(client, COURSES_COLLECTION_LINK).get_ukprn_aliases(1)
+
+        self.assertCountEqual(aliases, [{"ukprn": c["ukprn"], "pub_ukprn": c["pub_ukprn"]} for c in COURSES])
+
+
+class TestCourseFetcherUkprnAliases(unittest.TestCase):
+    def setUp(self):
+        self.alias_indexes = UkprnAliasIndexCache(lambda version: COURSES)
+        self.alias_indexes.get_index(1)
+        wait_for_load(self.alias_indexes)
+
+    def test_reporting_ukprn_is_rewritten_before_first_query(self):
+        fetcher = InMemoryCourseFetcher(ukprn_alias_indexes=self.alias_indexes)
+
+        self.assertIsNotNone(fetcher.get_course(1, "10000002", "CD12", "1"))
+        self.assertEqual(fetcher.searches, [("pub_ukprn", "10000003")])
+
+    def test_unknown_institution_needs_no_query(self):
+        fetcher = InMemoryCourseFetcher(ukprn_alias_indexes=self.alias_indexes)
+
+        self.assertIsNone(fetcher.get_course(1, "10009999", "CD12", "1"))
+        self.assertEqual(fetcher.searches, [])
+
+    def test_ambiguous_alias_falls_back_to_ukprn_query(self):
+        fetcher = InMemoryCourseFetcher(ukprn_alias_indexes=self.alias_indexes)
+
+        self.assertIsNotNone(fetcher.get_course(1, "10000004", "GH56", "2"))
+        self.assertEqual(
+            fetcher.searches, [("ukprn", "10000004"), ("pub_ukprn", "10000006")]
+        )
+
+    def test_without_index_ukprn_lookup_takes_three_queries(self):
+        fetcher = InMemoryCourseFetcher()
+
+        self.assertIsNotNone(fetcher.get_course(1, "10000002", "CD12", "1"))
+        self.assertEqual(
+            fetcher.searches,
+            [("pub_ukprn", "10000002"), ("ukprn", "10000002"), ("pub_ukprn", "10000003")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
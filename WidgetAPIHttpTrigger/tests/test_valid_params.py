@@ -1,9 +1,21 @@
 import unittest
 
-from course_param_validator import valid_course_params
+from param_validator import NO_ERRORS, load_route_validators
+
+from fixtures import COURSE_ROUTE, SWAGGER_PATH
 
 
 class TestValidCourseParams(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.validator = load_route_validators(SWAGGER_PATH)[(COURSE_ROUTE, "get")]
+
+    def assertValid(self, params):
+        self.assertIs(self.validator.validate(params), NO_ERRORS)
+
+    def assertInvalid(self, params):
+        self.assertTrue(self.validator.validate(params))
+
     def test_when_all_params_are_valid(self):
         input_params = {
             "institution_id": "10000233",
@@ -11,26 +23,27 @@ class TestValidCourseParams(unittest.TestCase):
             "mode": "1",
         }
 
-        output_result = valid_course_params(input_params)
-        self.assertTrue(output_result)
+        self.assertValid(input_params)
 
     def test_when_institution_id_is_missing(self):
         input_params = {"course_id": "KA1003", "mode": "1"}
 
-        output_result = valid_course_params(input_params)
-        self.assertFalse(output_result)
+        self.assertInvalid(input_params)
 
     def test_when_course_id_is_missing(self):
         input_params = {"institution_id": "10000233", "mode": "1"}
 
-        output_result = valid_course_params(input_params)
-        self.assertFalse(output_result)
+        self.assertInvalid(input_params)
 
     def test_when_mode_is_missing(self):
         input_params = {"institution_id": "10000233", "course_id": "KA1003"}
 
-        output_result = valid_course_params(input_params)
-        self.assertFalse(output_result)
+        self.assertInvalid(input_params)
+
+    def test_when_param_is_not_a_string(self):
+        input_params = {"institution_id": 10000233, "course_id": "KA1003", "mode": "1"}
+
+        self.assertInvalid(input_params)
 
     def test_when_course_id_contains_hyphen(self):
         input_params = {
@@ -39,8 +52,7 @@ class TestValidCourseParams(unittest.TestCase):
             "mode": "1",
         }
 
-        output_result = valid_course_params(input_params)
-        self.assertTrue(output_result)
+        self.assertValid(input_params)
 
     def test_when_course_id_contains_tilda(self):
         input_params = {
@@ -49,8 +61,7 @@ class TestValidCourseParams(unittest.TestCase):
             "mode": "1",
         }
 
-        output_result = valid_course_params(input_params)
-        self.assertTrue(output_result)
+        self.assertValid(input_params)
 
     def test_when_course_id_contains_left_circular_brace(self):
         input_params = {
@@ -59,8 +70,7 @@ class TestValidCourseParams(unittest.TestCase):
             "mode": "1",
         }
 
-        output_result = valid_course_params(input_params)
-        self.assertTrue(output_result)
+        self.assertValid(input_params)
 
     def test_when_course_id_contains_right_circular_brace(self):
         input_params = {
@@ -69,8 +79,7 @@ class TestValidCourseParams(unittest.TestCase):
             "mode": "1",
         }
 
-        output_result = valid_course_params(input_params)
-        self.assertTrue(output_result)
+        self.assertValid(input_params)
 
     def test_when_course_id_contains_exclamation_mark(self):
         input_params = {
@@ -79,8 +88,7 @@ class TestValidCourseParams(unittest.TestCase):
             "mode": "1",
         }
 
-        output_result = valid_course_params(input_params)
-        self.assertTrue(output_result)
+        self.assertValid(input_params)
 
     def test_when_course_id_contains_dollar_sign(self):
         input_params = {
@@ -89,5 +97,4 @@ class TestValidCourseParams(unittest.TestCase):
             "mode": "1",
         }
 
-        output_result = valid_course_params(input_params)
-        self.assertTrue(output_result)
+        self.assertValid(input_params)
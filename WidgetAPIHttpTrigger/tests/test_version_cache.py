@@ -0,0 +1,190 @@
+import threading
+import unittest
+
+from version_cache import VersionCache
+
+from fixtures import FakeClock, wait_for_refresh
+
+
+class VersionLoader:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class TestVersionCache(unittest.TestCase):
+    def test_first_call_loads_version(self):
+        loader = VersionLoader(3)
+        cache = VersionCache(loader, ttl_seconds=60, clock=FakeClock())
+
+        self.assertEqual(cache.get_version(), 3)
+        self.assertEqual(loader.calls, 1)
+
+    def test_version_is_served_from_cache_within_ttl(self):
+        clock = FakeClock()
+        loader = VersionLoader(3)
+        cache = VersionCache(loader, ttl_seconds=60, clock=clock)
+
+        cache.get_version()
+        clock.now = 59
+        self.assertEqual(cache.get_version(), 3)
+        self.assertEqual(loader.calls, 1)
+
+    def test_expired_version_is_refreshed_in_background(self):
+        clock = FakeClock()
+        loader = VersionLoader(3, 4)
+        cache = VersionCache(loader, ttl_seconds=60, clock=clock)
+
+        cache.get_version()
+        clock.now = 60
+        # The caller that notices expiry still gets the cached version.
+        self.assertEqual(cache.get_version(), 3)
+        wait_for_refresh(cache)
+        self.assertEqual(cache.get_version(), 4)
+        self.assertEqual(loader.calls, 2)
+
+    def test_failed_refresh_keeps_last_known_version(self):
+        clock = FakeClock()
+        loader = VersionLoader(3, Exception("Cosmos unavailable"), 4)
+        cache = VersionCache(loader, ttl_seconds=60, clock=clock)
+
+        cache.get_version()
+        clock.now = 60
+        cache.get_version()
+        wait_for_refresh(cache)
+        self.assertEqual(cache.get_version(), 3)
+
+        # The failure is retried after another TTL.
+        clock.now = 120
+        cache.get_version()
+        wait_for_refresh(cache)
+        self.assertEqual(cache.get_version(), 4)
+
+    def test_only_one_refresh_runs_at_a_time(self):
+        clock = FakeClock()
+        release = threading.Event()
+        calls = []
+
+        def loader():
+            calls.append(None)
+            if len(calls) > 1:
+                release.wait()
+            return len(calls)
+
+        cache = VersionCache(loader, ttl_seconds=60, clock=clock)
+        cache.get_version()
+        clock.now = 60
+        for _ in range(10):
+            self.assertEqual(cache.get_version(), 1)
+        release.set()
+        wait_for_refresh(cache)
+        self.assertEqual(len(calls), 2)
+
+    def test_zero_ttl_loads_on_every_call(self):
+        loader = VersionLoader(3)
+        cache = VersionCache(loader, ttl_seconds=0, clock=FakeClock())
+
+        cache.get_version()
+        cache.get_version()
+        self.assertEqual(loader.calls, 2)
+
+
+class TestVersionAge(unittest.TestCase):
+    def test_age_is_measured_from_publication(self):
+        wall_clock = FakeClock()
+        wall_clock.now = 1000
+        cache = VersionCache(
+            VersionLoader(3),
+            ttl_seconds=60,
+            clock=FakeClock(),
+            published_at_loader=lambda version: 400,
+            wall_clock=wall_clock,
+        )
+
+        self.assertIsNone(cache.get_version_age())
+        cache.get_version()
+        self.assertEqual(cache.get_version_age(), 600)
+
+    def test_age_is_measured_from_first_sight_without_publication_time(self):
+        wall_clock = FakeClock()
+        wall_clock.now = 1000
+        cache = VersionCache(
+            VersionLoader(3),
+            ttl_seconds=60,
+            clock=FakeClock(),
+            published_at_loader=VersionLoader(Exception("Cosmos unavailable")),
+            wall_clock=wall_clock,
+        )
+
+        cache.get_version()
+        wall_clock.now = 1030
+        self.assertEqual(cache.get_version_age(), 30)
+
+    def test_new_version_resets_age(self):
+        clock = FakeClock()
+        wall_clock = FakeClock()
+        published_at = {3: 100, 4: 900}
+        cache = VersionCache(
+            VersionLoader(3, 4),
+            ttl_seconds=60,
+            clock=clock,
+            published_at_loader=published_at.get,
+            wall_clock=wall_clock,
+        )
+
+        cache.get_version()
+        clock.now = 60
+        wall_clock.now = 1000
+        cache.get_version()
+        wait_for_refresh(cache)
+        self.assertEqual(cache.get_version(), 4)
+        self.assertEqual(cache.get_version_age(), 100)
+
+    def test_new_version_is_prepared_before_it_is_served(self):
+        clock = FakeClock()
+        served_while_preparing = []
+
+        def before_version_change(previous, version):
+            served_while_preparing.append((previous, version, cache.get_version()))
+
+        cache = VersionCache(
+            VersionLoader(3, 3, 4), ttl_seconds=60, clock=clock, before_version_change=before_version_change
+        )
+
+        cache.get_version()
+        clock.now = 60
+        cache.get_version()
+        wait_for_refresh(cache)
+        self.assertEqual(served_while_preparing, [])
+
+        clock.now = 120
+        cache.get_version()
+        wait_for_refresh(cache)
+        self.assertEqual(served_while_preparing, [(3, 4, 3)])
+        self.assertEqual(cache.get_version(), 4)
+
+    def test_failed_preparation_still_switches_version(self):
+        clock = FakeClock()
+
+        def before_version_change(previous, version):
+            raise RuntimeError("prefetch failed")
+
+        cache = VersionCache(VersionLoader(3, 4), ttl_seconds=60, clock=clock, before_version_change=before_version_change)
+
+        cache.get_version()
+        clock.now = 60
+        with self.assertLogs(level="ERROR"):
+            cache.get_version()
+            wait_for_refresh(cache)
+        self.assertEqual(cache.get_version(), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+
+from course_fetcher import CourseFetcher
+from widget_snapshot import WidgetSnapshot, WidgetSnapshotStore, build_snapshot
+
+from fake_cosmos import FakeCosmosClient
+from fixtures import COURSES_COLLECTION_LINK, FakeClock, make_course_document
+
+
+class TestWidgetSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "widgets-3.snap")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_every_key_returns_its_body(self):
+        courses = [
+            ([("10000055", "AB37", "1")], b'{"a": 1}'),
+            ([("10000057", "CD12", "2"), ("10000056", "CD12", "2")], b'{"b": 2}'),
+            ([("10000055", "AB37", "2")], b'{"c": 3}'),
+        ]
+        build_snapshot(self.path, 3, iter(courses))
+
+        snapshot = WidgetSnapshot(self.path)
+        self.assertEqual(snapshot.version, 3)
+        for keys, body in courses:
+            for key in keys:
+                self.assertEqual(bytes(snapshot.get(key)), body)
+
+    def test_missing_key_returns_none(self):
+        build_snapshot(self.path, 3, [([("10000055", "AB37", "1")], b"{}")])
+
+        snapshot = WidgetSnapshot(self.path)
+        self.assertIsNone(snapshot.get(("10000055", "AB37", "2")))
+        self.assertIsNone(snapshot.get(("10000055", "AB37-LONGER-THAN-ANY-KEY", "1")))
+
+    def test_empty_version(self):
+        build_snapshot(self.path, 3, [])
+
+        self.assertIsNone(WidgetSnapshot(self.path).get(("10000055", "AB37", "1")))
+
+
+class TestWidgetSnapshotStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_version_without_snapshot_is_rechecked_after_delay(self):
+        clock = FakeClock()
+        store = WidgetSnapshotStore(self.directory.name, recheck_seconds=60, clock=clock)
+
+        self.assertIsNone(store.get_snapshot(3))
+        store.build(3, [([("10000055", "AB37", "1")], b"{}")])
+        self.assertIsNone(store.get_snapshot(3))
+
+        clock.now = 60
+        self.assertEqual(store.get_snapshot(3).version, 3)
+
+
+class TestCourseFetcherWidgetSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.client = FakeCosmosClient(physical_partitions=4)
+        self.client.add_documents(
+            COURSES_COLLECTION_LINK,
+            [
+                make_course_document(3, "10000055", "10000055", "AB37", 1),
+                make_course_document(3, "10000055", "10000055", "AB37", 2),
+                make_course_document(3, "10000056", "10000057", "CD12", 2),
+                make_course_document(3, "10000058", "10000059", "EF34", 1),
+                make_course_document(3, "10000059", "10000058", "EF34", 1),
+                make_course_document(2, "10000055", "10000055", "GH56", 1),
+            ],
+        )
+        self.store = WidgetSnapshotStore(self.directory.name)
+        self.store.build(3, CourseFetcher(self.client, COURSES_COLLECTION_LINK).get_version_courses(3))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_snapshot_matches_cosmos(self):
+        fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK)
+        snapshot_fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK, widget_snapshots=self.store)
+        keys = [
+            ("10000055", "AB37", "1"),
+            ("10000055", "AB37", "2"),
+            ("10000057", "CD12", "2"),
+            ("10000056", "CD12", "2"),
+            ("10000058", "EF34", "1"),
+            ("10000059", "EF34", "1"),
+            ("10000055", "GH56", "1"),
+            ("10000060", "AB37", "1"),
+        ]
+
+        expected = [fetcher.get_course(3, *key) for key in keys]
+        self.client.reset_stats()
+        actual = [snapshot_fetcher.get_course(3, *key) for key in keys]
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(self.client.request_count, 0)
+
+    def test_version_without_snapshot_queries_cosmos(self):
+        fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK, widget_snapshots=self.store)
+
+        self.assertIsNotNone(fetcher.get_course(2, "10000055", "GH56", "1"))
+        self.assertGreater(self.client.request_count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
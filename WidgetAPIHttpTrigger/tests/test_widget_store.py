@@ -0,0 +1,131 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.cosmos.errors import HTTPFailure
+
+from course_fetcher import CourseFetcher
+from widget_store import WidgetStore
+
+from fake_cosmos import FakeCosmosClient
+from fixtures import COURSES_COLLECTION_LINK, FakeClock, make_course_document
+
+
+WIDGETS_COLLECTION_LINK = "dbs/discoveruni/colls/widgets"
+
+KEYS = [
+    ("10000055", "AB37", "1"),
+    ("10000057", "CD12", "2"),
+    ("10000056", "CD12", "2"),
+    ("10000055", "ZZ99", "1"),
+]
+
+
+class TestWidgetStore(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeCosmosClient(
+            physical_partitions=4, partition_key_paths={WIDGETS_COLLECTION_LINK: "/partition_key"}
+        )
+        self.client.add_documents(
+            COURSES_COLLECTION_LINK,
+            [
+                make_course_document(3, "10000055", "10000055", "AB37", 1),
+                make_course_document(3, "10000056", "10000057", "CD12", 2),
+            ],
+        )
+        self.clock = FakeClock()
+        self.store = WidgetStore(
+            self.client, WIDGETS_COLLECTION_LINK, recheck_seconds=60, clock=self.clock
+        )
+
+    def materialize(self, version):
+        courses = CourseFetcher(self.client, COURSES_COLLECTION_LINK).get_version_courses(version)
+        return self.store.write(version, courses)
+
+    def test_materialized_widgets_match_cosmos(self):
+        fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK)
+        expected = [fetcher.get_course(3, *key) for key in KEYS]
+
+        self.materialize(3)
+        store_fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK, widget_store=self.store)
+        self.client.reset_stats()
+        actual = [store_fetcher.get_course(3, *key) for key in KEYS]
+
+        self.assertEqual(actual, expected)
+        # One read for the marker, then one point read per course
+        self.assertEqual(self.client.request_count, len(KEYS) + 1)
+        self.assertEqual(self.client.partitions_visited, len(KEYS) + 1)
+
+    def test_batch_reads_materialized_widgets(self):
+        expected = CourseFetcher(self.client, COURSES_COLLECTION_LINK).get_courses(3, KEYS)
+
+        self.materialize(3)
+        store_fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK, widget_store=self.store)
+
+        self.assertEqual(store_fetcher.get_courses(3, KEYS), expected)
+
+    def test_failed_store_reads_query_courses(self):
+        fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK)
+        expected = {key: fetcher.get_course(3, *key) for key in KEYS}
+        self.materialize(3)
+
+        def throttled(document_link, options=None):
+            raise HTTPFailure(429, "Request rate is large")
+
+        for marker_read in ("fails", "succeeds"):
+            with self.subTest(marker_read=marker_read):
+                store = WidgetStore(self.client, WIDGETS_COLLECTION_LINK)
+                if marker_read == "succeeds":
+                    self.assertTrue(store.is_complete(3))
+                store_fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK, widget_store=store)
+
+                self.client.ReadItem = throttled
+                try:
+                    with self.assertLogs(level="WARNING"):
+                        courses = {key: store_fetcher.get_course(3, *key) for key in KEYS}
+                        batch = store_fetcher.get_courses(3, KEYS)
+                finally:
+                    del self.client.ReadItem
+
+                self.assertEqual(courses, expected)
+                self.assertEqual(batch, expected)
+
+    def test_materializing_again_rewrites_the_same_documents(self):
+        self.assertEqual(self.materialize(3), 3)
+        documents = sum(len(p) for p in self.client.collections[WIDGETS_COLLECTION_LINK])
+
+        self.assertEqual(self.materialize(3), 3)
+        self.assertEqual(
+            sum(len(p) for p in self.client.collections[WIDGETS_COLLECTION_LINK]), documents
+        )
+
+    def test_version_is_only_served_once_complete(self):
+        self.assertFalse(self.store.is_complete(3))
+        self.materialize(3)
+        self.assertFalse(self.store.is_complete(3))
+
+        self.clock.now = 60
+        self.assertTrue(self.store.is_complete(3))
+
+    def test_concurrent_checks_read_the_marker_once(self):
+        self.client.latency_seconds = 0.02
+        for complete in (False, True):
+            with self.subTest(complete=complete):
+                version = 4 if complete else 3
+                if complete:
+                    self.materialize(version)
+                self.client.reset_stats()
+
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    results = list(executor.map(self.store.is_complete, [version] * 8))
+
+                self.assertEqual(results, [complete] * 8)
+                self.assertEqual(self.client.request_count, 1)
+
+    def test_incomplete_version_queries_courses(self):
+        fetcher = CourseFetcher(self.client, COURSES_COLLECTION_LINK, widget_store=self.store)
+
+        self.assertIsNotNone(fetcher.get_course(3, "10000055", "AB37", "1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
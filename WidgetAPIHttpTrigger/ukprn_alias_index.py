@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+
+
+class UkprnAliasIndex:
+    """Maps reporting UKPRNs to publication UKPRNs for a dataset version.
+
+    Built from one row per course holding the course's ukprn and
+    pub_ukprn. A reporting UKPRN can publish courses under more than one
+    pub_ukprn, so each alias maps to the set of pub_ukprns other than
+    itself that its courses are published under.
+    """
+
+    def __init__(self, rows):
+        self.pub_ukprns = set()
+        aliases = {}
+        for row in rows:
+            ukprn = row.get("ukprn")
+            pub_ukprn = row.get("pub_ukprn")
+            if pub_ukprn is not None:
+                self.pub_ukprns.add(pub_ukprn)
+            if ukprn is not None and pub_ukprn is not None and ukprn != pub_ukprn:
+                aliases.setdefault(ukprn, set()).add(pub_ukprn)
+        self.aliases = {ukprn: frozenset(pubs) for ukprn, pubs in aliases.items()}
+
+    def is_pub_ukprn(self, institution_id):
+        return institution_id in self.pub_ukprns
+
+    def get_pub_ukprns(self, institution_id):
+        """Returns the pub_ukprns a reporting UKPRN publishes under"""
+        return self.aliases.get(institution_id, frozenset())
+
+
+class UkprnAliasIndexCache:
+    """Holds the UkprnAliasIndex for the latest dataset version.
+
+    The index for a version is loaded once, on a background thread, the
+    first time it is asked for. Until it is ready get_index returns None
+    and callers fall back to querying Cosmos DB for the alias. A failed
+    load is retried no sooner than retry_seconds later.
+    """
+
+    def __init__(self, loader, retry_seconds=60, clock=time.monotonic):
+        self.loader = loader
+        self.retry_seconds = retry_seconds
+        self.clock = clock
+        self._loaded = (None, None)
+        self._load_thread = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    def get_index(self, version):
+        loaded_version, index = self._loaded
+        if loaded_version == version:
+            return index
+
+        with self._lock:
+            if self._load_thread is not None:
+                return None
+            if loaded_version is not None and version < loaded_version:
+                return None
+            if self._failed_at is not None and self.clock() - self._failed_at < self.retry_seconds:
+                return None
+            self._load_thread = threading.Thread(
+                target=self._load, args=(version,), name="ukprn-alias-index-load", daemon=True
+            )
+        self._load_thread.start()
+        return None
+
+    def wait_for_index(self, version, timeout):
+        """Returns the index for the version, waiting up to timeout seconds for it to load
+
+        Starts the load as get_index does. Returns None if the index
+        isn't ready in time, or it can't be loaded.
+        """
+        index = self.get_index(version)
+        if index is not None:
+            return index
+        thread = self._load_thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.get_index(version)
+
+    def _load(self, version):
+        try:
+            index = UkprnAliasIndex(self.loader(version))
+            logging.info(
+                f"Loaded {len(index.aliases)} ukprn aliases for dataset version {version}"
+            )
+            self._loaded = (version, index)
+            self._failed_at = None
+        except Exception:
+            logging.exception(f"Loading ukprn aliases for dataset version {version} failed")
+            self._failed_at = self.clock()
+        finally:
+            with self._lock:
+                self._load_thread = None
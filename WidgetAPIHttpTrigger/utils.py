@@ -1,6 +1,7 @@
 """Functions shared by Azure Functions"""
 
-import json
+import hashlib
+import logging
 import os
 
 import azure.cosmos.cosmos_client as cosmos_client
@@ -13,20 +14,78 @@ def get_collection_link(db_id, collection_id):
     return "dbs/" + db_id + "/colls/" + collection_id
 
 
-def get_cosmos_client(cosmosdb_uri, cosmosdb_key):
+def get_cosmos_client(cosmosdb_uri, cosmosdb_key, connection_policy=None, consistency_level="Session"):
 
     master_key = "masterKey"
 
     return cosmos_client.CosmosClient(
-        url_connection=cosmosdb_uri, auth={master_key: cosmosdb_key}
+        url_connection=cosmosdb_uri,
+        auth={master_key: cosmosdb_key},
+        connection_policy=connection_policy,
+        consistency_level=consistency_level,
     )
 
 
-def get_http_error_response_json(error_title, error_key, error_value):
-    """Returns a JSON object indicating an Http Error"""
+def get_http_error_response_json(serializer, error_title, error_key, error_value):
+    """Returns a JSON object indicating an Http Error, serialized to bytes"""
     http_error_resp = {}
     http_error_resp["errors"] = []
     http_error_resp["errors"].append(
         {"error": error_title, "error_values": [{error_key: error_value}]}
     )
-    return json.dumps(http_error_resp)
+    return serializer.dumps(http_error_resp)
+
+
+def get_http_errors_response_json(serializer, error_title, error_values):
+    """Returns a JSON object indicating an Http Error with several key/value pairs, serialized to bytes"""
+    http_error_resp = {}
+    http_error_resp["errors"] = [
+        {
+            "error": error_title,
+            "error_values": [{key: value} for key, value in error_values],
+        }
+    ]
+    return serializer.dumps(http_error_resp)
+
+
+def parse_course_keys(value):
+    """Parses "institution_id/course_id/mode" keys separated by commas into tuples"""
+    keys = []
+    for item in value.split(","):
+        parts = tuple(part.strip() for part in item.strip().split("/"))
+        if len(parts) == 3 and all(parts):
+            keys.append(parts)
+        elif item.strip():
+            logging.warning("Ignoring course key %r, expected institution_id/course_id/mode", item)
+    return keys
+
+
+def get_course_etag(version, institution_id, course_id, mode):
+    """Returns a strong ETag for a course in a dataset version
+
+    A dataset version never changes once loaded, so the version and the
+    course key identify the response body without having to read it.
+    """
+    key = f"{institution_id}/{course_id}/{mode}".encode("utf-8")
+    return f'"{version}-{hashlib.sha1(key).hexdigest()[:16]}"'
+
+
+def get_encoded_etag(etag, content_encoding):
+    """Returns the ETag of a compressed variant of a response"""
+    return f'{etag[:-1]}-{content_encoding}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Returns True if an If-None-Match header lists the ETag or is *"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        # If-None-Match uses the weak comparison
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import threading
+import time
+
+
+class VersionCache:
+    """Process-wide cache of the latest successful dataset version.
+
+    The first caller loads the version synchronously; callers arriving
+    while that load is in flight wait for it rather than issuing their
+    own query. Once the cached version is older than the TTL, the next
+    caller starts a single background refresh and carries on with the
+    cached value, so no request pays for the refresh. If a refresh fails
+    the last known version is kept and retried after another TTL.
+
+    A TTL of zero or less disables caching and loads on every call.
+
+    When a new version is cached, published_at_loader is asked for the
+    time, in seconds since the epoch, the version was published, so
+    get_version_age can tell how long it has been current. Without it,
+    or if it fails, the time this process first saw the version is used.
+
+    When a refresh finds a new version, before_version_change is called
+    with the cached and the new version on the refresh thread, and the
+    cached version is only switched once it returns, so callers keep
+    getting the version they have warm caches for in the meantime.
+    """
+
+    def __init__(
+        self,
+        loader,
+        ttl_seconds,
+        clock=time.monotonic,
+        published_at_loader=None,
+        wall_clock=time.time,
+        before_version_change=None,
+    ):
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.published_at_loader = published_at_loader
+        self.wall_clock = wall_clock
+        self.before_version_change = before_version_change
+        self._state = None
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+
+    def get_version(self):
+        if self.ttl_seconds <= 0:
+            return self.loader()
+
+        state = self._state
+        if state is None:
+            return self._load_first_version()
+
+        version, loaded_at, _ = state
+        if self.clock() - loaded_at >= self.ttl_seconds:
+            self._start_refresh()
+        return version
+
+    def get_version_age(self):
+        """Returns the seconds the cached version has been current, or None"""
+        state = self._state
+        if state is None:
+            return None
+        return max(0.0, self.wall_clock() - state[2])
+
+    async def get_version_async(self, executor=None):
+        """Returns the version like get_version, without blocking the event loop
+
+        Only loading the first version blocks, so only that runs on the
+        executor.
+        """
+        if self.ttl_seconds > 0 and self._state is not None:
+            return self.get_version()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.get_version)
+
+    def _load_first_version(self):
+        with self._lock:
+            if self._state is None:
+                self._store(self.loader())
+            return self._state[0]
+
+    def _start_refresh(self):
+        with self._lock:
+            if self._refresh_thread is not None:
+                return
+            self._refresh_thread = threading.Thread(
+                target=self._refresh, name="dataset-version-refresh", daemon=True
+            )
+        self._refresh_thread.start()
+
+    def _refresh(self):
+        try:
+            version = self.loader()
+            current = self._state[0]
+            if version != current and self.before_version_change is not None:
+                try:
+                    self.before_version_change(current, version)
+                except Exception:
+                    logging.exception(f"Preparing for dataset version {version} failed")
+            self._store(version)
+        except Exception:
+            version, _, published_at = self._state
+            logging.exception(
+                f"Refreshing the dataset version failed, keeping version {version}"
+            )
+            self._state = (version, self.clock(), published_at)
+        finally:
+            with self._lock:
+                self._refresh_thread = None
+
+    def _store(self, version):
+        previous = self._state
+        if previous is None or previous[0] != version:
+            logging.info(f"Caching dataset version {version}")
+            published_at = self._load_published_at(version)
+        else:
+            published_at = previous[2]
+        self._state = (version, self.clock(), published_at)
+
+    def _load_published_at(self, version):
+        if self.published_at_loader is not None:
+            try:
+                published_at = self.published_at_loader(version)
+                if published_at is not None:
+                    return published_at
+            except Exception:
+                logging.exception(f"Loading when dataset version {version} was published failed")
+        return self.wall_clock()
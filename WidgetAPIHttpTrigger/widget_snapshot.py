@@ -0,0 +1,138 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+MAGIC = b"WIDGETS1"
+
+# magic, dataset version, key count, key width, index offset
+HEADER = struct.Struct("<8sQIIQ")
+
+# body offset, body length; each index record starts with the key
+INDEX_POSITION = struct.Struct("<QI")
+
+
+def encode_key(key):
+    """Encodes an (institution_id, course_id, mode) key for the index"""
+    return "\x1f".join(key).encode("utf-8")
+
+
+def build_snapshot(path, version, courses):
+    """Writes a snapshot of every widget in a dataset version.
+
+    Takes (keys, body) pairs, where body is a serialized widget and keys
+    lists every lookup key that returns it. The file holds a header, the
+    concatenated bodies and then an index of fixed-width records sorted
+    by key, each pointing at a body. It is written to a temporary file
+    and moved into place, so readers never see a partial snapshot.
+    """
+    index = []
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(bytes(HEADER.size))
+        offset = HEADER.size
+        for keys, body in courses:
+            f.write(body)
+            for key in keys:
+                index.append((encode_key(key), offset, len(body)))
+            offset += len(body)
+
+        index.sort()
+        key_width = max((len(k) for k, _, _ in index), default=0)
+        for encoded_key, body_offset, body_length in index:
+            f.write(encoded_key.ljust(key_width, b"\0"))
+            f.write(INDEX_POSITION.pack(body_offset, body_length))
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, version, len(index), key_width, offset))
+    os.replace(temp_path, path)
+    logging.info(f"Wrote {len(index)} widget keys for dataset version {version} to {path}")
+
+
+class WidgetSnapshot:
+    """Answers course lookups from a memory-mapped snapshot file.
+
+    get does a binary search of the sorted index and returns a
+    memoryview of the body in the mapped file, so the body isn't copied,
+    parsed or serialized.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.version, self.count, self.key_width, self.index_offset = HEADER.unpack_from(self.mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a widget snapshot")
+        self.record_size = self.key_width + INDEX_POSITION.size
+        self.view = memoryview(self.mm)
+
+    def get(self, key):
+        """Returns the body for the key, or None if the version has no such course"""
+        encoded_key = encode_key(key)
+        if len(encoded_key) > self.key_width:
+            return None
+        encoded_key = encoded_key.ljust(self.key_width, b"\0")
+
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            start = self.index_offset + middle * self.record_size
+            record_key = self.mm[start:start + self.key_width]
+            if record_key < encoded_key:
+                low = middle + 1
+            elif record_key > encoded_key:
+                high = middle
+            else:
+                body_offset, body_length = INDEX_POSITION.unpack_from(
+                    self.mm, start + self.key_width
+                )
+                return self.view[body_offset:body_offset + body_length]
+        return None
+
+
+class WidgetSnapshotStore:
+    """Finds the snapshot for a dataset version in a directory.
+
+    Snapshots are named widgets-<version>.snap. A version without a
+    snapshot is checked for again after recheck_seconds, so a snapshot
+    built after the version went live is picked up.
+    """
+
+    def __init__(self, directory, recheck_seconds=60, clock=time.monotonic):
+        self.directory = directory
+        self.recheck_seconds = recheck_seconds
+        self.clock = clock
+        self._snapshot = None
+        self._missing = {}
+        self._lock = threading.Lock()
+
+    def path(self, version):
+        return os.path.join(self.directory, f"widgets-{version}.snap")
+
+    def get_snapshot(self, version):
+        """Returns the snapshot for the version, or None if there isn't one"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        checked_at = self._missing.get(version)
+        if checked_at is not None and self.clock() - checked_at < self.recheck_seconds:
+            return None
+
+        with self._lock:
+            path = self.path(version)
+            if not os.path.exists(path):
+                self._missing = {version: self.clock()}
+                return None
+            snapshot = WidgetSnapshot(path)
+            logging.info(f"Serving dataset version {version} from {path}")
+            self._snapshot = snapshot
+            self._missing = {}
+            return snapshot
+
+    def build(self, version, courses):
+        """Builds the snapshot for the version from (keys, body) pairs"""
+        os.makedirs(self.directory, exist_ok=True)
+        build_snapshot(self.path(version), version, courses)
@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+
+from azure.cosmos.errors import HTTPFailure
+
+
+class WidgetStore:
+    """Materialized widgets for each dataset version, in a Cosmos DB container.
+
+    Each document holds the final serialized widget for one lookup key,
+    with a deterministic id, so reading a course is a single point read
+    and writing a version again replaces the same documents. Documents
+    are partitioned by dataset version. A marker document is written
+    once every widget in a version is, and a version is only served from
+    the store after its marker exists; versions without one are checked
+    again after recheck_seconds.
+    """
+
+    def __init__(self, client, collection_link, recheck_seconds=60, clock=time.monotonic):
+        self.client = client
+        self.collection_link = collection_link
+        self.recheck_seconds = recheck_seconds
+        self.clock = clock
+        self._complete_versions = set()
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def document_id(version, key):
+        institution_id, course_id, mode = key
+        # institution_id and mode are fixed width, so course_id goes last
+        return f"{version}-{institution_id}-{mode}-{course_id}"
+
+    @staticmethod
+    def marker_id(version):
+        return f"{version}-complete"
+
+    def document_link(self, document_id):
+        return f"{self.collection_link}/docs/{document_id}"
+
+    def is_complete(self, version):
+        """Returns True if every widget in the version has been written"""
+        known = self._known_complete(version)
+        if known is not None:
+            return known
+
+        with self._lock:
+            # Another thread may have read the marker while this one waited
+            known = self._known_complete(version)
+            if known is not None:
+                return known
+            complete = self.read(version, self.marker_id(version)) is not None
+            if complete:
+                logging.info(f"Serving dataset version {version} from the widget store")
+                self._complete_versions.add(version)
+                self._checked.pop(version, None)
+            else:
+                self._checked[version] = self.clock()
+            return complete
+
+    def _known_complete(self, version):
+        """Returns whether the version is complete, or None if the marker needs reading"""
+        if version in self._complete_versions:
+            return True
+        checked_at = self._checked.get(version)
+        if checked_at is not None and self.clock() - checked_at < self.recheck_seconds:
+            return False
+        return None
+
+    def get(self, version, key):
+        """Returns the serialized widget for the key, or None if there isn't one"""
+        document = self.read(version, self.document_id(version, key))
+        if document is None:
+            return None
+        return document["body"].encode("utf-8")
+
+    def read(self, version, document_id):
+        document_link = self.document_link(document_id)
+        try:
+            return self.client.ReadItem(document_link, {"partitionKey": str(version)})
+        except HTTPFailure as e:
+            if e.status_code != 404:
+                raise
+            return None
+
+    def write(self, version, courses):
+        """Writes the widgets for a version from (keys, body) pairs
+
+        Returns the number of documents written, not counting the marker.
+        """
+        count = 0
+        for keys, body in courses:
+            body = body.decode("utf-8")
+            for key in keys:
+                self.client.UpsertItem(
+                    self.collection_link,
+                    {
+                        "id": self.document_id(version, key),
+                        "partition_key": str(version),
+                        "version": version,
+                        "body": body,
+                    },
+                )
+                count += 1
+
+        self.client.UpsertItem(
+            self.collection_link,
+            {
+                "id": self.marker_id(version),
+                "partition_key": str(version),
+                "version": version,
+                "widget_count": count,
+            },
+        )
+        logging.info(f"Wrote {count} widgets for dataset version {version}")
+        return count
@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import traceback
+import azure.functions as func
+
+from ..WidgetAPIHttpTrigger import (
+    COURSE_NOT_FOUND_BODY,
+    course_params_validator,
+    create_course_fetcher,
+    serializer,
+    version_cache,
+)
+
+from ..WidgetAPIHttpTrigger.utils import get_http_error_response_json
+
+batch_max_courses = int(os.environ.get("BatchMaxCourses", "50"))
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    """Implements the REST API endpoint for getting several courses at once.
+
+    The endpoint implemented is:
+        /courses/batch
+
+    It takes a JSON body listing up to BatchMaxCourses courses:
+        {"courses": [{"institution_id": ..., "course_id": ..., "mode": ...}]}
+
+    and returns each course keyed by "institution_id/course_id/mode",
+    with the usual not found error body in place of missing courses.
+    The API is fully documented in a swagger document in the same repo
+    as this module.
+    """
+
+    try:
+        logging.info("Process a request for a batch of courses.")
+        logging.info("url: %s", req.url)
+
+        try:
+            courses = req.get_json()["courses"]
+        except (ValueError, TypeError, KeyError):
+            return bad_request("Request body must be a JSON object with a courses list")
+
+        if not isinstance(courses, list) or not courses:
+            return bad_request("courses must be a non-empty list")
+
+        if len(courses) > batch_max_courses:
+            return bad_request(f"No more than {batch_max_courses} courses can be requested")
+
+        #
+        # The params are used in DB queries, so let's do
+        # some basic sanitisation of them.
+        #
+        for index, params in enumerate(courses):
+            if not isinstance(params, dict):
+                return bad_request(f"Invalid parameter passed for course {index}")
+            errors = course_params_validator.validate(params)
+            if errors:
+                logging.error("Invalid parameters %s: %s", params, errors)
+                details = ", ".join(f"{error.name} {error.message}" for error in errors)
+                return bad_request(f"Invalid parameter passed for course {index}: {details}")
+
+        logging.info("The parameters look good")
+
+        keys = [(p["institution_id"], p["course_id"], p["mode"]) for p in courses]
+
+        course_fetcher = create_course_fetcher()
+
+        version = version_cache.get_version()
+
+        found = course_fetcher.get_courses(version, keys)
+
+        # The courses are already serialized, so join them rather than
+        # parsing and serializing them again.
+        items = [
+            json.dumps("/".join(key)).encode("utf-8") + b": " + (body or COURSE_NOT_FOUND_BODY)
+            for key, body in found.items()
+        ]
+        return func.HttpResponse(
+            b'{"courses": {' + b", ".join(items) + b"}}",
+            headers={"Content-Type": "application/json"},
+            status_code=200,
+        )
+
+    except Exception as e:
+        logging.error(traceback.format_exc())
+
+        # Raise so Azure sends back the HTTP 500
+        raise e
+
+
+def bad_request(message):
+    return func.HttpResponse(
+        get_http_error_response_json(serializer, "Bad Request", "Parameter Error", message),
+        headers={"Content-Type": "application/json"},
+        status_code=400,
+    )
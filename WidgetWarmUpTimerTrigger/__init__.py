@@ -0,0 +1,18 @@
+import logging
+
+import azure.functions as func
+
+from ..WidgetAPIHttpTrigger import warm_up
+
+
+def main(timer: func.TimerRequest) -> None:
+    """Keeps an instance warm on plans without the warmup trigger.
+
+    Runs warm_up every five minutes, so the instance the timer runs on
+    keeps its connection, dataset version and hottest widgets ready.
+    Disable it with the AzureWebJobs.WidgetWarmUpTimerTrigger.Disabled
+    app setting.
+    """
+    if timer.past_due:
+        logging.info("The warm-up timer is past due.")
+    warm_up()
@@ -0,0 +1,15 @@
+"""Benchmarks for the widget API, run from the repository root, e.g.
+
+    python -m benchmarks.bench_lookup_modes
+"""
+
+import inspect
+import os
+import sys
+
+CURRENTDIR = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+PARENTDIR = os.path.dirname(CURRENTDIR)
+sys.path.insert(0, os.path.join(PARENTDIR, "WidgetAPIHttpTrigger"))
+# The in-memory Cosmos DB stand-in and the fixtures that load the function app
+sys.path.insert(0, os.path.join(PARENTDIR, "WidgetAPIHttpTrigger", "tests"))
+sys.path.insert(0, PARENTDIR)
@@ -0,0 +1,83 @@
+"""Compares the throughput of the sync and async handlers in one worker.
+
+Every request goes to the in-memory Cosmos DB stand-in, with the caches
+turned off and a fixed latency per round trip. The sync handler runs on
+a thread pool of --sync-threads threads, as PYTHON_THREADPOOL_THREAD_COUNT
+sizes the worker's; the async handler runs on one event loop with the
+given concurrency. Both default to the same number of threads making
+Cosmos DB calls, AsyncCosmosMaxWorkers, so the two are compared like for
+like.
+
+    python -m benchmarks.bench_async_handler --requests 400 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_cosmos import FakeCosmosClient
+from fixtures import COURSES_COLLECTION_LINK, add_dataset, load_function_app, make_course_document, make_request
+
+
+def run(requests, concurrency, sync_threads, latency_ms, partitions):
+    client = FakeCosmosClient(physical_partitions=partitions, latency_seconds=latency_ms / 1000)
+    add_dataset(client, 1)
+    keys = []
+    documents = []
+    for n in range(500):
+        pub_ukprn = str(10000000 + n % 50)
+        course_id = f"C{n:05d}"
+        mode = n % 3 + 1
+        documents.append(make_course_document(1, pub_ukprn, pub_ukprn, course_id, mode))
+        keys.append((pub_ukprn, course_id, str(mode)))
+    client.add_documents(COURSES_COLLECTION_LINK, documents)
+
+    app = load_function_app(
+        client,
+        ResponseCacheMaxEntries="0",
+        NegativeCacheMaxEntries="0",
+        UkprnAliasIndexEnabled="false",
+        AsyncCosmosMaxWorkers=str(concurrency),
+    )
+    rng = random.Random(1)
+    sample = [make_request(*rng.choice(keys)) for _ in range(requests)]
+    app.main_sync(sample[0])
+
+    print(f"{requests} requests, {latency_ms}ms per partition round trip, {partitions} physical partitions")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sync_threads) as executor:
+        statuses = list(executor.map(lambda r: app.main_sync(r).status_code, sample))
+    elapsed = time.perf_counter() - start
+    assert statuses == [200] * requests
+    print(f"sync,  {sync_threads:>3} threads:      {requests / elapsed:>8.1f} requests/s")
+
+    async def run_async():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def invoke(req):
+            async with semaphore:
+                return (await app.main_async(req)).status_code
+
+        return await asyncio.gather(*(invoke(r) for r in sample))
+
+    start = time.perf_counter()
+    statuses = asyncio.run(run_async())
+    elapsed = time.perf_counter() - start
+    assert statuses == [200] * requests
+    print(f"async, {concurrency:>3} in flight:    {requests / elapsed:>8.1f} requests/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--sync-threads", type=int, help="defaults to --concurrency")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--partitions", type=int, default=4)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    run(args.requests, args.concurrency, args.sync_threads or args.concurrency, args.latency_ms, args.partitions)
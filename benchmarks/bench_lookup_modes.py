@@ -0,0 +1,63 @@
+"""Compares the request charge and latency of the course lookup modes.
+
+Loads courses into the in-memory Cosmos stand-in, partitioned by dataset
+version with deterministic document ids, and looks the same courses up
+with cross-partition queries, single-partition queries and point reads.
+
+    python -m benchmarks.bench_lookup_modes --courses 2000 --partitions 8
+"""
+
+import argparse
+import random
+import time
+
+from course_fetcher import CourseFetcher
+from course_locator import CourseLocator
+from fake_cosmos import FakeCosmosClient
+from fixtures import COURSES_COLLECTION_LINK, DOCUMENT_ID_TEMPLATE, make_course_document
+
+
+def run(courses, versions, partitions, latency_ms, lookups):
+    client = FakeCosmosClient(physical_partitions=partitions, latency_seconds=latency_ms / 1000)
+    keys = []
+    for version in range(1, versions + 1):
+        documents = []
+        for n in range(courses):
+            pub_ukprn = str(10000000 + n % 150)
+            course_id = f"C{n:05d}"
+            mode = n % 3 + 1
+            documents.append(make_course_document(version, pub_ukprn, pub_ukprn, course_id, mode))
+            keys.append((pub_ukprn, course_id, str(mode)))
+        client.add_documents(COURSES_COLLECTION_LINK, documents)
+
+    rng = random.Random(1)
+    sample = [rng.choice(keys) for _ in range(lookups)]
+    modes = [
+        ("query", None),
+        ("partition", CourseLocator("{version}")),
+        ("point", CourseLocator("{version}", DOCUMENT_ID_TEMPLATE)),
+    ]
+
+    print(f"{courses} courses x {versions} versions, {partitions} physical partitions, "
+          f"{latency_ms}ms per partition round trip, {lookups} lookups")
+    print(f"{'mode':<10}{'RU/lookup':>12}{'partitions/lookup':>20}{'ms/lookup':>12}")
+    for name, locator in modes:
+        fetcher = CourseFetcher(client, COURSES_COLLECTION_LINK, course_locator=locator)
+        client.reset_stats()
+        start = time.perf_counter()
+        for institution_id, course_id, mode in sample:
+            assert fetcher.get_course(versions, institution_id, course_id, mode) is not None
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10}{client.request_charge / lookups:>12.2f}"
+              f"{client.partitions_visited / lookups:>20.2f}{elapsed * 1000 / lookups:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=2000)
+    parser.add_argument("--versions", type=int, default=3)
+    parser.add_argument("--partitions", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+    run(args.courses, args.versions, args.partitions, args.latency_ms, args.lookups)
@@ -0,0 +1,49 @@
+"""Measures the cost of validating the course route parameters.
+
+Times compiling the validators from swagger.yml, done once per worker,
+and the course route's validator over a mix of valid and invalid
+parameters, done on every request.
+
+    python -m benchmarks.bench_param_validation --requests 100000
+"""
+
+import argparse
+import os
+import time
+
+from param_validator import load_route_validators
+
+SWAGGER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "swagger.yml")
+COURSE_ROUTE = "/widget/institutions/{institution_id}/courses/{course_id}/modes/{mode}"
+
+PARAMS = [
+    {"institution_id": "10000233", "course_id": "KA1003", "mode": "1"},
+    {"institution_id": "10007857", "course_id": "LLB-HONS(2)", "mode": "2"},
+    {"institution_id": "10007857", "course_id": "AB37", "mode": "3"},
+    {"institution_id": "1000785", "course_id": "AB37", "mode": "3"},
+]
+
+
+def run(requests):
+    start = time.perf_counter()
+    validator = load_route_validators(SWAGGER_PATH)[(COURSE_ROUTE, "get")]
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    params = [PARAMS[n % len(PARAMS)] for n in range(requests)]
+    print(f"{requests} requests, swagger.yml compiled in {compile_ms:.1f}ms")
+    start = time.perf_counter()
+    for p in params:
+        validator.validate(p)
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed * 1e6 / requests:.2f}us per request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100000)
+    args = parser.parse_args()
+    run(args.requests)
+
+
+if __name__ == "__main__":
+    main()
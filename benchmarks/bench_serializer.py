@@ -0,0 +1,129 @@
+"""Compares the CPU time of ways to serialize widget documents.
+
+Builds tidied widgets like the ones the API returns, with bilingual
+names, subjects and NSS questions, some with Welsh titles that have
+non-ASCII letters, and times how long each way takes to turn one into
+response bytes. Also reports whether the output is byte-for-byte the
+same as json.dumps, which the API's serializer is.
+
+With the optional orjson package installed it also times orjson, which
+writes compact JSON, and orjson with the spaces json.dumps writes after
+separators put back, which still differs for non-ASCII text that
+json.dumps escapes. The API only ships the json serializer: orjson's
+bytes differ, and restoring them costs more than json.dumps.
+
+    python -m benchmarks.bench_serializer --widgets 2000 --repeat 5
+"""
+
+import argparse
+import importlib.util
+import json
+import random
+import re
+import time
+
+from course_fetcher import CourseFetcher
+from serializer import StdlibSerializer
+
+WELSH_NAMES = ["Prifysgol Aberystwyth", "Prifysgol Bangor", "Prifysgol Caerdydd", "Prifysgol Abertawe"]
+ENGLISH_NAMES = ["Aberystwyth University", "Bangor University", "Cardiff University", "Swansea University"]
+SUBJECTS = [
+    ("CAH09-01-01", "Law", "Y Gyfraith"),
+    ("CAH17-01-01", "Business and management", "Busnes a rheolaeth"),
+    ("CAH11-01-01", "Computing", "Cyfrifiadura"),
+    ("CAH19-01-01", "English studies", "Astudiaethau Saesneg"),
+    # Welsh titles often have a circumflex, which json.dumps escapes as \u00e2
+    ("CAH09-01-01", "Law with Criminology", "Y Gyfraith â Throseddeg"),
+    ("CAH25-02-02", "Music with Performance", "Cerddoriaeth â Pherfformio"),
+]
+COUNTRIES = [("XF", "England"), ("XI", "Wales"), ("XH", "Scotland"), ("XG", "Northern Ireland")]
+
+# A JSON string, or a separator outside one
+SEPARATOR_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[,:]')
+SPACED_SEPARATORS = {b",": b", ", b":": b": "}
+
+
+def make_subject(rng):
+    code, english, welsh = rng.choice(SUBJECTS)
+    return {"code": code, "english_label": english, "welsh_label": welsh}
+
+
+def make_widget(rng, n):
+    code, name = rng.choice(COUNTRIES)
+    institution = rng.randrange(len(ENGLISH_NAMES))
+    subject = make_subject(rng)
+    widget = {
+        "institution_id": str(10000000 + n % 150),
+        "pub_ukprn": str(10000000 + n % 150),
+        "course_id": f"C{n:05d}",
+        "course_name": {"english": subject["english_label"] + " with Foundation Year", "welsh": subject["welsh_label"] + " gyda Blwyddyn Sylfaen"},
+        "course_mode": n % 3 + 1,
+        "institution_name": {"english": ENGLISH_NAMES[institution], "welsh": WELSH_NAMES[institution]},
+        "country": {"code": code, "name": name},
+        "statistics": {
+            "employment": [
+                {"aggregation_level": 14, "in_work_or_study": rng.randint(60, 100), "subject": subject}
+            ],
+            "nss": [
+                {
+                    "aggregation_level": 14,
+                    "subject": subject,
+                    "nss_country_aggregation_level": 14,
+                    "question_16": {"description": "Staff are good at explaining things", "agree_or_strongly_agree": rng.randint(60, 100)},
+                    "question_23": {"description": "It is clear how students' feedback on the course has been acted on", "agree_or_strongly_agree": rng.randint(40, 100)},
+                    "question_28": {"description": "Students' union (association or guild) effectively represents students' academic interests", "agree_or_strongly_agree": rng.randint(40, 100)},
+                }
+            ],
+        },
+    }
+    widget["multiple_subjects"] = CourseFetcher.check_multiple_subjects(widget["statistics"])
+    widget["statistics"] = CourseFetcher.tidy_widget_stats(widget["statistics"], widget["country"])
+    return widget
+
+
+def orjson_serializers():
+    if importlib.util.find_spec("orjson") is None:
+        return []
+    import orjson
+
+    def spaced(token):
+        return SPACED_SEPARATORS.get(token.group(), token.group())
+
+    def dumps_spaced(obj):
+        return SEPARATOR_TOKEN.sub(spaced, orjson.dumps(obj))
+
+    return [("orjson", orjson.dumps), ("orjson+sep", dumps_spaced)]
+
+
+def run(widgets, repeat):
+    rng = random.Random(1)
+    documents = [make_widget(rng, n) for n in range(widgets)]
+    expected = [json.dumps(d).encode("utf-8") for d in documents]
+
+    serializers = [("json", StdlibSerializer().dumps)] + orjson_serializers()
+
+    average = sum(len(b) for b in expected) / widgets
+    print(f"{widgets} widgets of {average:.0f} bytes on average, best of {repeat}")
+    print(f"{'serializer':<12}{'us/widget':>12}{'identical':>12}")
+    for name, dumps in serializers:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for document in documents:
+                dumps(document)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        identical = all(dumps(d) == e for d, e in zip(documents, expected))
+        print(f"{name:<12}{best * 1e6 / widgets:>12.2f}{str(identical):>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--widgets", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.widgets, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compares the request charge and latency of the ukprn fallbacks.
+
+Without the ukprn alias index, a course requested by its reporting ukprn
+is found by a pub_ukprn query that misses, a ukprn query and a pub_ukprn
+query for what that found. This looks up courses from a generated corpus
+by pub_ukprn, by reporting ukprn and ones that don't exist with each of
+the ways get_course can do that:
+
+- sequential runs the queries in turn
+- speculative runs the ukprn lookup alongside the pub_ukprn one
+  (SpeculativeLookupEnabled)
+- combined matches either field in one query (CombinedUkprnQueryEnabled)
+
+    python -m benchmarks.bench_ukprn_fallback --courses 5000 --latency-ms 5
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.corpus import generate_corpus
+from course_fetcher import CourseFetcher
+from fake_cosmos import FakeCosmosClient
+
+COLLECTION_LINK = "dbs/discoveruni/colls/courses"
+
+
+def run(courses, partitions, latency_ms, lookups):
+    client = FakeCosmosClient(physical_partitions=partitions, latency_seconds=latency_ms / 1000)
+    corpus = generate_corpus(courses, alias_fraction=0.2)
+    client.add_documents(COLLECTION_LINK, corpus.documents)
+    version = corpus.versions[-1]
+    kinds = {
+        "pub_ukprn": corpus.keys[:lookups],
+        "ukprn": corpus.alias_keys[:lookups],
+        "missing": [(institution_id, "ZZ99999", mode) for institution_id, _, mode in corpus.keys[:lookups]],
+    }
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    fetchers = [
+        ("sequential", CourseFetcher(client, COLLECTION_LINK)),
+        ("speculative", CourseFetcher(client, COLLECTION_LINK, lookup_executor=executor)),
+        ("combined", CourseFetcher(client, COLLECTION_LINK, combined_ukprn_query=True)),
+    ]
+
+    print(f"{courses} courses, {partitions} physical partitions, {latency_ms}ms per partition round trip")
+    print(f"{'lookup':<12}{'fallback':<14}{'RU/lookup':>12}{'queries/lookup':>16}{'ms/lookup':>12}")
+    for kind, keys in kinds.items():
+        for name, fetcher in fetchers:
+            client.reset_stats()
+            start = time.perf_counter()
+            for key in keys:
+                fetcher.get_course(version, *key)
+            elapsed = time.perf_counter() - start
+            # Let the speculative lookups still running finish before the next count
+            time.sleep(latency_ms * partitions * 3 / 1000)
+            print(f"{kind:<12}{name:<14}{client.request_charge / len(keys):>12.2f}"
+                  f"{client.request_count / len(keys):>16.2f}{elapsed * 1000 / len(keys):>12.2f}")
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=2000)
+    parser.add_argument("--partitions", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--lookups", type=int, default=100)
+    args = parser.parse_args()
+    run(args.courses, args.partitions, args.latency_ms, args.lookups)
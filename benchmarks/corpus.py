@@ -0,0 +1,294 @@
+"""Generates HESA-shaped course documents for benchmarks at production scale.
+
+The documents have the fields the widget projection reads: the
+institution's ukprn, pub_ukprn and names, the course title, country and
+the employment and NSS statistics, with one entry per subject. Every
+run with the same seed and sizes generates the same documents.
+
+Sizes and skew are configurable:
+
+- institution_skew spreads courses over institutions with a Zipf
+  distribution, so a few large institutions hold many of the courses
+- alias_fraction is the share of courses reported by a different
+  ukprn to the one that publishes them, as with franchised courses
+- multiple_subject_fraction is the share of courses with more than one
+  subject in their statistics
+- devolved_fraction is the share of institutions outside England, whose
+  widgets show different NSS questions
+- versions generates that many dataset versions, with version_churn of
+  the courses replaced between one version and the next
+
+make_lookups turns a corpus into request keys with hot courses,
+lookups by reporting ukprn and requests for missing courses.
+
+    python -m benchmarks.corpus --courses 30000 --versions 3
+"""
+
+import argparse
+import bisect
+import collections
+import itertools
+import json
+import random
+
+Corpus = collections.namedtuple("Corpus", ["documents", "versions", "keys", "alias_keys"])
+
+DOCUMENT_ID_TEMPLATE = "{version}-{institution_id}-{course_id}-{mode}"
+
+SUBJECTS = [
+    ("CAH01-01-01", "Medicine and dentistry", "Meddygaeth a deintyddiaeth"),
+    ("CAH02-04-01", "Nursing", "Nyrsio"),
+    ("CAH03-01-02", "Biology", "Bioleg"),
+    ("CAH04-01-01", "Psychology", "Seicoleg"),
+    ("CAH07-04-01", "Chemistry", "Cemeg"),
+    ("CAH09-01-01", "Law", "Y Gyfraith"),
+    ("CAH10-01-01", "Engineering", "Peirianneg"),
+    ("CAH11-01-01", "Computing", "Cyfrifiadura"),
+    ("CAH15-01-01", "Economics", "Economeg"),
+    ("CAH17-01-01", "Business and management", "Busnes a rheolaeth"),
+    ("CAH19-01-01", "English studies", "Astudiaethau Saesneg"),
+    ("CAH20-01-01", "History", "Hanes"),
+    ("CAH25-01-01", "Art and design", "Celf a dylunio"),
+]
+DEVOLVED_COUNTRIES = [("XI", "Wales"), ("XH", "Scotland"), ("XG", "Northern Ireland")]
+ENGLAND = ("XF", "England")
+TITLE_SUFFIXES = [
+    ("", ""),
+    (" with Foundation Year", " gyda Blwyddyn Sylfaen"),
+    (" with Placement Year", " gyda Blwyddyn Lleoliad"),
+    (" (Hons)", " (Anrh)"),
+]
+NSS_QUESTIONS = 28
+
+
+def zipf_sampler(rng, items, s):
+    """Returns a function picking items with probability proportional to 1 / rank ** s"""
+    items = list(items)
+    rng.shuffle(items)
+    weights = list(itertools.accumulate(1 / (rank ** s) for rank in range(1, len(items) + 1)))
+    total = weights[-1]
+    return lambda: items[bisect.bisect_left(weights, rng.random() * total)]
+
+
+def make_subject(rng):
+    code, english, welsh = rng.choice(SUBJECTS)
+    return {"code": code, "english_label": english, "welsh_label": welsh}
+
+
+def make_employment(rng, subject, aggregation_level):
+    in_work = rng.randint(20, 70)
+    in_study = rng.randint(0, 100 - in_work)
+    return {
+        "aggregation_level": aggregation_level,
+        "assumed_to_be_unemployed": rng.randint(0, 10),
+        "in_study": in_study,
+        "in_work": in_work,
+        "in_work_and_study": rng.randint(0, 10),
+        "in_work_or_study": in_work + in_study,
+        "not_available_for_work_or_study": rng.randint(0, 5),
+        "number_of_students": rng.randint(10, 400),
+        "response_rate": rng.randint(40, 100),
+        "subject": subject,
+    }
+
+
+def make_nss(rng, subject, aggregation_level, country_code):
+    nss = {
+        "aggregation_level": aggregation_level,
+        "number_of_students": rng.randint(10, 400),
+        "response_rate": rng.randint(50, 100),
+        "subject": subject,
+    }
+    if country_code != ENGLAND[0]:
+        nss["nss_country_aggregation_level"] = aggregation_level
+    for question in range(1, NSS_QUESTIONS + 1):
+        nss[f"question_{question}"] = {
+            "description": f"NSS question {question}",
+            "agree_or_strongly_agree": rng.randint(40, 100),
+        }
+    return nss
+
+
+def make_institutions(rng, count, alias_fraction, devolved_fraction):
+    institutions = []
+    for n in range(count):
+        pub_ukprn = str(10000000 + n)
+        country = rng.choice(DEVOLVED_COUNTRIES) if rng.random() < devolved_fraction else ENGLAND
+        institutions.append(
+            {
+                "pub_ukprn": pub_ukprn,
+                "pub_ukprn_name": f"University {n}",
+                "pub_ukprn_welsh_name": f"Prifysgol {n}",
+                # The provider that reports the courses it teaches for this one
+                "partner_ukprn": str(20000000 + n) if alias_fraction else None,
+                "country": {"code": country[0], "name": country[1]},
+            }
+        )
+    return institutions
+
+
+def make_course(rng, institution, serial, alias_fraction, multiple_subject_fraction):
+    """Returns the version-independent parts of one course"""
+    subjects = [make_subject(rng)]
+    if rng.random() < multiple_subject_fraction:
+        subjects.extend(make_subject(rng) for _ in range(rng.randint(1, 2)))
+    suffix = rng.choice(TITLE_SUFFIXES)
+    course_id = f"{subjects[0]['code'][3:5]}{serial:05d}"
+    return {
+        "institution": institution,
+        "ukprn": institution["partner_ukprn"] if rng.random() < alias_fraction else institution["pub_ukprn"],
+        "course_id": course_id,
+        "subjects": subjects,
+        "title": {
+            "english": " and ".join(s["english_label"] for s in subjects) + suffix[0],
+            "welsh": " a ".join(s["welsh_label"] for s in subjects) + suffix[1],
+        },
+    }
+
+
+def make_course_documents(rng, course, version, modes):
+    institution = course["institution"]
+    country_code = institution["country"]["code"]
+    aggregation_level = 14 if len(course["subjects"]) == 1 else 24
+    for mode in modes:
+        yield {
+            "id": DOCUMENT_ID_TEMPLATE.format(
+                version=version, institution_id=institution["pub_ukprn"],
+                course_id=course["course_id"], mode=mode,
+            ),
+            "version": version,
+            "course_id": course["course_id"],
+            "course_mode": mode,
+            "course": {
+                "institution": {
+                    "ukprn": course["ukprn"],
+                    "pub_ukprn": institution["pub_ukprn"],
+                    "pub_ukprn_name": institution["pub_ukprn_name"],
+                    "pub_ukprn_welsh_name": institution["pub_ukprn_welsh_name"],
+                },
+                "title": dict(course["title"]),
+                "country": dict(institution["country"]),
+                "statistics": {
+                    "employment": [make_employment(rng, dict(s), aggregation_level) for s in course["subjects"]],
+                    "nss": [make_nss(rng, dict(s), aggregation_level, country_code) for s in course["subjects"]],
+                },
+            },
+        }
+
+
+def generate_corpus(
+    courses,
+    institutions=150,
+    versions=1,
+    institution_skew=1.0,
+    alias_fraction=0.1,
+    multiple_subject_fraction=0.2,
+    devolved_fraction=0.2,
+    version_churn=0.05,
+    seed=1,
+):
+    """Returns a Corpus of course documents for each version
+
+    courses is the number of courses in each version; a quarter of them
+    are offered in both full-time and part-time modes, under the same
+    course_id. keys and alias_keys are the (institution_id, course_id,
+    mode) lookups for the latest version, by pub_ukprn and by the
+    reporting ukprn of the courses that have a different one.
+    """
+    rng = random.Random(seed)
+    providers = make_institutions(rng, institutions, alias_fraction, devolved_fraction)
+    pick_institution = zipf_sampler(rng, providers, institution_skew)
+    serials = itertools.count()
+
+    def new_course():
+        course = make_course(rng, pick_institution(), next(serials), alias_fraction, multiple_subject_fraction)
+        course["modes"] = (1, 2) if rng.random() < 0.25 else (rng.choice((1, 2, 3)),)
+        return course
+
+    current = [new_course() for _ in range(courses)]
+    documents = []
+    for version in range(1, versions + 1):
+        if version > 1:
+            for n in range(len(current)):
+                if rng.random() < version_churn:
+                    current[n] = new_course()
+        for course in current:
+            documents.extend(make_course_documents(rng, course, version, course["modes"]))
+
+    keys = []
+    alias_keys = []
+    for course in current:
+        for mode in course["modes"]:
+            keys.append((course["institution"]["pub_ukprn"], course["course_id"], str(mode)))
+            if course["ukprn"] != course["institution"]["pub_ukprn"]:
+                alias_keys.append((course["ukprn"], course["course_id"], str(mode)))
+    return Corpus(documents, list(range(1, versions + 1)), keys, alias_keys)
+
+
+def make_lookups(rng, corpus, count, zipf_s=1.1, alias_rate=0.05, miss_rate=0.02):
+    """Returns count (institution_id, course_id, mode) request keys
+
+    Course popularity follows a Zipf distribution with exponent zipf_s.
+    alias_rate of the requests look a course up by its reporting ukprn
+    and miss_rate ask for a course that doesn't exist.
+    """
+    pick_key = zipf_sampler(rng, corpus.keys, zipf_s)
+    pick_alias = zipf_sampler(rng, corpus.alias_keys, zipf_s) if corpus.alias_keys else pick_key
+    lookups = []
+    for n in range(count):
+        roll = rng.random()
+        if roll < miss_rate:
+            institution_id, _, mode = pick_key()
+            lookups.append((institution_id, f"MISSING{n}", mode))
+        elif roll < miss_rate + alias_rate:
+            lookups.append(pick_alias())
+        else:
+            lookups.append(pick_key())
+    return lookups
+
+
+def describe(corpus):
+    """Returns counts that summarise the shape of the corpus"""
+    latest = [d for d in corpus.documents if d["version"] == corpus.versions[-1]]
+    per_institution = collections.Counter(d["course"]["institution"]["pub_ukprn"] for d in latest)
+    return {
+        "documents": len(corpus.documents),
+        "versions": len(corpus.versions),
+        "documents_per_version": len(latest),
+        "institutions": len(per_institution),
+        "largest_institution": max(per_institution.values(), default=0),
+        "alias_keys": len(corpus.alias_keys),
+        "multiple_subjects": sum(len(d["course"]["statistics"]["nss"]) > 1 for d in latest),
+        "devolved": sum(d["course"]["country"]["code"] != ENGLAND[0] for d in latest),
+        "average_bytes": round(sum(len(json.dumps(d)) for d in latest) / max(len(latest), 1)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=30000)
+    parser.add_argument("--institutions", type=int, default=150)
+    parser.add_argument("--versions", type=int, default=1)
+    parser.add_argument("--institution-skew", type=float, default=1.0)
+    parser.add_argument("--alias-fraction", type=float, default=0.1)
+    parser.add_argument("--multiple-subject-fraction", type=float, default=0.2)
+    parser.add_argument("--devolved-fraction", type=float, default=0.2)
+    parser.add_argument("--version-churn", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the documents to this file as JSON lines")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(
+        args.courses, args.institutions, args.versions, args.institution_skew, args.alias_fraction,
+        args.multiple_subject_fraction, args.devolved_fraction, args.version_churn, args.seed,
+    )
+    for name, value in describe(corpus).items():
+        print(f"{name:<22}{value:>10}")
+    if args.output:
+        with open(args.output, "w") as f:
+            for document in corpus.documents:
+                f.write(json.dumps(document) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Times the per-request widget work and checks it against a baseline.
+
+Every successful request validates its parameters, tidies the widget's
+statistics, checks for multiple subjects and serializes the result.
+This measures each of those on representative widgets from the
+generated corpus (England and devolved, single and multiple subjects)
+and reports calls per second, the bytes allocated per call and the
+function calls the app's own code makes per call.
+
+Timings vary from machine to machine, so they are compared as a ratio
+to a fixed pure Python calibration loop timed in the same run.
+Allocations only change with the code and the Python version, so they
+are compared when the baseline was recorded with the same minor
+version, the one CI runs. Calls into the app's modules only change with
+the code, so they are compared on every version.
+
+    python -m benchmarks.hot_path                     # compare with the baseline
+    python3.8 -m benchmarks.hot_path --update-baseline   # record a new baseline
+
+Exits with status 1 if any case is slower or allocates more than the
+baseline by more than the threshold. test_hot_path runs the same check
+under pytest.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate_corpus
+from course_fetcher import CourseFetcher
+from param_validator import load_route_validators
+from serializer import StdlibSerializer
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hot_path_baseline.json")
+SWAGGER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "swagger.yml")
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "WidgetAPIHttpTrigger")
+COURSE_ROUTE = "/widget/institutions/{institution_id}/courses/{course_id}/modes/{mode}"
+
+# The Python azure-pipelines.yml runs the tests with, which baselines are recorded on
+CI_PYTHON = "3.8"
+
+TIME_THRESHOLD = 0.5
+ALLOCATION_THRESHOLD = 0.1
+
+
+def make_widget(document):
+    """Returns the widget the API's projection reads from a course document"""
+    course = document["course"]
+    institution = course["institution"]
+    return {
+        "institution_id": institution["pub_ukprn"],
+        "pub_ukprn": institution["pub_ukprn"],
+        "course_id": document["course_id"],
+        "course_name": course["title"],
+        "course_mode": document["course_mode"],
+        "institution_name": {"english": institution["pub_ukprn_name"], "welsh": institution["pub_ukprn_welsh_name"]},
+        "country": course["country"],
+        "statistics": course["statistics"],
+    }
+
+
+def representative_widgets():
+    """Returns one widget for each mix of England or devolved and single or multiple subjects"""
+    widgets = {}
+    for document in generate_corpus(200, institutions=20, multiple_subject_fraction=0.3, devolved_fraction=0.3).documents:
+        course = document["course"]
+        kind = (course["country"]["code"] == "XF", len(course["statistics"]["nss"]) > 1)
+        widgets.setdefault(kind, make_widget(document))
+    return [widgets[kind] for kind in sorted(widgets)]
+
+
+def make_cases():
+    """Returns {name: (function, inputs)}; each input is the argument tuple for one call"""
+    widgets = representative_widgets()
+    tidied = []
+    for widget in widgets:
+        widget = dict(widget)
+        widget["multiple_subjects"] = CourseFetcher.check_multiple_subjects(widget["statistics"])
+        widget["statistics"] = CourseFetcher.tidy_widget_stats(dict(widget["statistics"]), widget["country"])
+        tidied.append(widget)
+    params = [
+        {"institution_id": w["institution_id"], "course_id": w["course_id"], "mode": str(w["course_mode"])}
+        for w in widgets
+    ]
+    validator = load_route_validators(SWAGGER_PATH)[(COURSE_ROUTE, "get")]
+
+    def tidy_widget_stats(statistics, country):
+        # tidy_widget_stats replaces the lists in the dict it is given
+        return CourseFetcher.tidy_widget_stats(dict(statistics), country)
+
+    return {
+        "tidy_widget_stats": (tidy_widget_stats, [(w["statistics"], w["country"]) for w in widgets]),
+        "check_multiple_subjects": (CourseFetcher.check_multiple_subjects, [(w["statistics"],) for w in widgets]),
+        "json_dumps": (StdlibSerializer().dumps, [(w,) for w in tidied]),
+        "route_validator": (validator.validate, [(p,) for p in params]),
+    }
+
+
+def calibration(loops):
+    """A fixed mix of dict, list and string work to compare timings against"""
+    for n in range(loops):
+        d = {"a": n, "b": str(n)}
+        [d["a"], d["b"], len(d["b"])]
+
+
+def best_seconds_per_call(function, inputs, number, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            for args in inputs:
+                function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / (number * len(inputs))
+
+
+def bytes_allocated_per_call(function, inputs):
+    """Returns the peak bytes allocated by a call, averaged over the inputs"""
+    total = 0
+    for args in inputs:
+        function(*args)
+        tracemalloc.start()
+        try:
+            start, _ = tracemalloc.get_traced_memory()
+            function(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        total += peak - start
+    return round(total / len(inputs))
+
+
+def app_calls_per_call(function, inputs):
+    """Returns the calls made into the app's own modules by a call, averaged over the inputs"""
+    calls = 0
+
+    def profile(frame, event, arg):
+        nonlocal calls
+        if event == "call" and frame.f_code.co_filename.startswith(APP_DIR):
+            calls += 1
+
+    sys.setprofile(profile)
+    try:
+        for args in inputs:
+            function(*args)
+    finally:
+        sys.setprofile(None)
+    return round(calls / len(inputs), 2)
+
+
+def measure(number=2000, repeat=5):
+    """Returns ops/sec, time relative to the calibration loop and bytes allocated for every case"""
+    cases = {}
+    for name, (function, inputs) in make_cases().items():
+        # Calibrated next to each case, so a change in CPU speed during the run affects both alike
+        calibration_seconds = best_seconds_per_call(calibration, [(100,)], max(number // 10, 1), repeat) / 100
+        seconds = best_seconds_per_call(function, inputs, number, repeat)
+        cases[name] = {
+            "ops_per_sec": round(1 / seconds),
+            "relative_time": round(seconds / calibration_seconds, 3),
+            "bytes_allocated": bytes_allocated_per_call(function, inputs),
+            "app_calls": app_calls_per_call(function, inputs),
+        }
+    return {"python": platform.python_version(), "cases": cases}
+
+
+def python_minor(version):
+    return version.rsplit(".", 1)[0]
+
+
+def find_regressions(results, baseline, time_threshold=TIME_THRESHOLD, allocation_threshold=ALLOCATION_THRESHOLD):
+    """Returns a message for each case that is worse than the baseline by more than the threshold
+
+    time_threshold is ignored when None, and allocations are only
+    compared when the baseline was recorded with the same Python version.
+    Any increase in the calls into the app's modules is a regression.
+    """
+    same_python = python_minor(results["python"]) == python_minor(baseline["python"])
+    regressions = []
+    for name, result in results["cases"].items():
+        expected = baseline["cases"].get(name)
+        if expected is None:
+            continue
+        if time_threshold is not None and result["relative_time"] > expected["relative_time"] * (1 + time_threshold):
+            regressions.append(
+                f"{name} takes {result['relative_time']} calibration loops, "
+                f"baseline {expected['relative_time']}"
+            )
+        if same_python and result["bytes_allocated"] > expected["bytes_allocated"] * (1 + allocation_threshold):
+            regressions.append(
+                f"{name} allocates {result['bytes_allocated']} bytes, "
+                f"baseline {expected['bytes_allocated']}"
+            )
+        if "app_calls" in expected and result["app_calls"] > expected["app_calls"]:
+            regressions.append(f"{name} makes {result['app_calls']} calls, baseline {expected['app_calls']}")
+    return regressions
+
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def report(results, baseline=None):
+    print(f"Python {results['python']}")
+    print(f"{'case':<26}{'ops/sec':>12}{'relative':>10}{'baseline':>10}{'bytes':>8}{'baseline':>10}"
+          f"{'calls':>8}{'baseline':>10}")
+    for name, result in results["cases"].items():
+        expected = (baseline or {}).get("cases", {}).get(name, {})
+        print(
+            f"{name:<26}{result['ops_per_sec']:>12}{result['relative_time']:>10}"
+            f"{expected.get('relative_time', '-'):>10}{result['bytes_allocated']:>8}"
+            f"{expected.get('bytes_allocated', '-'):>10}{result['app_calls']:>8}"
+            f"{expected.get('app_calls', '-'):>10}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000, help="calls per input in each timing")
+    parser.add_argument("--repeat", type=int, default=5, help="timings per case; the best is kept")
+    parser.add_argument("--threshold", type=float, default=TIME_THRESHOLD, help="allowed slowdown, e.g. 0.5 for 50%%")
+    parser.add_argument("--allocation-threshold", type=float, default=ALLOCATION_THRESHOLD)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    if args.update_baseline and python_minor(platform.python_version()) != CI_PYTHON:
+        sys.exit(f"Record the baseline with Python {CI_PYTHON}, which CI runs, so allocations are compared there")
+    results = measure(args.number, args.repeat)
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        report(results)
+        print(f"Wrote {BASELINE_PATH}")
+        return
+
+    baseline = load_baseline()
+    report(results, baseline)
+    regressions = find_regressions(results, baseline, args.threshold, args.allocation_threshold)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Reports what a cold start of the function app spends its time on.
+
+Starts a fresh Python process, as a new worker would, imports the
+function app against the in-memory Cosmos DB stand-in with -X importtime
+and then times warm_up and a first request. Import time is reported per
+top-level package, counting each module's own time once, so the report
+doesn't depend on which module happened to import a package first.
+
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --budget-ms 400 --no-warm-up
+
+Exits with status 1 if the import takes longer than --budget-ms.
+"""
+
+import argparse
+import collections
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child process; its own modules are reported apart as "harness"
+COLD_START = """
+import json, sys, time
+from benchmarks.corpus import generate_corpus
+from benchmarks.load_test import load_corpus
+from fake_cosmos import FakeCosmosClient
+from fixtures import add_dataset, load_function_app, make_request
+
+client = FakeCosmosClient(latency_seconds={latency})
+corpus = generate_corpus(500)
+load_corpus(client, corpus)
+settings = dict(WarmUpCourses=",".join("/".join(key) for key in corpus.keys[:{warm_up_courses}]))
+start = time.perf_counter()
+app = load_function_app(client, **settings)
+timings = {{"import_ms": (time.perf_counter() - start) * 1000}}
+if {warm_up}:
+    start = time.perf_counter()
+    app.warm_up()
+    timings["warm_up_ms"] = (time.perf_counter() - start) * 1000
+start = time.perf_counter()
+app.main_sync(make_request(*corpus.keys[0]))
+timings["first_request_ms"] = (time.perf_counter() - start) * 1000
+start = time.perf_counter()
+app.main_sync(make_request(*corpus.keys[0]))
+timings["second_request_ms"] = (time.perf_counter() - start) * 1000
+sys.stdout.write(json.dumps(timings))
+"""
+
+HARNESS = {"benchmarks", "fake_cosmos", "fixtures"}
+
+
+def parse_importtime(stderr):
+    """Returns [(module, self_us, cumulative_us)] from -X importtime output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def package_of(module):
+    package = module.split(".")[0]
+    return "harness" if package in HARNESS else package
+
+
+def import_budget(modules):
+    """Returns {package: self time in us} for every top-level package, slowest first"""
+    totals = collections.Counter()
+    for name, self_us, _ in modules:
+        totals[package_of(name)] += self_us
+    return dict(totals.most_common())
+
+
+def run_cold_start(latency_ms, warm_up, warm_up_courses):
+    script = COLD_START.format(latency=latency_ms / 1000, warm_up=warm_up, warm_up_courses=warm_up_courses)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout), parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, help="fail if importing the function app takes longer")
+    parser.add_argument("--top", type=int, default=15, help="number of packages and modules to list")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="latency per Cosmos DB round trip")
+    parser.add_argument("--no-warm-up", dest="warm_up", action="store_false")
+    parser.add_argument("--warm-up-courses", type=int, default=50)
+    args = parser.parse_args()
+
+    timings, modules = run_cold_start(args.latency_ms, args.warm_up, args.warm_up_courses)
+    budget = import_budget(modules)
+    app_us = sum(us for package, us in budget.items() if package != "harness")
+
+    print(f"{'package':<32}{'ms':>10}")
+    for package, us in list(budget.items())[:args.top]:
+        print(f"{package:<32}{us / 1000:>10.1f}")
+    print(f"{'total, without harness':<32}{app_us / 1000:>10.1f}")
+    print()
+    print(f"{'slowest modules':<56}{'self ms':>10}")
+    for name, self_us, _ in sorted(modules, key=lambda m: -m[1])[:args.top]:
+        if package_of(name) != "harness":
+            print(f"{name:<56}{self_us / 1000:>10.1f}")
+    print()
+    for name, ms in timings.items():
+        print(f"{name:<32}{ms:>10.1f}")
+
+    if args.budget_ms is not None and app_us / 1000 > args.budget_ms:
+        print(f"Imports took {app_us / 1000:.1f}ms, over the budget of {args.budget_ms}ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Load tests the widget endpoint against the in-memory Cosmos DB stand-in.
+
+Loads a generated corpus of courses (see benchmarks/corpus.py), builds a
+request mix in which a few courses are far more popular than the rest (a
+Zipf distribution), some requests use an institution's reporting ukprn
+and some ask for courses that don't exist, then drives main() with that
+mix at a fixed concurrency. Reports
+throughput, p50/p95/p99 latency, request charge per request and the
+response statuses. --throttle-rate answers a share of the Cosmos DB
+calls with 429, to see how the Cosmos* retry settings bound latency.
+
+    python -m benchmarks.load_test --requests 5000 --concurrency 16 --latency-ms 5
+    python -m benchmarks.load_test --handler async --setting ResponseCacheMaxEntries=0
+    python -m benchmarks.load_test --throttle-rate 0.2 --setting CosmosMaxRetryWaitSeconds=1
+
+Any function app setting can be passed with --setting NAME=VALUE.
+"""
+
+import argparse
+import asyncio
+import collections
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.corpus import generate_corpus, make_lookups
+from fake_cosmos import FakeCosmosClient
+from fixtures import COURSES_COLLECTION_LINK, add_dataset, load_function_app, make_request
+
+LoadResult = collections.namedtuple(
+    "LoadResult", ["requests", "elapsed", "latencies", "statuses", "request_charge", "throttled"]
+)
+
+
+def load_corpus(client, corpus):
+    """Adds a succeeded dataset for each version of the corpus and its courses"""
+    for version in corpus.versions:
+        add_dataset(client, version)
+    client.add_documents(COURSES_COLLECTION_LINK, corpus.documents)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(app, client, workload, concurrency, handler="sync"):
+    """Sends every request in the workload and returns a LoadResult"""
+    requests = [make_request(*key) for key in workload]
+    client.reset_stats()
+
+    if handler == "async":
+
+        async def run_async():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def invoke(req):
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        status_code = (await app.main_async(req)).status_code
+                    except Exception:
+                        # The Functions host answers 500 when the function raises
+                        status_code = 500
+                    return time.perf_counter() - start, status_code
+
+            return await asyncio.gather(*(invoke(r) for r in requests))
+
+        start = time.perf_counter()
+        results = asyncio.run(run_async())
+    else:
+
+        def invoke(req):
+            start = time.perf_counter()
+            try:
+                status_code = app.main_sync(req).status_code
+            except Exception:
+                status_code = 500
+            return time.perf_counter() - start, status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(invoke, requests))
+    elapsed = time.perf_counter() - start
+
+    return LoadResult(
+        requests=len(requests),
+        elapsed=elapsed,
+        latencies=sorted(latency for latency, _ in results),
+        statuses=collections.Counter(status for _, status in results),
+        request_charge=client.request_charge,
+        throttled=client.throttled_count,
+    )
+
+
+def report(result):
+    latencies_ms = [latency * 1000 for latency in result.latencies]
+    statuses = ", ".join(f"{status}: {count}" for status, count in sorted(result.statuses.items()))
+    print(f"throughput    {result.requests / result.elapsed:>10.1f} requests/s")
+    for p in (50, 95, 99):
+        print(f"p{p:<12}{percentile(latencies_ms, p):>10.2f} ms")
+    print(f"max          {latencies_ms[-1]:>10.2f} ms")
+    print(f"RU/request    {result.request_charge / result.requests:>10.2f}")
+    print(f"statuses      {statuses}")
+    if result.throttled:
+        print(f"throttled     {result.throttled:>10} Cosmos DB calls")
+
+
+def parse_settings(settings):
+    return dict(setting.split("=", 1) for setting in settings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--handler", choices=["sync", "async"], default="sync")
+    parser.add_argument("--courses", type=int, default=5000)
+    parser.add_argument("--institutions", type=int, default=150)
+    parser.add_argument("--versions", type=int, default=1)
+    parser.add_argument("--institution-skew", type=float, default=1.0, help="skew of courses per institution")
+    parser.add_argument("--alias-fraction", type=float, default=0.1, help="share of courses with a separate reporting ukprn")
+    parser.add_argument("--multiple-subject-fraction", type=float, default=0.2)
+    parser.add_argument("--devolved-fraction", type=float, default=0.2, help="share of institutions outside England")
+    parser.add_argument("--zipf", type=float, default=1.1, help="skew of course popularity")
+    parser.add_argument("--alias-rate", type=float, default=0.05, help="share of requests by reporting ukprn")
+    parser.add_argument("--miss-rate", type=float, default=0.02, help="share of requests for missing courses")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="latency per partition round trip")
+    parser.add_argument("--partitions", type=int, default=4)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of Cosmos DB calls answered with 429")
+    parser.add_argument("--retry-after-ms", type=int, default=100, help="x-ms-retry-after-ms sent with each 429")
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--setting", action="append", default=[], help="function app setting, NAME=VALUE")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    rng = random.Random(args.seed)
+    client = FakeCosmosClient(
+        physical_partitions=args.partitions, latency_seconds=args.latency_ms / 1000,
+        throttle_rate=args.throttle_rate, retry_after_ms=args.retry_after_ms, seed=args.seed,
+    )
+    corpus = generate_corpus(
+        args.courses, args.institutions, args.versions, args.institution_skew, args.alias_fraction,
+        args.multiple_subject_fraction, args.devolved_fraction, seed=args.seed,
+    )
+    load_corpus(client, corpus)
+    settings = dict({"AsyncCosmosMaxWorkers": str(args.concurrency)}, **parse_settings(args.setting))
+    app = load_function_app(client, **settings)
+
+    workload = make_lookups(
+        rng, corpus, args.warmup + args.requests, args.zipf, args.alias_rate, args.miss_rate
+    )
+    print(f"{args.courses} courses, {args.requests} requests, {args.handler} handler, "
+          f"concurrency {args.concurrency}, {args.latency_ms}ms per partition round trip")
+    if args.warmup:
+        run_load(app, client, workload[:args.warmup], args.concurrency, args.handler)
+    report(run_load(app, client, workload[args.warmup:], args.concurrency, args.handler))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import inspect
+import os
+import sys
+
+CURRENTDIR = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+PARENTDIR = os.path.dirname(CURRENTDIR)
+GRANDPARENTDIR = os.path.dirname(PARENTDIR)
+sys.path.insert(0, GRANDPARENTDIR)
+
+import benchmarks  # noqa: E402,F401  puts the function app and its test fixtures on sys.path
@@ -0,0 +1,28 @@
+import json
+import random
+import unittest
+
+from benchmarks.bench_serializer import make_widget, orjson_serializers
+
+
+class TestBenchSerializer(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(1)
+        self.widgets = [make_widget(rng, n) for n in range(100)]
+
+    def test_widgets_include_non_ascii_titles(self):
+        self.assertTrue(any(not json.dumps(w, ensure_ascii=False).isascii() for w in self.widgets))
+
+    def test_orjson_with_separators_differs_only_on_non_ascii_widgets(self):
+        serializers = dict(orjson_serializers())
+        if not serializers:
+            self.skipTest("orjson is not installed")
+        dumps = serializers["orjson+sep"]
+
+        for widget in self.widgets:
+            ascii_only = json.dumps(widget, ensure_ascii=False).isascii()
+            self.assertEqual(dumps(widget) == json.dumps(widget).encode("utf-8"), ascii_only)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from benchmarks.corpus import describe, generate_corpus
+from course_fetcher import CourseFetcher
+
+
+class TestGenerateCorpus(unittest.TestCase):
+    def setUp(self):
+        self.corpus = generate_corpus(400, institutions=20, versions=2, alias_fraction=0.2)
+        self.latest = [d for d in self.corpus.documents if d["version"] == 2]
+
+    def test_is_deterministic(self):
+        again = generate_corpus(400, institutions=20, versions=2, alias_fraction=0.2)
+
+        self.assertEqual(self.corpus, again)
+        self.assertNotEqual(self.corpus, generate_corpus(400, institutions=20, versions=2, seed=2))
+
+    def test_generates_each_version(self):
+        self.assertEqual(self.corpus.versions, [1, 2])
+        self.assertEqual({d["version"] for d in self.corpus.documents}, {1, 2})
+        self.assertEqual(len({d["id"] for d in self.corpus.documents}), len(self.corpus.documents))
+
+    def test_keys_address_the_latest_version(self):
+        by_pub_ukprn = {
+            (d["course"]["institution"]["pub_ukprn"], d["course_id"], str(d["course_mode"])) for d in self.latest
+        }
+        by_ukprn = {
+            (d["course"]["institution"]["ukprn"], d["course_id"], str(d["course_mode"])) for d in self.latest
+        }
+
+        self.assertEqual(set(self.corpus.keys), by_pub_ukprn)
+        self.assertTrue(self.corpus.alias_keys)
+        self.assertTrue(set(self.corpus.alias_keys) <= by_ukprn - by_pub_ukprn)
+
+    def test_covers_the_shapes_the_widget_handles(self):
+        shape = describe(self.corpus)
+
+        self.assertGreater(shape["multiple_subjects"], 0)
+        self.assertGreater(shape["devolved"], 0)
+        self.assertLess(shape["devolved"], shape["documents_per_version"])
+        self.assertGreater(shape["largest_institution"], shape["documents_per_version"] / 20)
+
+    def test_statistics_tidy_for_each_country(self):
+        for document in self.latest:
+            course = document["course"]
+            stats = CourseFetcher.tidy_widget_stats(dict(course["statistics"]), course["country"])
+
+            question = "question_23" if course["country"]["code"] == "XF" else "question_28"
+            self.assertIn(question, stats["nss"][0])
+            self.assertEqual(
+                CourseFetcher.check_multiple_subjects(course["statistics"]),
+                len(course["statistics"]["employment"]) > 1,
+            )
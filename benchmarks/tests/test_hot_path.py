@@ -0,0 +1,46 @@
+import os
+import unittest
+
+from benchmarks.hot_path import CI_PYTHON, find_regressions, load_baseline, make_cases, measure, python_minor
+
+# Timings are noisy on shared build agents, so they are only gated when asked
+TIMING_GATE = os.environ.get("HOT_PATH_TIMING_GATE", "").lower() in ("1", "true")
+
+
+class TestHotPath(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.baseline = load_baseline()
+        cls.results = measure(number=200, repeat=3)
+
+    def test_baseline_covers_every_case(self):
+        self.assertEqual(set(self.baseline["cases"]), set(make_cases()))
+
+    def test_no_regression_against_baseline(self):
+        regressions = find_regressions(
+            self.results, self.baseline, time_threshold=None if not TIMING_GATE else 0.5
+        )
+
+        self.assertEqual(regressions, [])
+
+    def test_find_regressions_reports_slower_and_larger_cases(self):
+        baseline = {"python": "3.8.10", "cases": {"tidy": {"relative_time": 2.0, "bytes_allocated": 100}}}
+        slower = {"python": "3.8.12", "cases": {"tidy": {"relative_time": 3.5, "bytes_allocated": 200}}}
+
+        self.assertEqual(len(find_regressions(slower, baseline)), 2)
+        self.assertEqual(len(find_regressions(slower, baseline, time_threshold=None)), 1)
+        self.assertEqual(find_regressions(dict(slower, python="3.9.1"), baseline, time_threshold=None), [])
+
+    def test_find_regressions_compares_calls_on_every_python(self):
+        case = {"relative_time": 2.0, "bytes_allocated": 100, "app_calls": 4}
+        baseline = {"python": "3.8.10", "cases": {"tidy": case}}
+        more_calls = {"python": "3.11.7", "cases": {"tidy": dict(case, app_calls=5)}}
+
+        self.assertEqual(len(find_regressions(more_calls, baseline)), 1)
+
+    def test_baseline_is_recorded_on_the_ci_python(self):
+        self.assertEqual(python_minor(self.baseline["python"]), CI_PYTHON)
+
+
+if __name__ == "__main__":
+    unittest.main()
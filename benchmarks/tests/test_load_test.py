@@ -0,0 +1,37 @@
+import random
+import unittest
+
+from benchmarks.corpus import generate_corpus, make_lookups
+from benchmarks.load_test import load_corpus, percentile, run_load
+
+from fake_cosmos import FakeCosmosClient
+from fixtures import load_function_app
+
+
+class TestLoadTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(1)
+        self.client = FakeCosmosClient(physical_partitions=4)
+        self.corpus = generate_corpus(60, institutions=5, alias_fraction=0.2)
+        load_corpus(self.client, self.corpus)
+
+    def test_run_load_reports_statuses(self):
+        app = load_function_app(self.client)
+        workload = make_lookups(self.rng, self.corpus, 100, alias_rate=0.0, miss_rate=0.1)
+        expected_misses = sum(key[1].startswith("MISSING") for key in workload)
+
+        for handler in ("sync", "async"):
+            with self.subTest(handler=handler):
+                result = run_load(app, self.client, workload, 4, handler)
+
+                self.assertEqual(result.requests, 100)
+                self.assertEqual(result.statuses[404], expected_misses)
+                self.assertEqual(result.statuses[200], 100 - expected_misses)
+                self.assertEqual(len(result.latencies), 100)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 51)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 99), 0.0)
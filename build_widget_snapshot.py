@@ -0,0 +1,28 @@
+"""Builds the widget snapshot for a dataset version.
+
+Reads the same settings as the function app, so run it with those
+environment variables set, e.g.
+
+    WidgetSnapshotDir=/home/data/widgets python build_widget_snapshot.py --version 12
+
+Without --version it builds the latest successful dataset version.
+"""
+
+import argparse
+import logging
+
+import WidgetAPIHttpTrigger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--version", type=int, help="dataset version, defaults to the latest")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    version = WidgetAPIHttpTrigger.build_widget_snapshot(args.version)
+    print(f"Built {WidgetAPIHttpTrigger.widget_snapshots.path(version)}")
+
+
+if __name__ == "__main__":
+    main()
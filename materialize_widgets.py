@@ -0,0 +1,30 @@
+"""Writes the widgets for a dataset version to the widget store.
+
+Reads the same settings as the function app, so run it with those
+environment variables set, e.g.
+
+    AzureCosmosDbWidgetsCollectionId=widgets python materialize_widgets.py --version 12
+
+Without --version it materializes the latest successful dataset version.
+Running it again for a version rewrites the same documents, so it is
+safe to run after every dataset load.
+"""
+
+import argparse
+import logging
+
+import WidgetAPIHttpTrigger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--version", type=int, help="dataset version, defaults to the latest")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    version = WidgetAPIHttpTrigger.materialize_widgets(args.version)
+    print(f"Materialized dataset version {version}")
+
+
+if __name__ == "__main__":
+    main()
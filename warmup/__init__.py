@@ -0,0 +1,15 @@
+import logging
+
+import azure.functions as func
+
+from ..WidgetAPIHttpTrigger import warm_up
+
+
+def main(warmupContext: func.Context) -> None:
+    """Warms up a new instance before it is added to the load balancer.
+
+    Only runs on plans with pre-warmed instances, such as the Premium
+    plan; the host requires the function to be called warmup.
+    """
+    logging.info("Warming up a new instance.")
+    warm_up()